@@ -1,31 +1,206 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify, url_for, stream_with_context
 from flask_cors import CORS
+import argparse
+import gc
+import json
+import logging
 import os
 import sys
+import threading
+import time
 from werkzeug.utils import secure_filename
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(__file__))
 
 from ocr_processor import OCRProcessor
-from nlp_processor import NLPProcessor
+from nlp_processor import NLPProcessor, preload_nltk, set_offline_mode
 from fr_generator import FRGenerator
+from fr_rules import RuleConfigError
+from pos_tagging import shared_tagger
+from pipeline import Pipeline, build_cache
+from incremental import BaseVersionNotFoundError
+from pdf_processor import PageRangeError
+from job_queue import JobQueue, QueueFullError
+from job_store import JobStore
+from batch_processor import BatchProcessor, BatchError
+from upload_store import UploadStore
+from project_store import ProjectStore, ProjectNotFoundError
+from response_formats import (FORMATS, FormatError, negotiate_format, negotiate_encoding, shape_result, encode,
+                              ndjson_lines, compress, compress_stream)
+from metrics import REGISTRY, HTTP_REQUESTS, HTTP_DURATION, observe_pipeline
+from memory_monitor import MEMORY_MONITOR
+from structured_logging import configure_logging, get_logger, log_event
+
+configure_logging()
+logger = get_logger('app')
+
+class ConverterRequest(Request):
+    @property
+    def max_content_length(self):
+        # Batch uploads carry many diagrams, so they get their own limit
+        if self.endpoint == 'process_batch':
+            return app.config['MAX_BATCH_SIZE']
+        return super().max_content_length
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Uploaded files are streamed to disk and hashed while they are written
+        return upload_store.open_writer()
 
 app = Flask(__name__)
+app.request_class = ConverterRequest
 CORS(app)
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE_MB', 100)) * 1024 * 1024
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE_MB', 512)) * 1024 * 1024
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 10000))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', JOB_WORKERS * 4))
+PROJECT_DB = os.environ.get('PROJECT_DB', 'projects.db')
+# Async job states and results, shared by all web worker processes
+JOB_DB = os.environ.get('JOB_DB', 'jobs.db')
+CACHE_OPTIONS = {
+    'cache_dir': os.environ.get('RESULT_CACHE_DIR', 'cache'),
+    'memory_limit': int(os.environ.get('RESULT_CACHE_MEMORY_MB', 64)) * 1024 * 1024,
+    'disk_limit': int(os.environ.get('RESULT_CACHE_DISK_MB', 1024)) * 1024 * 1024
+}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+app.config['MAX_BATCH_SIZE'] = MAX_BATCH_SIZE
+
+upload_store = UploadStore(UPLOAD_FOLDER, ALLOWED_EXTENSIONS)
+project_store = ProjectStore(PROJECT_DB)
 
 # Initialize processors
 ocr_processor = OCRProcessor()
 nlp_processor = NLPProcessor()
 fr_generator = FRGenerator()
+result_cache = build_cache(**CACHE_OPTIONS)
+pipeline = Pipeline(ocr_processor, nlp_processor, fr_generator, cache=result_cache)
+job_queue = JobQueue(max_workers=JOB_WORKERS, max_queue_size=JOB_QUEUE_SIZE, cache_options=CACHE_OPTIONS,
+                     store=JobStore(JOB_DB))
+batch_processor = BatchProcessor(max_workers=JOB_WORKERS, max_items=MAX_BATCH_ITEMS,
+                                 max_zip_size=MAX_BATCH_SIZE * 4, cache_options=CACHE_OPTIONS)
+
+def collect_service_metrics():
+    """Scrape-time metrics read from the result cache and job queue"""
+    cache = result_cache.stats()
+    lookups, hit_ratio = [], []
+    for tier, counters in cache['tiers'].items():
+        for outcome in ('memory_hits', 'disk_hits', 'misses'):
+            lookups.append(({'tier': tier, 'result': outcome}, counters[outcome]))
+        hit_ratio.append(({'tier': tier}, counters['hit_rate']))
+    jobs = job_queue.stats()
+    ocr = ocr_processor.backend_health()['backends']
+    rule_hits, rule_seconds, rule_timed = [], [], []
+    for rule_set, info in fr_generator.rules.stats()['rule_sets'].items():
+        for rule, counters in info['rules'].items():
+            labels = {'rule_set': rule_set, 'rule': rule}
+            rule_hits.append((labels, counters['hits']))
+            rule_seconds.append((labels, counters['seconds']))
+            rule_timed.append((labels, counters['timed']))
+    tagger = shared_tagger().stats()
+    breaker_states = {'closed': 0, 'half_open': 1, 'open': 2}
+    return [
+        ('converter_cache_lookups_total', 'counter', 'Result cache lookups by tier and outcome', lookups),
+        ('converter_cache_hit_ratio', 'gauge', 'Result cache hit ratio by tier', hit_ratio),
+        ('converter_cache_memory_bytes', 'gauge', 'Bytes held in the in-memory cache', [({}, cache['memory_bytes'])]),
+        ('converter_cache_disk_bytes', 'gauge', 'Bytes held in the on-disk cache', [({}, cache['disk_bytes'] or 0)]),
+        ('converter_job_queue_depth', 'gauge', 'Jobs waiting for a worker', [({}, jobs['queue_depth'])]),
+        ('converter_jobs_running', 'gauge', 'Jobs currently running', [({}, jobs['running'])]),
+        ('converter_jobs_rejected_total', 'counter', 'Jobs rejected because the queue was full',
+         [({}, jobs['rejected'])]),
+        ('converter_ocr_backend_state', 'gauge', 'OCR backend circuit breaker state (0 closed, 1 half-open, 2 open)',
+         [({'backend': name}, breaker_states[stats['state']]) for name, stats in ocr.items()]),
+        ('converter_ocr_backend_failures_total', 'counter', 'OCR backend calls that failed or timed out',
+         [({'backend': name}, stats['failures']) for name, stats in ocr.items()]),
+        ('converter_ocr_backend_timeouts_total', 'counter', 'OCR backend calls that timed out',
+         [({'backend': name}, stats['timeouts']) for name, stats in ocr.items()]),
+        ('converter_fr_rule_hits_total', 'counter', 'FR generation rules that fired, by rule set and rule', rule_hits),
+        ('converter_fr_rule_timed_seconds_total', 'counter', 'Time spent in the sampled evaluations of each FR rule',
+         rule_seconds),
+        ('converter_fr_rule_timed_total', 'counter', 'Sampled evaluations of each FR rule', rule_timed),
+        ('converter_pos_tagger_cache_lookups_total', 'counter', 'Flow step lookups in the POS tagging cache by outcome',
+         [({'result': 'hits'}, tagger['hits']), ({'result': 'misses'}, tagger['misses'])])
+    ]
+
+REGISTRY.register_collector(collect_service_metrics)
+
+# Set once warm_up() has run; /ready reports 503 until then
+warmed_up = threading.Event()
+
+def warm_up(load_nltk=True):
+    """
+    Load everything the first request would otherwise pay for
+
+    Production servers call this before forking their workers (see
+    wsgi.py and gunicorn.conf.py), so the NLTK data, POS tagger, compiled
+    patterns and processor state are built once and shared copy-on-write.
+    Nothing that holds a process, thread or connection is started here;
+    those stay lazy and are created in each worker.
+    """
+    start = time.perf_counter()
+    nltk_loaded = preload_nltk() if load_nltk else False
+    tagger_loaded = shared_tagger().load() if load_nltk else False
+    pipeline.warm_up()
+    gc.collect()
+    warmed_up.set()
+    log_event(logger, logging.INFO, 'warm_up_complete', nltk=nltk_loaded, pos_tagger=tagger_loaded,
+              duration_ms=round((time.perf_counter() - start) * 1000, 2))
+
+def readiness_checks():
+    """Whether this process can take traffic, check by check"""
+    jobs = job_queue.stats()
+    return {
+        'warmed_up': warmed_up.is_set(),
+        'project_store': project_store.ping(),
+        'upload_folder': os.access(UPLOAD_FOLDER, os.W_OK),
+        'job_queue': jobs['queue_depth'] < jobs['max_queue_size']
+    }
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unmatched'
+    duration = time.perf_counter() - g.get('request_start', time.perf_counter())
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    HTTP_DURATION.observe(duration, endpoint=endpoint)
+    return response
+
+def response_options(data=None):
+    """Response format, compression and field projection from the body, query string and headers"""
+    data = data or {}
+    fmt = negotiate_format(data.get('format') or request.args.get('format'), request.accept_mimetypes)
+    encoding = negotiate_encoding(data.get('compress') or request.args.get('compress'), request.accept_encodings)
+    return fmt, encoding, data.get('fields') or request.args.get('fields')
+
+def formatted_response(result, fmt, encoding, fields, status=200):
+    """Serialize a finished result in the negotiated format"""
+    if fmt == 'ndjson':
+        parts = [('document', {key: value for key, value in result.items() if key in ('document_type', 'page_count', 'pages_processed')})]
+        use_cases = result.get('use_cases') or [{key: value for key, value in result.items() if key != 'success'}]
+        parts.extend(('use_case', use_case) for use_case in use_cases)
+        body = b''.join(ndjson_lines(parts, fields))
+        response = Response(body, mimetype=FORMATS[fmt])
+    elif fmt == 'json':
+        response = jsonify(shape_result(result, fmt, fields) if fields else result)
+    else:
+        response = Response(encode(shape_result(result, fmt, fields), fmt), mimetype=FORMATS[fmt])
+    
+    body, content_encoding = compress(response.get_data(), encoding)
+    if content_encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = content_encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    response.status_code = status
+    return response
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -43,17 +218,16 @@ def upload_file():
         
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            # Create uploads directory if it doesn't exist
-            if not os.path.exists(app.config['UPLOAD_FOLDER']):
-                os.makedirs(app.config['UPLOAD_FOLDER'])
-            
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            stored = upload_store.commit(file.stream, extension)
             
             return jsonify({
                 'message': 'File uploaded successfully',
                 'filename': filename,
-                'filepath': filepath
+                'filepath': stored['filepath'],
+                'file_id': stored['file_id'],
+                'size': stored['size'],
+                'duplicate': stored['duplicate']
             }), 200
         else:
             return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg, pdf'}), 400
@@ -65,41 +239,313 @@ def upload_file():
 def process_diagram():
     try:
         data = request.json
-        filepath = data.get('filepath')
+        file_id = data.get('file_id')
+        filepath = upload_store.path_for(file_id) if file_id else data.get('filepath')
         model_type = data.get('model_type', 'rule-based')
+        pages = data.get('pages')
         
         if not filepath or not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        print("Step 1: Performing OCR...")
-        extracted_text = ocr_processor.extract_text(filepath)
+        fmt, encoding, fields = response_options(data)
+        
+        # Stable requirement IDs, and with base (the file_id of an earlier
+        # version) only the delta against it
+        if data.get('incremental') or data.get('base'):
+            return process_incremental(filepath, model_type, file_id, data, fmt, encoding, fields)
         
-        print("Step 2: Performing NLP analysis...")
-        use_case_elements = nlp_processor.extract_use_case_elements(extracted_text)
+        if data.get('async') or request.args.get('async') == '1':
+            try:
+                job_id = job_queue.submit(filepath, model_type, content_hash=file_id, pages=pages)
+            except QueueFullError as e:
+                return jsonify({'error': str(e)}), 429
+
+            response = jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('job_status', job_id=job_id),
+                'result_url': url_for('job_result', job_id=job_id)
+            })
+            response.headers['Location'] = url_for('job_status', job_id=job_id)
+            return response, 202
         
-        print("Step 3: Generating functional requirements...")
-        functional_requirements = fr_generator.generate_requirements(use_case_elements, model_type)
+        if fmt == 'ndjson':
+            return stream_ndjson(filepath, model_type, file_id, pages, encoding, fields)
         
-        print("Step 4: Generating traceability matrix...")
-        trace_matrix = fr_generator.generate_traceability_matrix(use_case_elements, functional_requirements)
+        try:
+            with MEMORY_MONITOR.track() as memory:
+                result, timings = pipeline.process(filepath, model_type, content_hash=file_id, pages=pages)
+        except Exception:
+            observe_pipeline('sync', {}, error=True)
+            raise
+        observe_pipeline('sync', timings, filepath=filepath, result=result, memory=memory)
         
-        return jsonify({
-            'success': True,
-            'use_case_description': use_case_elements,
-            'functional_requirements': functional_requirements,
-            'traceability_matrix': trace_matrix,
-            'extracted_text': extracted_text
-        }), 200
+        # Opt-in per-stage breakdown, e.g. POST /process?timing=1
+        if data.get('timing') or request.args.get('timing') == '1':
+            result = dict(result, timings={stage: round(duration, 4) for stage, duration in timings.items()})
+        return formatted_response(result, fmt, encoding, fields)
         
+    except FormatError as e:
+        return jsonify({'error': str(e)}), 406
+    except PageRangeError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Processing error: {str(e)}")
+        log_event(logger, logging.ERROR, 'processing_failed', error=str(e))
         return jsonify({'error': str(e)}), 500
 
+def process_incremental(filepath, model_type, file_id, data, fmt, encoding, fields):
+    """Full stable-ID result, or the delta against data['base']"""
+    if fmt == 'ndjson':
+        raise FormatError("Incremental results are not available as NDJSON")
+    try:
+        with MEMORY_MONITOR.track() as memory:
+            result, timings = pipeline.process_incremental(filepath, model_type, content_hash=file_id,
+                                                           base_hash=data.get('base'))
+    except BaseVersionNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        observe_pipeline('sync', {}, error=True)
+        raise
+    observe_pipeline('sync', timings, filepath=filepath, result=result, memory=memory)
+    
+    if data.get('timing') or request.args.get('timing') == '1':
+        result = dict(result, timings={stage: round(duration, 4) for stage, duration in timings.items()})
+    return formatted_response(result, fmt, encoding, fields)
+
+def stream_ndjson(filepath, model_type, file_id, pages, encoding, fields):
+    """Stream requirements as NDJSON while the pipeline produces them"""
+    timings = {}
+    parts = pipeline.stream(filepath, model_type, content_hash=file_id, pages=pages, timings=timings)
+    # Pull the document header now so bad page ranges still get a 400
+    first = next(parts)
+    
+    def generate():
+        use_cases = []
+        def recorded():
+            yield first
+            for kind, payload in parts:
+                use_cases.append(payload)
+                yield kind, payload
+        try:
+            with MEMORY_MONITOR.track() as memory:
+                yield from ndjson_lines(recorded(), fields)
+        except Exception as e:
+            observe_pipeline('sync', {}, error=True)
+            log_event(logger, logging.ERROR, 'processing_failed', error=str(e))
+            yield (json.dumps({'type': 'error', 'error': str(e)}) + '\n').encode('utf-8')
+            return
+        observe_pipeline('sync', timings, filepath=filepath, result={'use_cases': use_cases}, memory=memory)
+    
+    response = Response(stream_with_context(compress_stream(generate(), encoding)), mimetype=FORMATS['ndjson'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
+
+@app.route('/process/batch', methods=['POST'])
+def process_batch():
+    try:
+        files = request.files.getlist('files') + request.files.getlist('file')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        model_type = request.form.get('model_type', 'rule-based')
+        
+        items = batch_processor.save_uploads(files, upload_store)
+        if not items:
+            return jsonify({'error': 'No valid files in batch'}), 400
+        
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        for item in batch_processor.process(items, model_type):
+            yield json.dumps(item) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    return jsonify(job_queue.stats()), 200
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status), 200
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error'], 'status': 'failed'}), 500
+    if job['status'] != 'completed':
+        return jsonify({'job_id': job_id, 'status': job['status']}), 202
+    try:
+        fmt, encoding, fields = response_options()
+    except FormatError as e:
+        return jsonify({'error': str(e)}), 406
+    result = job_queue.result(job_id)
+    if result is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return formatted_response(result, fmt, encoding, fields)
+
+@app.errorhandler(ProjectNotFoundError)
+def project_not_found(e):
+    return jsonify({'error': str(e)}), 404
+
+@app.route('/projects', methods=['POST'])
+def create_project():
+    data = request.json or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'Project name is required'}), 400
+    return jsonify(project_store.create_project(name)), 201
+
+@app.route('/projects', methods=['GET'])
+def list_projects():
+    return jsonify({'projects': project_store.list_projects()}), 200
+
+@app.route('/projects/<project_id>', methods=['GET'])
+def get_project(project_id):
+    return jsonify(project_store.get_project(project_id)), 200
+
+@app.route('/projects/<project_id>', methods=['DELETE'])
+def delete_project(project_id):
+    project_store.delete_project(project_id)
+    return jsonify({'deleted': project_id}), 200
+
+@app.route('/projects/<project_id>/diagrams', methods=['POST'])
+def add_project_diagram(project_id):
+    """Process a diagram and add (or replace) its use cases in the project"""
+    try:
+        data = request.json or {}
+        file_id = data.get('file_id')
+        filepath = upload_store.path_for(file_id) if file_id else data.get('filepath')
+        model_type = data.get('model_type', 'rule-based')
+        
+        if not filepath or not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'}), 404
+        project_store.get_project(project_id)
+        
+        diagram_key = data.get('diagram') or file_id or os.path.basename(filepath)
+        with MEMORY_MONITOR.track() as memory:
+            result, timings = pipeline.process(filepath, model_type, content_hash=file_id, pages=data.get('pages'))
+        observe_pipeline('sync', timings, filepath=filepath, result=result, memory=memory)
+        
+        # Each PDF page is its own use case, keyed by page
+        if 'use_cases' in result:
+            use_cases = [(f"{diagram_key}#p{use_case['page']}", use_case) for use_case in result['use_cases']]
+        else:
+            use_cases = [(diagram_key, result)]
+        
+        stored = [
+            project_store.put_use_case(project_id, key, use_case, filename=os.path.basename(filepath),
+                                       content_hash=file_id, model_type=model_type)
+            for key, use_case in use_cases
+        ]
+        return jsonify({'success': True, 'project_id': project_id, 'use_cases': stored}), 200
+        
+    except ProjectNotFoundError:
+        raise
+    except PageRangeError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        log_event(logger, logging.ERROR, 'project_diagram_failed', project_id=project_id, error=str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/projects/<project_id>/diagrams/<path:diagram_key>', methods=['DELETE'])
+def remove_project_diagram(project_id, diagram_key):
+    if not project_store.remove_diagram(project_id, diagram_key):
+        return jsonify({'error': 'Diagram not found'}), 404
+    return jsonify({'deleted': diagram_key}), 200
+
+@app.route('/projects/<project_id>/use_cases', methods=['GET'])
+def project_use_cases(project_id):
+    return jsonify({'use_cases': project_store.use_cases(project_id, actor=request.args.get('actor'))}), 200
+
+@app.route('/projects/<project_id>/requirements', methods=['GET'])
+def project_requirements(project_id):
+    requirements = project_store.requirements(
+        project_id,
+        actor=request.args.get('actor'),
+        category=request.args.get('category'),
+        priority=request.args.get('priority'),
+        diagram_key=request.args.get('diagram'),
+        limit=request.args.get('limit', type=int),
+        offset=request.args.get('offset', 0, type=int)
+    )
+    return jsonify({'functional_requirements': requirements}), 200
+
+@app.route('/projects/<project_id>/traceability', methods=['GET'])
+def project_traceability(project_id):
+    matrix = project_store.traceability(project_id, diagram_key=request.args.get('diagram'),
+                                        actor=request.args.get('actor'))
+    return jsonify({'traceability_matrix': matrix}), 200
+
+@app.route('/projects/<project_id>/duplicates', methods=['GET'])
+def project_duplicates(project_id):
+    clusters = project_store.duplicates(project_id, min_size=request.args.get('min_size', 2, type=int))
+    return jsonify({'clusters': clusters}), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats()), 200
+
+@app.route('/ocr/backends', methods=['GET'])
+def ocr_backend_health():
+    # Breakers live per process; this is the serving process, which runs synchronous /process calls
+    return jsonify(ocr_processor.backend_health()), 200
+
+@app.route('/rules', methods=['GET'])
+def rules_stats():
+    # Rule hits are counted per process; this is the serving process, which runs synchronous /process calls
+    return jsonify(dict(fr_generator.rules.stats(), pos_tagger=shared_tagger().stats())), 200
+
+@app.route('/rules/reload', methods=['POST'])
+def reload_rules():
+    # Other processes pick up a changed rules file on their own within FR_RULES_RELOAD_INTERVAL seconds
+    try:
+        rule_sets = fr_generator.rules.reload()
+    except RuleConfigError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'rule_sets': {name: fr_generator.rules_version(name) for name in rule_sets}}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'Use Case to FR Converter API is running'}), 200
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    # Unlike /health (the process is alive), /ready says whether to route requests here
+    checks = readiness_checks()
+    ready = all(checks.values())
+    return jsonify({'status': 'ready' if ready else 'not_ready', 'checks': checks}), 200 if ready else 503
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Use Case to FR Converter API')
+    parser.add_argument('--preload', action='store_true',
+                        help='Load NLTK resources before serving the first request')
+    parser.add_argument('--offline', action='store_true',
+                        help='Never download NLTK data; fall back to regex sentence splitting')
+    args = parser.parse_args()
+    
+    if args.offline:
+        set_offline_mode(True)
+    if args.preload:
+        print("Preloading NLTK resources...")
+    warm_up(load_nltk=args.preload)
+    
     print("Starting Use Case to FR Converter Server...")
     print("Make sure Tesseract OCR is installed on your system")
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+ASGI entry point: uploads are received on the event loop, processing runs in executors
+
+    uvicorn asgi:application --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application
+
+Request bodies are read asynchronously and spooled to disk when large, so a
+slow or large upload never holds a thread. The Flask app then runs in a
+thread pool. Endpoints that OCR a diagram get their own bounded pool
+(OCR_THREADS), so a burst of processing requests cannot starve uploads, job
+polling or /ready of threads.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+
+from app import app, warm_up
+
+# Endpoints that run OCR in the request
+OCR_ENDPOINTS = {'process_diagram', 'process_batch', 'add_project_diagram'}
+OCR_THREADS = int(os.environ.get('OCR_THREADS', os.cpu_count() or 1))
+REQUEST_THREADS = int(os.environ.get('REQUEST_THREADS', 16))
+
+# Request bodies larger than this are spooled to a temporary file while they arrive
+SPOOL_SIZE = 1024 * 1024
+
+class WSGIBridge:
+    """
+    Serves a WSGI app over ASGI, choosing a thread pool per endpoint
+
+    Each request runs start to finish on one executor thread (Flask's
+    request context and streamed responses stay on that thread), while the
+    response is sent from the event loop as the app produces it.
+    """
+
+    def __init__(self, wsgi_app, ocr_endpoints=OCR_ENDPOINTS, ocr_threads=OCR_THREADS,
+                 request_threads=REQUEST_THREADS, max_body_size=None):
+        self.wsgi_app = wsgi_app
+        self.ocr_endpoints = set(ocr_endpoints)
+        self.max_body_size = max_body_size
+        self.ocr_executor = ThreadPoolExecutor(max_workers=ocr_threads, thread_name_prefix='ocr')
+        self.request_executor = ThreadPoolExecutor(max_workers=request_threads, thread_name_prefix='request')
+        self._url_adapter = wsgi_app.url_map.bind('localhost')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise NotImplementedError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.ocr_executor.shutdown(wait=False, cancel_futures=True)
+                self.request_executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        try:
+            size = 0
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if self.max_body_size is not None and size > self.max_body_size:
+                    await self._send_simple(send, 413, b'Request body too large')
+                    return
+                body.write(chunk)
+                more_body = message.get('more_body', False)
+            body.seek(0)
+
+            loop = asyncio.get_running_loop()
+            environ = self._environ(scope, body, size)
+            await loop.run_in_executor(self._executor_for(scope), self._run, environ, send, loop)
+        finally:
+            body.close()
+
+    def _run(self, environ, send, loop):
+        """Call the WSGI app on an executor thread, handing each chunk to the event loop"""
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        def send_start():
+            if not response.get('sent'):
+                send_message({'type': 'http.response.start', 'status': response['status'],
+                              'headers': response['headers']})
+                response['sent'] = True
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    send_start()
+                    send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_start()
+            send_message({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    def _executor_for(self, scope):
+        try:
+            endpoint, _ = self._url_adapter.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            endpoint = None
+        return self.ocr_executor if endpoint in self.ocr_endpoints else self.request_executor
+
+    def _environ(self, scope, body, size):
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'CONTENT_LENGTH': str(size),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+
+        for name, value in scope['headers']:
+            name, value = name.decode('latin-1'), value.decode('latin-1')
+            if name == 'content-length':
+                continue
+            key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def _send_simple(self, send, status, body):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+warm_up()
+
+application = WSGIBridge(app, max_body_size=max(app.config['MAX_CONTENT_LENGTH'], app.config['MAX_BATCH_SIZE']))
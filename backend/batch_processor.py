@@ -0,0 +1,126 @@
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.utils import secure_filename
+
+from metrics import observe_pipeline
+from pipeline import init_worker, run_in_worker
+
+DIAGRAM_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
+
+class BatchError(Exception):
+    """Raised when a batch upload cannot be unpacked"""
+
+class BatchProcessor:
+    """
+    Fans a batch of diagrams out across a process pool
+
+    Results are yielded as each diagram finishes, in completion order, and a
+    failure in one diagram is reported for that item only.
+    """
+
+    def __init__(self, max_workers=None, max_items=1000, max_zip_size=512 * 1024 * 1024,
+                 cache_options=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_items = max_items
+        self.max_zip_size = max_zip_size
+        self.cache_options = cache_options
+        self._executor = None
+
+    def save_uploads(self, files, upload_store):
+        """
+        Store uploaded diagrams, expanding any zip archives, in the upload store
+
+        Returns a list of (filename, filepath, file_id) tuples in upload order.
+        """
+        items = []
+        for file in files:
+            filename = secure_filename(file.filename or '')
+            if not filename:
+                continue
+            extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+            if extension == 'zip':
+                items.extend(self._extract_zip(file.stream, upload_store))
+            elif extension in DIAGRAM_EXTENSIONS:
+                stored = upload_store.commit(file.stream, extension)
+                items.append((filename, stored['filepath'], stored['file_id']))
+            else:
+                items.append((filename, None, None))
+
+            if len(items) > self.max_items:
+                raise BatchError(f"Batch exceeds {self.max_items} diagrams")
+
+        return items
+
+    def process(self, items, model_type='rule-based'):
+        """Yield one result dict per (filename, filepath, file_id) item as each completes"""
+        executor = self._get_executor()
+        futures = {}
+        for index, (filename, filepath, file_id) in enumerate(items):
+            if filepath is None:
+                yield {'index': index, 'filename': filename, 'success': False,
+                       'error': 'Unsupported file type'}
+                continue
+            future = executor.submit(run_in_worker, filepath, model_type, file_id)
+            futures[future] = (index, filename, filepath, file_id, time.perf_counter())
+
+        for future in as_completed(futures):
+            index, filename, filepath, file_id, submitted = futures[future]
+            item = {'index': index, 'filename': filename, 'file_id': file_id}
+            try:
+                result, timings, memory = future.result()
+            except BrokenProcessPool as e:
+                self._executor = None
+                item.update(success=False, error=f"Worker crashed: {str(e)}")
+                observe_pipeline('batch', {}, error=True)
+            except Exception as e:
+                item.update(success=False, error=str(e))
+                observe_pipeline('batch', {}, error=True)
+            else:
+                item.update(result)
+                item['timings'] = timings
+                observe_pipeline('batch', timings, filepath=filepath, result=result, memory=memory)
+            item['elapsed'] = round(time.perf_counter() - submitted, 4)
+            yield item
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 initializer=init_worker,
+                                                 initargs=(self.cache_options,))
+        return self._executor
+
+    def _extract_zip(self, stream, upload_store):
+        """Store the members of a zip archive, rejecting oversized archives"""
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile:
+            raise BatchError("Invalid zip archive")
+
+        items = []
+        with archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            if sum(info.file_size for info in members) > self.max_zip_size:
+                raise BatchError("Zip archive is too large when extracted")
+
+            for info in members:
+                filename = secure_filename(os.path.basename(info.filename))
+                if not filename:
+                    continue
+                extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+                if extension not in DIAGRAM_EXTENSIONS:
+                    items.append((filename, None, None))
+                    continue
+                with archive.open(info) as member:
+                    stored = upload_store.save_stream(member, extension)
+                items.append((filename, stored['filepath'], stored['file_id']))
+        return items
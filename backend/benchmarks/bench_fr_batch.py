@@ -0,0 +1,69 @@
+"""
+Benchmark: FR generation throughput for 1, 100 and 10k use cases
+
+Compares FRGenerator.generate_requirements_batch against calling
+generate_requirements once per use case, and checks both produce the same
+requirements. Run from the backend directory:
+
+    python benchmarks/bench_fr_batch.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fr_generator import FRGenerator
+
+SIZES = [1, 100, 10000]
+
+ACTORS = ['Customer', 'Admin', 'Payment Gateway', 'Bank System', 'Store Manager', 'Operator', 'Guest user']
+VERBS = ['selects', 'enters', 'validates', 'displays', 'stores', 'calculates', 'reviews', 'checks',
+         'updates', 'processes', 'confirms', 'shows']
+OBJECTS = ['payment method', 'order details', 'invoice', 'shipping address', 'account balance',
+           'discount code', 'search results', 'cart contents']
+SUBJECTS = ['Customer', 'System', 'user', 'Admin']
+
+def synthetic_elements(count, seed=0):
+    rng = random.Random(seed)
+    elements_list = []
+    for i in range(count):
+        elements_list.append({
+            'use_case_name': f"Use Case {i}",
+            'actors': rng.sample(ACTORS, rng.randint(1, 3)),
+            'goal': rng.choice(['Process online payments securely', 'Allow login access to the portal',
+                                'Manage customer orders']),
+            'preconditions': [f"{rng.choice(SUBJECTS)} is logged in"] * rng.randint(0, 2),
+            'main_flow': [f"{n}. {rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+                          for n in range(1, rng.randint(3, 9))],
+            'alternative_flows': [f"A{n}: {rng.choice(OBJECTS)} is invalid - {rng.choice(VERBS)} error"
+                                  for n in range(1, rng.randint(1, 4))],
+            'postconditions': [f"{rng.choice(OBJECTS)} is saved"]
+        })
+    return elements_list
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    generator = FRGenerator()
+    print(f"{'use cases':>10} {'batch (ms)':>11} {'per item (ms)':>14} {'batch UC/s':>11} {'speed-up':>9}")
+    for size in SIZES:
+        elements_list = synthetic_elements(size)
+        single = [generator.generate_requirements(elements) for elements in elements_list]
+        if generator.generate_requirements_batch(elements_list) != single:
+            raise SystemExit(f"Batch output differs from the single-item path at {size} use cases")
+
+        batch_time = best_of(lambda: generator.generate_requirements_batch(elements_list))
+        single_time = best_of(lambda: [generator.generate_requirements(elements) for elements in elements_list])
+        print(f"{size:>10} {batch_time * 1000:>11.3f} {single_time * 1000:>14.3f} "
+              f"{size / batch_time:>11.0f} {single_time / batch_time:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: cold import time of app.py
+
+Each run imports the backend in a fresh interpreter, so it measures what a
+container restart pays before Flask starts serving. Also lists the slowest
+modules reported by -X importtime. Run from the backend directory:
+
+    python benchmarks/bench_import_time.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def time_import(module, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], cwd=BACKEND_DIR, env=env,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def slowest_imports(module, env, limit=10):
+    """Parse -X importtime output and return the modules with the largest cumulative time"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative_us, name = [field.strip() for field in line[len('import time:'):].split('|')]
+        if cumulative_us.isdigit():
+            rows.append((int(cumulative_us), name))
+    return sorted(rows, reverse=True)[:limit]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ)
+
+    for label, extra_env in [('default', {}), ('NLTK_OFFLINE=1', {'NLTK_OFFLINE': '1'})]:
+        run_env = dict(env, **extra_env)
+        times = [time_import('app', run_env) for _ in range(runs)]
+        print(f"import app [{label}]: median {statistics.median(times) * 1000:.1f} ms, "
+              f"min {min(times) * 1000:.1f} ms over {runs} runs")
+
+    baseline = [time_import('sys', env) for _ in range(runs)]
+    print(f"interpreter start-up: median {statistics.median(baseline) * 1000:.1f} ms")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative_us, name in slowest_imports('app', env):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: memory per requirement for the different in-memory representations
+
+Measures, with tracemalloc, the bytes retained per requirement by the
+list of dicts the API returns (as loaded back from JSON), by a list of
+slotted Requirement objects and by a RequirementTable, which is how
+JobQueue holds completed results until they are fetched. Run from the
+backend directory:
+
+    python benchmarks/bench_memory.py
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fr_generator import FRGenerator
+from models import Requirement, RequirementTable
+
+sys.path.append(os.path.dirname(__file__))
+from bench_fr_batch import synthetic_elements
+
+SIZES = [1000, 100000]
+
+def synthetic_payload(count):
+    """JSON of count requirements with project-wide IDs"""
+    generator = FRGenerator()
+    requirements = []
+    for use_case in generator.generate_requirements_batch(synthetic_elements(count // 8 + 1)):
+        requirements.extend(use_case)
+    requirements = requirements[:count]
+    for number, requirement in enumerate(requirements, start=1):
+        requirement['id'] = f"FR-{number:03d}"
+    return json.dumps(requirements)
+
+def retained_bytes(build, payload):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build(payload)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+def as_dicts(payload):
+    return json.loads(payload)
+
+def as_objects(payload):
+    return [Requirement.from_dict(data) for data in json.loads(payload)]
+
+def as_table(payload):
+    return RequirementTable.from_dicts(json.loads(payload))
+
+def main():
+    print(f"{'FRs':>8} {'dicts (B/FR)':>13} {'slotted (B/FR)':>15} {'table (B/FR)':>13}")
+    for size in SIZES:
+        payload = synthetic_payload(size)
+        dicts, dict_bytes = retained_bytes(as_dicts, payload)
+        objects, object_bytes = retained_bytes(as_objects, payload)
+        table, table_bytes = retained_bytes(as_table, payload)
+        if table.to_dicts() != dicts or [requirement.to_dict() for requirement in objects] != dicts:
+            raise SystemExit("Representations are not wire-compatible")
+        print(f"{size:>8} {dict_bytes / size:>13.0f} {object_bytes / size:>15.0f} {table_bytes / size:>13.0f}")
+
+if __name__ == '__main__':
+    main()
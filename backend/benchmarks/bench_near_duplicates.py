@@ -0,0 +1,85 @@
+"""
+Benchmark: near-duplicate requirement clustering from 1k to 100k requirements
+
+Times incremental indexing with NearDuplicateIndex and, for the smaller
+sizes, checks its recall against an all-pairs comparison of the same
+shingle sets. Run from the backend directory:
+
+    python benchmarks/bench_near_duplicates.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, jaccard, normalize, shingles
+
+SIZES = [1000, 10000, 100000]
+BRUTE_FORCE_LIMIT = 2000
+
+TEMPLATES = [
+    "The system shall validate {entity} information",
+    "The system shall allow user to enter {entity} details",
+    "The system shall display {entity} summary to {actor}",
+    "The system shall store {entity} in the database",
+    "The system shall provide interface access for {actor}",
+    "The system shall authenticate {actor} credentials",
+    "The system shall ensure that {actor} is logged in",
+    "The system shall achieve {entity} is processed"
+]
+ENTITIES = ['payment', 'order', 'invoice', 'shipment', 'account', 'refund', 'booking', 'profile',
+            'report', 'ticket', 'subscription', 'coupon', 'review', 'delivery', 'inventory']
+ACTORS = ['Customer', 'Admin', 'Manager', 'Operator', 'Guest User', 'Support Agent']
+NOISE = ['the', 'all', 'new', 'current', 'selected', 'required']
+
+def synthetic_requirements(count, seed=0):
+    rng = random.Random(seed)
+    requirements = []
+    for i in range(count):
+        text = rng.choice(TEMPLATES).format(entity=rng.choice(ENTITIES), actor=rng.choice(ACTORS))
+        words = text.split()
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(3, len(words) + 1), rng.choice(NOISE))
+        if rng.random() < 0.1:
+            words.append(f"#{rng.randrange(1000)}")
+        requirements.append((f"FR-{i + 1:06d}", ' '.join(words)))
+    return requirements
+
+def brute_force_pairs(requirements, threshold):
+    """Every pair of requirements whose shingle sets pass the threshold"""
+    shingle_sets = [shingles(normalize(description)) for _, description in requirements]
+    pairs = []
+    for i in range(len(requirements)):
+        for j in range(i + 1, len(requirements)):
+            if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold:
+                pairs.append((requirements[i][0], requirements[j][0]))
+    return pairs
+
+def main():
+    print(f"{'FRs':>8} {'index (s)':>10} {'FRs/s':>9} {'clusters':>9} {'pair recall':>12} {'all-pairs (s)':>14}")
+    for size in SIZES:
+        requirements = synthetic_requirements(size)
+
+        index = NearDuplicateIndex()
+        start = time.perf_counter()
+        index.add_many(requirements)
+        clusters = index.clusters()
+        index_time = time.perf_counter() - start
+
+        recall, brute_time = '-', '-'
+        if size <= BRUTE_FORCE_LIMIT:
+            start = time.perf_counter()
+            pairs = brute_force_pairs(requirements, DEFAULT_THRESHOLD)
+            brute_time = f"{time.perf_counter() - start:.2f}"
+            cluster_of = {key: i for i, cluster in enumerate(clusters) for key in cluster['members']}
+            found = sum(1 for first, second in pairs
+                        if first in cluster_of and cluster_of[first] == cluster_of.get(second))
+            recall = f"{found / len(pairs):.4f}" if pairs else '1.0000'
+
+        print(f"{size:>8} {index_time:>10.2f} {size / index_time:>9.0f} {len(clusters):>9} "
+              f"{recall:>12} {brute_time:>14}")
+
+if __name__ == '__main__':
+    main()
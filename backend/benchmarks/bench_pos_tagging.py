@@ -0,0 +1,81 @@
+"""
+Benchmark: POS tagging of flow steps, one step at a time against batched
+
+For 100, 1000 and 10000 distinct steps, compares:
+
+    pos_tag        nltk.pos_tag on each step, as a naive 'nlp' mode would
+    shared, 1/call StepTagger.analyze on each step alone, on the shared tagger
+    batched, cold  StepTagger.analyze on all steps at once, empty cache
+    batched, warm  the same steps again, all answered from the cache
+
+Every mode tokenizes with pos_tagging.TOKEN, so only the tagging differs.
+pos_tag is skipped above 1000 steps unless --all is given, since NLTK may
+load the tagger again on every call. Requires NLTK and its averaged
+perceptron tagger data. Run from the backend directory:
+
+    python benchmarks/bench_pos_tagging.py [--all] [--json pos_tagging.json]
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_fr_batch import OBJECTS, SUBJECTS, VERBS
+from harness import measure, write_results
+from pos_tagging import TOKEN, StepTagger
+
+SIZES = [100, 1000, 10000]
+POS_TAG_LIMIT = 1000
+
+def synthetic_steps(count):
+    """Distinct steps, so the cold runs tag every one of them"""
+    return [f"{SUBJECTS[n % len(SUBJECTS)]} {VERBS[n // len(SUBJECTS) % len(VERBS)]} "
+            f"{OBJECTS[n % len(OBJECTS)]} for order {n}" for n in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-step against batched POS tagging')
+    parser.add_argument('--all', action='store_true', help=f"Also run pos_tag above {POS_TAG_LIMIT} steps")
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    shared = StepTagger()
+    if not shared.load():
+        print("NLTK or its POS tagger data is not available; nothing to benchmark.")
+        return
+    from nltk import pos_tag
+    tagger = shared.tagger
+
+    results = {}
+    print(f"{'steps':>7} {'mode':<16} {'p50 ms':>10} {'steps/s':>10} {'speedup':>8}")
+    for size in SIZES:
+        steps = synthetic_steps(size)
+        modes = {}
+        if size <= POS_TAG_LIMIT or args.all:
+            modes['pos_tag'] = lambda run: [pos_tag([match.group() for match in TOKEN.finditer(step)])
+                                            for step in steps]
+
+        def one_per_call(run):
+            step_tagger = StepTagger(tagger=tagger)
+            for step in steps:
+                step_tagger.analyze([step])
+        modes['shared, 1/call'] = one_per_call
+        modes['batched, cold'] = lambda run: StepTagger(tagger=tagger).analyze(steps)
+        warm = StepTagger(tagger=tagger)
+        warm.analyze(steps)
+        modes['batched, warm'] = lambda run: warm.analyze(steps)
+
+        baseline = None
+        for mode, func in modes.items():
+            summary = measure(func, min_runs=3, max_runs=50, min_time=1.0)
+            baseline = baseline or summary['p50']
+            summary.update(steps=size, steps_per_second=size / summary['p50'], speedup=baseline / summary['p50'])
+            results[f"pos_tagging.{mode.replace(', ', '_').replace('/', '_per_')}/{size}_steps"] = summary
+            print(f"{size:>7} {mode:<16} {summary['p50'] * 1000:>10.2f} {summary['steps_per_second']:>10.0f} "
+                  f"{summary['speedup']:>7.1f}x")
+
+    if args.json:
+        write_results(args.json, results)
+
+if __name__ == '__main__':
+    main()
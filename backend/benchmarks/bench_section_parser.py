@@ -0,0 +1,76 @@
+"""
+Benchmark: section segmentation scaling from 1 KB to 1 MB of OCR text
+
+Compares the single-pass SectionParser used by NLPProcessor against running
+every header pattern with re.findall over the full text, as the extractor
+used to do. Run from the backend directory:
+
+    python benchmarks/bench_section_parser.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from nlp_processor import NLPProcessor
+
+SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024]
+
+BLOCK = """Use Case: Online Payment Processing
+
+Actors: Customer, Payment Gateway, Bank System
+
+Goal: Process online payments securely
+
+Preconditions:
+- Customer has items in cart
+- Payment gateway is accessible
+
+Main Flow:
+1. Customer selects payment method
+2. System displays payment form
+3. System validates payment information
+
+Alternative Flows:
+- A1: Payment declined - Show decline message
+
+Postconditions:
+- Payment is processed
+
+"""
+
+def synthetic_text(size):
+    repeats = size // len(BLOCK) + 1
+    return (BLOCK * repeats)[:size]
+
+def legacy_scan(processor, text):
+    """Every header pattern run separately over the whole text"""
+    for patterns in processor.use_case_patterns.values():
+        for pattern in patterns:
+            re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    processor = NLPProcessor()
+    print(f"{'size':>10} {'parse (ms)':>12} {'extract (ms)':>14} {'legacy scan (ms)':>18} {'extract us/KB':>14}")
+    for size in SIZES:
+        text = synthetic_text(size)
+        parse_time = best_of(lambda: processor.section_parser.parse(text))
+        # A fresh string each run so the per-text segmentation is not reused
+        extract_time = best_of(lambda: processor.extract_use_case_elements(text + ' '))
+        legacy_time = best_of(lambda: legacy_scan(processor, text))
+        per_kb = extract_time * 1e6 / (size / 1024)
+        print(f"{size:>10} {parse_time * 1000:>12.2f} {extract_time * 1000:>14.2f} "
+              f"{legacy_time * 1000:>18.2f} {per_kb:>14.1f}")
+
+if __name__ == '__main__':
+    main()
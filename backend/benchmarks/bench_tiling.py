@@ -0,0 +1,99 @@
+"""
+Benchmark: region-parallel OCR of large images through tiling
+
+Every image in uploads/ is scaled up (--scale, default 3x) to stand in for a
+large whiteboard scan, then OCR'd once as whole regions on one thread and
+once split into tiles (--tile-size) with 1, 2, 4, ... threads up to the core
+count, each with a Tesseract pool of the same size. Reported per run: p50
+OCR time, speedup over the untiled run, tile count, and the share of words
+from the untiled text the tiled text also finds. Requires Tesseract and
+pytesseract. Run from the backend directory:
+
+    python benchmarks/bench_tiling.py [--scale 3] [--tile-size 768] [--json tiling.json] [image ...]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image
+
+from harness import measure, write_results
+from ocr_processor import OCRProcessor
+from tiling import split_region
+
+def words(text):
+    return set(re.findall(r'[a-z]{3,}', text.lower()))
+
+def thread_counts():
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != os.cpu_count():
+        counts.append(os.cpu_count())
+    return counts
+
+def ocr(image, threads, tile_size, runs):
+    """(summary, text, tile count) for OCR with the given threads and tile size"""
+    # No downscaling, so the large image is what gets tiled
+    processor = OCRProcessor(region_threads=threads, tesseract_pool_size=threads, tile_size=tile_size,
+                             preprocess_options={'max_dimension': 0}, backends=['tesseract_pool', 'tesseract'])
+    # Compare the raw OCR text, without the cleanup
+    processor.clean_text = lambda text: text
+    try:
+        regions = processor._regions(image, {})
+        tiles = sum(len(split_region(region, tile_size)) for region in regions)
+        text = processor.extract_image_text(image)
+        summary = measure(lambda run: processor.extract_image_text(image), min_runs=runs, max_runs=runs,
+                          warmup=0)
+    finally:
+        if processor.tesseract_pool is not None:
+            processor.tesseract_pool.close()
+    return summary, text, tiles
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tiled, region-parallel OCR')
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--scale', type=float, default=3.0, help='Upscale factor applied to each image')
+    parser.add_argument('--tile-size', type=int, default=768)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    images = args.images or sorted(glob.glob(os.path.join('uploads', '*.png')) +
+                                   glob.glob(os.path.join('uploads', '*.jpg')))
+    if not OCRProcessor(backends=['tesseract_pool', 'tesseract']).tesseract_available:
+        print("Tesseract is not available; nothing to benchmark.")
+        return
+
+    results = {}
+    for image_path in images:
+        with Image.open(image_path) as source:
+            image = source.convert('RGB')
+        image = image.resize((int(image.width * args.scale), int(image.height * args.scale)), Image.LANCZOS)
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        print(f"\n{name} ({image.width}x{image.height})")
+        print(f"  {'run':<16} {'p50 ms':>10} {'speedup':>8} {'tiles':>6} {'recall':>7}")
+
+        baseline, baseline_text, tiles = ocr(image, 1, 0, args.runs)
+        baseline_words = words(baseline_text)
+        results[f"tiling.{name}/untiled"] = dict(baseline, tiles=tiles)
+        print(f"  {'untiled, 1 thr':<16} {baseline['p50'] * 1000:>10.1f} {1.0:>7.2f}x {tiles:>6} {1.0:>7.0%}")
+
+        for threads in thread_counts():
+            summary, text, tiles = ocr(image, threads, args.tile_size, args.runs)
+            recall = len(baseline_words & words(text)) / len(baseline_words) if baseline_words else 1.0
+            speedup = baseline['p50'] / summary['p50']
+            results[f"tiling.{name}/tiled_t{threads}"] = dict(summary, tiles=tiles, threads=threads,
+                                                              speedup=speedup, recall=recall)
+            print(f"  {f'tiled, {threads} thr':<16} {summary['p50'] * 1000:>10.1f} {speedup:>7.2f}x "
+                  f"{tiles:>6} {recall:>7.0%}")
+
+    if args.json:
+        write_results(args.json, results)
+
+if __name__ == '__main__':
+    main()
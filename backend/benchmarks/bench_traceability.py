@@ -0,0 +1,88 @@
+"""
+Benchmark: traceability matrix scaling with requirement and actor counts
+
+Compares FRGenerator.generate_traceability_matrix (one multi-pattern scan
+per requirement) against the nested substring scans it replaced, and checks
+both produce the same matrix. Run from the backend directory:
+
+    python benchmarks/bench_traceability.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fr_generator import FRGenerator
+
+SIZES = [(10, 3), (100, 10), (1000, 50), (5000, 200), (10000, 500)]
+
+WORDS = ('customer payment order account validate display store process report invoice '
+         'shipment gateway bank manager operator admin review approve cancel refund').split()
+
+def synthetic_use_case(requirement_count, actor_count, seed=0):
+    rng = random.Random(seed)
+    actors = [f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}" for i in range(actor_count)]
+    elements = {
+        'use_case_name': 'Online Payment Processing',
+        'actors': actors,
+        'goal': 'Process online payments securely for every customer order'
+    }
+    requirements = []
+    for i in range(requirement_count):
+        words = [rng.choice(WORDS) for _ in range(8)]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(actors))
+        requirements.append({
+            'id': f"FR-{i + 1:03d}",
+            'title': f"Requirement {i + 1}",
+            'description': 'The system shall ' + ' '.join(words)
+        })
+    return elements, requirements
+
+def legacy_matrix(use_case_elements, functional_requirements):
+    """The per-requirement nested scans used before the multi-pattern index"""
+    matrix = []
+    for requirement in functional_requirements:
+        mapped_elements = []
+        if any(word in requirement['description'].lower()
+               for word in use_case_elements.get('use_case_name', '').lower().split()):
+            mapped_elements.append('Use Case Name')
+        if any(word in requirement['description'].lower()
+               for word in use_case_elements.get('goal', '').lower().split()):
+            mapped_elements.append('Goal')
+        for actor in use_case_elements.get('actors', []):
+            if actor.lower() in requirement['description'].lower():
+                mapped_elements.append(f'Actor: {actor}')
+        matrix.append({
+            'requirement_id': requirement['id'],
+            'requirement_title': requirement['title'],
+            'mapped_elements': mapped_elements if mapped_elements else ['General System']
+        })
+    return matrix
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    generator = FRGenerator()
+    print(f"{'FRs':>7} {'actors':>7} {'indexed (ms)':>13} {'legacy (ms)':>12} {'speed-up':>9}")
+    for requirement_count, actor_count in SIZES:
+        elements, requirements = synthetic_use_case(requirement_count, actor_count)
+        matrix = generator.generate_traceability_matrix(elements, requirements)
+        if matrix != legacy_matrix(elements, requirements):
+            raise SystemExit(f"Matrix differs from the legacy scan at {requirement_count} FRs")
+
+        indexed_time = best_of(lambda: generator.generate_traceability_matrix(elements, requirements))
+        legacy_time = best_of(lambda: legacy_matrix(elements, requirements))
+        print(f"{requirement_count:>7} {actor_count:>7} {indexed_time * 1000:>13.2f} "
+              f"{legacy_time * 1000:>12.2f} {legacy_time / indexed_time:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
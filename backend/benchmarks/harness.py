@@ -0,0 +1,100 @@
+"""
+Shared helpers for the benchmark suite: timing, percentiles and JSON results
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def median_interval(sorted_values, z=1.96):
+    """
+    Distribution-free ~95% confidence interval of the median
+
+    The bounds are the order statistics at ranks n/2 - z*sqrt(n)/2 and
+    1 + n/2 + z*sqrt(n)/2 (normal approximation of the binomial), so the
+    interval makes no assumption about the shape of the latencies. Below
+    9 runs it is the full range.
+    """
+    count = len(sorted_values)
+    if not count:
+        return [0.0, 0.0]
+    spread = z * math.sqrt(count) / 2
+    low = max(0, round(count / 2 - spread) - 1)
+    high = min(count - 1, round(count / 2 + spread))
+    return [sorted_values[low], sorted_values[high]]
+
+def summarize(durations, **extra):
+    """Latency statistics, in seconds, for a list of per-call durations"""
+    durations = sorted(durations)
+    summary = {
+        'runs': len(durations),
+        'mean': statistics.mean(durations),
+        'min': durations[0],
+        'p50': percentile(durations, 0.50),
+        'p50_ci': median_interval(durations),
+        'p95': percentile(durations, 0.95),
+        'p99': percentile(durations, 0.99),
+        'max': durations[-1]
+    }
+    summary.update(extra)
+    return summary
+
+def measure(func, min_runs=5, max_runs=1000, min_time=0.5, warmup=1):
+    """
+    Time repeated calls of func(run_index)
+
+    Runs at least min_runs times and keeps going until min_time seconds
+    have been spent or max_runs is reached, so fast stages get enough
+    samples for stable percentiles and slow ones do not take forever.
+    """
+    for run in range(warmup):
+        func(run)
+    durations = []
+    deadline = time.perf_counter() + min_time
+    run = 0
+    while run < min_runs or (run < max_runs and time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func(run)
+        durations.append(time.perf_counter() - start)
+        run += 1
+    return summarize(durations)
+
+def environment():
+    """Where the results came from, so runs can be compared across commits"""
+    def git(*args):
+        try:
+            completed = subprocess.run(['git', *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                       check=True)
+            return completed.stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+
+def write_results(path, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
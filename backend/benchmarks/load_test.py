@@ -0,0 +1,119 @@
+"""
+Load test: concurrent requests against a running server
+
+Compares serving modes on the same machine, e.g. the dev server
+(python app.py) against gunicorn (gunicorn -c gunicorn.conf.py
+wsgi:application) or the ASGI bridge (uvicorn asgi:application). With a
+diagram, it is uploaded once and then processed by every request, so after
+the first one the numbers cover the cached path plus HTTP overhead; pass
+--no-cache-key to send it without its file_id. Run from the backend
+directory against a server that is already up:
+
+    python benchmarks/load_test.py --url http://localhost:5000 --diagram sample.png \\
+        --concurrency 16 --requests 2000 --json load.json
+
+The same load can be generated in-process through the Flask test client with
+run_suite.py (the 'load' benchmarks).
+"""
+import argparse
+import json
+import mimetypes
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import summarize, write_results
+
+def upload(base_url, path):
+    """Upload a diagram with a multipart POST and return the /upload response"""
+    boundary = uuid.uuid4().hex
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    with open(path, 'rb') as f:
+        data = f.read()
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+            f"filename=\"{os.path.basename(path)}\"\r\nContent-Type: {content_type}\r\n\r\n").encode('utf-8')
+    body += data + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    request = urllib.request.Request(f"{base_url}/upload", data=body, method='POST',
+                                     headers={'Content-Type': f"multipart/form-data; boundary={boundary}"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def build_request(base_url, endpoint, stored, cache_key=True):
+    if endpoint == 'process':
+        payload = {'filepath': stored['filepath']}
+        if cache_key:
+            payload['file_id'] = stored['file_id']
+        return urllib.request.Request(f"{base_url}/process", data=json.dumps(payload).encode('utf-8'),
+                                      method='POST', headers={'Content-Type': 'application/json'})
+    return urllib.request.Request(f"{base_url}/{endpoint.lstrip('/')}", method='GET')
+
+def timed_request(request, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return time.perf_counter() - start, status
+
+def run(base_url, endpoint, stored, concurrency, requests, timeout, cache_key=True):
+    """Send requests with a fixed number in flight; returns latencies (s), error count and wall time"""
+    def worker(_):
+        return timed_request(build_request(base_url, endpoint, stored, cache_key), timeout)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(duration for duration, status in results if status is not None and status < 400)
+    errors = sum(1 for _, status in results if status is None or status >= 400)
+    return latencies, errors, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the Use Case to FR Converter API')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--diagram', help='Diagram to upload and process; without it /health is load tested')
+    parser.add_argument('--endpoint', help='GET endpoint to load test instead of /process, e.g. ready')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=10, help='Requests sent before measuring')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--no-cache-key', action='store_true', help='Send /process requests without the file_id')
+    parser.add_argument('--json', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    stored = None
+    endpoint = args.endpoint or ('process' if args.diagram else 'health')
+    if endpoint == 'process':
+        if not args.diagram:
+            parser.error('--diagram is required to load test /process')
+        stored = upload(base_url, args.diagram)
+
+    cache_key = not args.no_cache_key
+    if args.warmup:
+        run(base_url, endpoint, stored, min(args.concurrency, args.warmup), args.warmup, args.timeout, cache_key)
+    latencies, errors, elapsed = run(base_url, endpoint, stored, args.concurrency, args.requests,
+                                     args.timeout, cache_key)
+
+    print(f"{endpoint}: {args.requests} requests, concurrency {args.concurrency}, {errors} errors")
+    if not latencies:
+        sys.exit("No successful requests")
+    summary = summarize(latencies, throughput=len(latencies) / elapsed, errors=errors,
+                        concurrency=args.concurrency)
+    print(f"{'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print(f"{summary['throughput']:>9.1f} {summary['mean'] * 1000:>9.2f} {summary['p50'] * 1000:>9.2f} "
+          f"{summary['p95'] * 1000:>9.2f} {summary['p99'] * 1000:>9.2f} {summary['max'] * 1000:>9.2f}")
+    if args.json:
+        write_results(args.json, {f"load.http.{endpoint}/c{args.concurrency}": summary})
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Benchmark suite: per-stage microbenchmarks and end-to-end runs, saved as JSON
+
+Groups (all by default, or pick with --only):
+
+    ocr    StandaloneOCR.extract_text on diagram images of several sizes
+    nlp    NLPProcessor.extract_use_case_elements on 1 KB to 1 MB of text
+    fr     FRGenerator.generate_requirements as the FR count grows, per rule set
+    trace  FRGenerator.generate_traceability_matrix as the FR count grows
+    incr   IncrementalGenerator.update after a one-step edit, against a full run
+    e2e    /upload and /process through the Flask test client
+    load   concurrent /process requests through the test client
+
+Every benchmark records p50/p95/p99 latencies in seconds; load also records
+throughput, and every latency summary carries a ~95% confidence interval
+of its p50. Results carry the git commit, so runs of two commits can be
+compared. With --compare, a benchmark is flagged slower or faster only if
+its p50 moved by more than --threshold and the confidence intervals of the
+two runs do not overlap; benchmarks with fewer than --min-runs runs on
+either side are listed but never flagged. The exit status is 1 if anything
+got slower. The default threshold sits above the run-to-run spread seen on
+the nlp and small fr benchmarks (up to about 34%). Groups whose packages
+are missing (Pillow, Flask) are recorded as skipped. Run from the backend
+directory:
+
+    python benchmarks/run_suite.py --output before.json
+    python benchmarks/run_suite.py --output after.json --compare before.json
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from harness import load_results, measure, summarize, write_results
+
+GROUPS = ('ocr', 'nlp', 'fr', 'trace', 'incr', 'e2e', 'load')
+
+IMAGE_SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+TEXT_SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024]
+FR_STEP_COUNTS = [10, 100, 1000, 10000]
+# Rule sets of fr_rules.json; rule-based results keep their original names
+FR_MODEL_TYPES = ('rule-based', 'pattern-matching', 'nlp')
+TRACE_SIZES = [(10, 3), (100, 10), (1000, 50), (10000, 500)]
+E2E_UPLOADS = 20
+LOAD_CONCURRENCY = 8
+LOAD_REQUESTS = 400
+# Fewest runs of each timed benchmark; also the default --min-runs of --compare
+MIN_RUNS = 10
+# Relative p50 change --compare reports by default
+COMPARE_THRESHOLD = 0.35
+
+def size_label(size):
+    return f"{size // (1024 * 1024)}MB" if size >= 1024 * 1024 else f"{size // 1024}KB"
+
+def diagram_png(width, height, seed=0):
+    """A PNG of the sample use case text; seed changes one pixel so each image hashes differently"""
+    from PIL import Image, ImageDraw
+    from pipeline import WARM_UP_TEXT
+
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    for line, text in enumerate(WARM_UP_TEXT.splitlines()):
+        draw.text((10, 10 + line * 14), text, fill='black')
+    image.putpixel((width - 1, height - 1), (seed % 256, seed // 256 % 256, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def bench_ocr(quick, workdir):
+    from standalone_ocr import StandaloneOCR
+
+    ocr = StandaloneOCR()
+    results = {}
+    for width, height in IMAGE_SIZES[:2] if quick else IMAGE_SIZES:
+        path = os.path.join(workdir, f"diagram_{width}x{height}.png")
+        with open(path, 'wb') as f:
+            f.write(diagram_png(width, height))
+        results[f"ocr.standalone/{width}x{height}"] = measure(lambda run: ocr.extract_text(path), min_runs=MIN_RUNS)
+    return results
+
+def bench_nlp(quick, workdir):
+    from bench_section_parser import synthetic_text
+    from nlp_processor import NLPProcessor
+
+    processor = NLPProcessor()
+    results = {}
+    for size in TEXT_SIZES[:3] if quick else TEXT_SIZES:
+        # Alternate two texts so the processor's last-text segmentation is never reused
+        texts = (synthetic_text(size), synthetic_text(size - 1) + ' ')
+        results[f"nlp.extract_use_case_elements/{size_label(size)}"] = measure(
+            lambda run: processor.extract_use_case_elements(texts[run % 2]), min_runs=MIN_RUNS)
+    return results
+
+def elements_with_steps(step_count):
+    from bench_fr_batch import synthetic_elements
+
+    elements = synthetic_elements(1)[0]
+    steps = [step.split('. ', 1)[1] for step in synthetic_elements(step_count // 4 + 1, seed=1)[0]['main_flow']]
+    elements['main_flow'] = [f"{n + 1}. {steps[n % len(steps)]}" for n in range(step_count)]
+    return elements
+
+def bench_fr(quick, workdir):
+    from fr_generator import FRGenerator
+
+    generator = FRGenerator()
+    results = {}
+    for step_count in FR_STEP_COUNTS[:3] if quick else FR_STEP_COUNTS:
+        elements = elements_with_steps(step_count)
+        for model_type in FR_MODEL_TYPES:
+            requirement_count = len(generator.generate_requirements(elements, model_type))
+            summary = measure(lambda run: generator.generate_requirements(elements, model_type), min_runs=MIN_RUNS)
+            summary['requirements'] = requirement_count
+            name = 'fr.generate_requirements' if model_type == 'rule-based' else f"fr.generate_requirements.{model_type}"
+            results[f"{name}/{step_count}_steps"] = summary
+    return results
+
+def bench_trace(quick, workdir):
+    from bench_traceability import synthetic_use_case
+    from fr_generator import FRGenerator
+
+    generator = FRGenerator()
+    results = {}
+    for requirement_count, actor_count in TRACE_SIZES[:3] if quick else TRACE_SIZES:
+        elements, requirements = synthetic_use_case(requirement_count, actor_count)
+        results[f"trace.generate_traceability_matrix/{requirement_count}x{actor_count}"] = measure(
+            lambda run: generator.generate_traceability_matrix(elements, requirements), min_runs=MIN_RUNS)
+    return results
+
+def bench_incr(quick, workdir):
+    from fr_generator import FRGenerator
+    from incremental import IncrementalGenerator
+
+    generator = FRGenerator()
+    incremental = IncrementalGenerator(generator)
+    results = {}
+    for step_count in FR_STEP_COUNTS[:3] if quick else FR_STEP_COUNTS:
+        elements = elements_with_steps(step_count)
+        edited = dict(elements, main_flow=list(elements['main_flow']))
+        middle = step_count // 2
+        edited['main_flow'][middle] = f"{middle + 1}. Customer confirms the revised delivery date"
+        previous = incremental.build(elements)
+
+        def full_run(run):
+            requirements = generator.generate_requirements(edited)
+            generator.generate_traceability_matrix(edited, requirements)
+
+        results[f"incr.full/{step_count}_steps"] = measure(full_run, min_runs=MIN_RUNS)
+        results[f"incr.update_one_step/{step_count}_steps"] = measure(
+            lambda run: incremental.update(previous, edited), min_runs=MIN_RUNS)
+    return results
+
+_app_module = None
+
+def load_app(workdir):
+    """Import app.py with its uploads, cache, project and job DBs inside workdir"""
+    global _app_module
+    if _app_module is None:
+        os.environ['RESULT_CACHE_DIR'] = os.path.join(workdir, 'cache')
+        os.environ['PROJECT_DB'] = os.path.join(workdir, 'projects.db')
+        os.environ['JOB_DB'] = os.path.join(workdir, 'jobs.db')
+        os.chdir(workdir)
+        import app as app_module
+        app_module.warm_up(load_nltk=False)
+        _app_module = app_module
+    return _app_module
+
+def upload(client, data, name='diagram.png'):
+    response = client.post('/upload', data={'file': (io.BytesIO(data), name)},
+                           content_type='multipart/form-data')
+    if response.status_code != 200:
+        raise RuntimeError(f"/upload returned {response.status_code}: {response.get_data(as_text=True)}")
+    return response.get_json()
+
+def process(client, stored):
+    response = client.post('/process', json={'filepath': stored['filepath'], 'file_id': stored['file_id']})
+    if response.status_code != 200:
+        raise RuntimeError(f"/process returned {response.status_code}: {response.get_data(as_text=True)}")
+    return response
+
+def bench_e2e(quick, workdir):
+    app_module = load_app(workdir)
+    client = app_module.app.test_client()
+    count = E2E_UPLOADS // 2 if quick else E2E_UPLOADS
+    images = [diagram_png(1920, 1080, seed) for seed in range(count * 2 + 1)]
+    stored = []
+
+    def timed_upload(run):
+        stored.append(upload(client, images[run]))
+
+    def timed_round_trip(run):
+        process(client, upload(client, images[count + run]))
+
+    # One untimed request first, then new content every run, so /upload
+    # stores a file and /process misses the result cache
+    process(client, upload(client, images[-1]))
+    cold = {'min_runs': count, 'max_runs': count, 'warmup': 0}
+    results = {'e2e.upload/1920x1080': measure(timed_upload, **cold)}
+    results['e2e.process/cold'] = measure(lambda run: process(client, stored[run]), **cold)
+    results['e2e.process/cached'] = measure(lambda run: process(client, stored[0]), min_runs=20)
+    results['e2e.upload_and_process/cold'] = measure(timed_round_trip, **cold)
+    return results
+
+def bench_load(quick, workdir):
+    app_module = load_app(workdir)
+    stored = upload(app_module.app.test_client(), diagram_png(1920, 1080, seed=1 << 15))
+    requests = LOAD_REQUESTS // 4 if quick else LOAD_REQUESTS
+    results = {}
+    for concurrency in (1, LOAD_CONCURRENCY):
+        latencies = []
+        lock = threading.Lock()
+        remaining = [requests]
+
+        def worker():
+            client = app_module.app.test_client()
+            while True:
+                with lock:
+                    if remaining[0] == 0:
+                        return
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                process(client, stored)
+                duration = time.perf_counter() - start
+                with lock:
+                    latencies.append(duration)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        results[f"load.process/c{concurrency}"] = summarize(latencies, throughput=len(latencies) / elapsed,
+                                                           concurrency=concurrency)
+    return results
+
+BENCHMARKS = {
+    'ocr': bench_ocr,
+    'nlp': bench_nlp,
+    'fr': bench_fr,
+    'trace': bench_trace,
+    'incr': bench_incr,
+    'e2e': bench_e2e,
+    'load': bench_load
+}
+
+def print_result(name, result):
+    if 'skipped' in result:
+        print(f"{name:<48} skipped: {result['skipped']}")
+        return
+    throughput = f"{result['throughput']:>9.1f}" if 'throughput' in result else f"{'':>9}"
+    print(f"{name:<48} {result['p50'] * 1000:>10.3f} {result['p95'] * 1000:>10.3f} "
+          f"{result['p99'] * 1000:>10.3f} {result['runs']:>6} {throughput}")
+
+def compare(results, baseline, threshold, min_runs=MIN_RUNS):
+    """
+    Print p50 changes against a baseline run; returns the names that got slower
+
+    A change counts only if it is beyond threshold and the p50 confidence
+    intervals of the two runs are disjoint, so a single lucky or unlucky
+    run cannot flag a benchmark. Results without an interval (written
+    before it was recorded) or with fewer than min_runs runs are printed
+    with '?' and never flagged.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<48} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for name in sorted(set(results) & set(baseline)):
+        old, new = baseline[name], results[name]
+        if 'p50' not in old or 'p50' not in new or not old['p50']:
+            continue
+        change = new['p50'] / old['p50'] - 1
+        flag = ''
+        if min(old['runs'], new['runs']) < min_runs or 'p50_ci' not in old or 'p50_ci' not in new:
+            flag = '  ?'
+        elif change > threshold and new['p50_ci'][0] > old['p50_ci'][1]:
+            flag = '  slower'
+            regressions.append(name)
+        elif change < -threshold and new['p50_ci'][1] < old['p50_ci'][0]:
+            flag = '  faster'
+        print(f"{name:<48} {old['p50'] * 1000:>10.3f} {new['p50'] * 1000:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the backend benchmark suite')
+    parser.add_argument('--only', help=f"Comma-separated groups to run ({', '.join(GROUPS)})")
+    parser.add_argument('--quick', action='store_true', help='Skip the largest sizes')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=COMPARE_THRESHOLD,
+                        help=f"Relative p50 change reported as slower or faster (default {COMPARE_THRESHOLD})")
+    parser.add_argument('--min-runs', type=int, default=MIN_RUNS,
+                        help=f"Fewest runs a benchmark needs on both sides to be flagged (default {MIN_RUNS})")
+    args = parser.parse_args()
+
+    groups = args.only.split(',') if args.only else list(GROUPS)
+    unknown = [group for group in groups if group not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown groups: {', '.join(unknown)}")
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = load_results(args.compare) if args.compare else None
+
+    results = {}
+    print(f"{'benchmark':<48} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'runs':>6} {'req/s':>9}")
+    with tempfile.TemporaryDirectory(prefix='fr-bench-') as workdir:
+        cwd = os.getcwd()
+        try:
+            for group in groups:
+                try:
+                    group_results = BENCHMARKS[group](args.quick, workdir)
+                except ImportError as e:
+                    group_results = {group: {'skipped': str(e)}}
+                for name, result in group_results.items():
+                    print_result(name, result)
+                results.update(group_results)
+        finally:
+            os.chdir(cwd)
+
+    if output:
+        write_results(output, results)
+    if baseline is not None and compare(results, baseline, args.threshold, args.min_runs):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
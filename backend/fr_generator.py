@@ -1,191 +1,220 @@
-import re
+from fr_rules import DEFAULT_RULE_SET, default_engine
+from traceability import TraceabilityIndex
+
+# Flow type as passed to generate_flow_requirements -> its template in the rules file
+FLOW_TEMPLATES = {'Main Flow': 'main_flow', 'Alternative Flow': 'alternative_flows'}
 
 class FRGenerator:
-    def __init__(self):
-        self.fr_templates = {
-            'authentication': [
-                "The system shall {action} for {actor}",
-                "The system shall provide {feature} functionality",
-                "The system shall validate {entity}",
-                "The system shall handle {exception_case}"
-            ],
-            'data_management': [
-                "The system shall store {entity} in {location}",
-                "The system shall retrieve {entity} based on {criteria}",
-                "The system shall update {entity} when {condition}",
-                "The system shall delete {entity} when {condition}"
-            ],
-            'user_interface': [
-                "The system shall display {interface_element} to {actor}",
-                "The system shall provide {navigation} between {screens}",
-                "The system shall validate {input} in {context}"
-            ],
-            'business_logic': [
-                "The system shall process {business_entity} according to {rules}",
-                "The system shall calculate {metric} based on {parameters}",
-                "The system shall enforce {business_rule} for {context}"
-            ]
-        }
+    """
+    Functional requirements and their traceability for a use case
+
+    What is generated is driven by the rules file (see fr_rules.py): the
+    model_type of a call picks one of its rule sets, which decides which
+    actors are users, how flow steps are rewritten and categorized, and the
+    templates every requirement is built from. The rules are compiled once
+    and reloaded when the file changes. The helpers that generate one kind
+    of requirement take an open RuleRun, or use the default rule set.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules or default_engine()
+    
+    def rule_run(self, model_type=DEFAULT_RULE_SET):
+        """A RuleRun for model_type, to pass to the helpers below; close it when done"""
+        return self.rules.run(model_type)
+    
+    def rules_version(self, model_type=DEFAULT_RULE_SET):
+        """Version of the rule set behind model_type; changes whenever its rules do"""
+        return self.rules.version(model_type)
     
     def generate_requirements(self, use_case_elements, model_type='rule-based'):
         """
         Generate functional requirements from use case elements
         """
+        with self.rule_run(model_type) as run:
+            run.prepare(use_case_elements.get('main_flow', []) + use_case_elements.get('alternative_flows', []))
+            requirements = []
+            fr_id = 1
+            
+            # Generate requirements based on actors
+            for actor in use_case_elements.get('actors', []):
+                if run.is_user_actor(actor):
+                    requirements.extend(self.generate_user_requirements(actor, use_case_elements, fr_id, run))
+                    fr_id += 5
+            
+            # Generate requirements from main flow
+            requirements.extend(self.generate_flow_requirements(
+                use_case_elements.get('main_flow', []), 
+                fr_id, 
+                "Main Flow",
+                run
+            ))
+            fr_id += len(use_case_elements.get('main_flow', []))
+            
+            # Generate requirements from alternative flows
+            requirements.extend(self.generate_flow_requirements(
+                use_case_elements.get('alternative_flows', []), 
+                fr_id, 
+                "Alternative Flow",
+                run
+            ))
+            
+            # Generate requirements from preconditions and postconditions
+            requirements.extend(self.generate_condition_requirements(use_case_elements, fr_id + 10, run))
+            
+            return requirements
+    
+    def generate_requirements_batch(self, elements_list, model_type='rule-based'):
+        """
+        Generate functional requirements for many use cases at once
+
+        Returns one requirement list per element set, identical to calling
+        generate_requirements on each. Actors and flow steps are first
+        collected into columns of distinct values across the whole batch,
+        each distinct value is classified once by the rules, and the
+        per-use-case lists are then assembled from those columns.
+        """
+        actor_column = {}
+        step_column = {}
+        for use_case_elements in elements_list:
+            for actor in use_case_elements.get('actors', []):
+                actor_column[actor] = None
+            for step in use_case_elements.get('main_flow', []):
+                step_column[step] = None
+            for step in use_case_elements.get('alternative_flows', []):
+                step_column[step] = None
+        
+        with self.rule_run(model_type) as run:
+            for actor in actor_column:
+                actor_column[actor] = run.is_user_actor(actor)
+            run.prepare(step_column)
+            for step in step_column:
+                step_column[step] = run.step(step)
+            
+            return [self._assemble_requirements(use_case_elements, actor_column, step_column, run)
+                    for use_case_elements in elements_list]
+    
+    def _assemble_requirements(self, use_case_elements, actor_column, step_column, run):
+        """One use case's requirements, built from the classified batch columns"""
         requirements = []
         fr_id = 1
         
-        # Generate requirements based on actors
+        authentication = None
+        interface, authenticate = run.template('actor_interface'), run.template('actor_authentication')
         for actor in use_case_elements.get('actors', []):
-            if self.is_user_actor(actor):
-                requirements.extend(self.generate_user_requirements(actor, use_case_elements, fr_id))
-                fr_id += 5
-        
-        # Generate requirements from main flow
-        requirements.extend(self.generate_flow_requirements(
-            use_case_elements.get('main_flow', []), 
-            fr_id, 
-            "Main Flow"
-        ))
-        fr_id += len(use_case_elements.get('main_flow', []))
-        
-        # Generate requirements from alternative flows
-        requirements.extend(self.generate_flow_requirements(
-            use_case_elements.get('alternative_flows', []), 
-            fr_id, 
-            "Alternative Flow"
-        ))
-        
-        # Generate requirements from preconditions and postconditions
-        requirements.extend(self.generate_condition_requirements(use_case_elements, fr_id + 10))
-        
+            if not actor_column[actor]:
+                continue
+            requirements.append(interface(f"FR-{fr_id:03d}", actor))
+            run.rendered('actor_interface')
+            if authentication is None:
+                authentication = run.authenticates(use_case_elements.get('goal', ''))
+            if authentication:
+                requirements.append(authenticate(f"FR-{fr_id+1:03d}", actor))
+                run.rendered('actor_authentication')
+            fr_id += 5
+        
+        for section in ('main_flow', 'alternative_flows'):
+            steps = use_case_elements.get(section, [])
+            template = run.template(section)
+            for number, step in enumerate(steps, start=1):
+                action, category = step_column[step]
+                requirements.append(template(f"FR-{fr_id+number-1:03d}", number, action, category, step))
+            run.rendered(section, len(steps))
+            if section == 'main_flow':
+                fr_id += len(steps)
+        
+        requirements.extend(self.generate_condition_requirements(use_case_elements, fr_id + 10, run))
         return requirements
     
-    def is_user_actor(self, actor):
+    def is_user_actor(self, actor, run=None):
         """Check if actor is a user type"""
-        user_keywords = ['user', 'customer', 'admin', 'manager', 'operator']
-        return any(keyword in actor.lower() for keyword in user_keywords)
+        if run is None:
+            with self.rule_run() as run:
+                return run.is_user_actor(actor)
+        return run.is_user_actor(actor)
+    
+    def authenticates(self, goal, run=None):
+        """Check if the goal calls for authentication of user actors"""
+        if run is None:
+            with self.rule_run() as run:
+                return run.authenticates(goal)
+        return run.authenticates(goal)
     
-    def generate_user_requirements(self, actor, use_case_elements, start_id):
+    def generate_user_requirements(self, actor, use_case_elements, start_id, run=None):
         """Generate requirements specific to user actors"""
-        requirements = []
+        if run is None:
+            with self.rule_run() as run:
+                return self.generate_user_requirements(actor, use_case_elements, start_id, run)
         
         # Interface requirements
-        requirements.append({
-            'id': f"FR-{start_id:03d}",
-            'title': f"{actor} Interface Access",
-            'description': f"The system shall provide interface access for {actor}",
-            'category': 'User Interface',
-            'priority': 'High'
-        })
+        requirements = [run.template('actor_interface')(f"FR-{start_id:03d}", actor)]
+        run.rendered('actor_interface')
         
         # Authentication requirements if applicable
-        if any(keyword in use_case_elements.get('goal', '').lower() for keyword in ['login', 'authenticate', 'access']):
-            requirements.append({
-                'id': f"FR-{start_id+1:03d}",
-                'title': f"{actor} Authentication",
-                'description': f"The system shall authenticate {actor} credentials",
-                'category': 'Security',
-                'priority': 'High'
-            })
+        if run.authenticates(use_case_elements.get('goal', '')):
+            requirements.append(run.template('actor_authentication')(f"FR-{start_id+1:03d}", actor))
+            run.rendered('actor_authentication')
         
         return requirements
     
-    def generate_flow_requirements(self, flow_steps, start_id, flow_type):
-        """Generate requirements from flow steps"""
+    def generate_flow_requirements(self, flow_steps, start_id, flow_type, run=None, first_number=1):
+        """Generate requirements from flow steps; first_number is the step number of the first one"""
+        if run is None:
+            with self.rule_run() as run:
+                return self.generate_flow_requirements(flow_steps, start_id, flow_type, run, first_number)
+        
+        template_name = FLOW_TEMPLATES[flow_type]
+        template = run.template(template_name)
+        run.prepare(flow_steps)
         requirements = []
-        
         for i, step in enumerate(flow_steps, start=start_id):
-            # Extract action from step
-            action = self.extract_action_from_step(step)
-            
-            requirements.append({
-                'id': f"FR-{i:03d}",
-                'title': f"{flow_type} Step {i-start_id+1}",
-                'description': f"The system shall {action}",
-                'category': self.categorize_step(step),
-                'priority': 'Medium' if flow_type == 'Main Flow' else 'Low'
-            })
-        
+            action, category = run.step(step)
+            requirements.append(template(f"FR-{i:03d}", i - start_id + first_number, action, category, step))
+        run.rendered(template_name, len(requirements))
         return requirements
     
-    def generate_condition_requirements(self, use_case_elements, start_id):
+    def generate_condition_requirements(self, use_case_elements, start_id, run=None):
         """Generate requirements from preconditions and postconditions"""
+        if run is None:
+            with self.rule_run() as run:
+                return self.generate_condition_requirements(use_case_elements, start_id, run)
+        
         requirements = []
         current_id = start_id
-        
-        # Precondition requirements
-        for precondition in use_case_elements.get('preconditions', []):
-            requirements.append({
-                'id': f"FR-{current_id:03d}",
-                'title': "System Precondition",
-                'description': f"The system shall ensure that {precondition}",
-                'category': 'System',
-                'priority': 'High'
-            })
-            current_id += 1
-        
-        # Postcondition requirements
-        for postcondition in use_case_elements.get('postconditions', []):
-            requirements.append({
-                'id': f"FR-{current_id:03d}",
-                'title': "System Postcondition",
-                'description': f"The system shall achieve {postcondition}",
-                'category': 'System',
-                'priority': 'High'
-            })
-            current_id += 1
+        for section in ('preconditions', 'postconditions'):
+            conditions = use_case_elements.get(section, [])
+            template = run.template(section)
+            for condition in conditions:
+                requirements.append(template(f"FR-{current_id:03d}", condition))
+                current_id += 1
+            run.rendered(section, len(conditions))
         
         return requirements
     
-    def extract_action_from_step(self, step):
+    def extract_action_from_step(self, step, run=None):
         """Extract the main action from a flow step"""
-        # Remove step numbers
-        clean_step = re.sub(r'^\d+\.\s*', '', step)
-        
-        # Convert to system perspective
-        if 'user' in clean_step.lower():
-            clean_step = clean_step.replace('user', 'allow user to')
-        
-        return clean_step.lower()
+        if run is None:
+            with self.rule_run() as run:
+                return run.action(step)
+        return run.action(step)
     
-    def categorize_step(self, step):
+    def categorize_step(self, step, run=None):
         """Categorize step based on content"""
-        step_lower = step.lower()
-        
-        if any(word in step_lower for word in ['validate', 'verify', 'check']):
-            return 'Validation'
-        elif any(word in step_lower for word in ['display', 'show', 'present']):
-            return 'User Interface'
-        elif any(word in step_lower for word in ['store', 'save', 'retrieve', 'update']):
-            return 'Data Management'
-        elif any(word in step_lower for word in ['calculate', 'process', 'compute']):
-            return 'Business Logic'
-        else:
-            return 'General'
+        if run is None:
+            with self.rule_run() as run:
+                return run.category(step)
+        return run.category(step)
     
     def generate_traceability_matrix(self, use_case_elements, functional_requirements):
         """Generate traceability matrix between use case and requirements"""
         matrix = []
         
-        # Map requirements to use case elements
+        # Name words, goal words and actors are indexed once for the use case,
+        # then each requirement description is matched against all of them in one pass
+        index = TraceabilityIndex(use_case_elements)
+        
         for requirement in functional_requirements:
-            # Simple mapping based on content analysis
-            mapped_elements = []
-            
-            # Check against use case name
-            if any(word in requirement['description'].lower() 
-                   for word in use_case_elements.get('use_case_name', '').lower().split()):
-                mapped_elements.append('Use Case Name')
-            
-            # Check against goal
-            if any(word in requirement['description'].lower() 
-                   for word in use_case_elements.get('goal', '').lower().split()):
-                mapped_elements.append('Goal')
-            
-            # Check against actors
-            for actor in use_case_elements.get('actors', []):
-                if actor.lower() in requirement['description'].lower():
-                    mapped_elements.append(f'Actor: {actor}')
+            mapped_elements = index.mapped_elements(requirement['description'])
             
             matrix.append({
                 'requirement_id': requirement['id'],
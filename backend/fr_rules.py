@@ -0,0 +1,604 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import string
+import threading
+import time
+
+from pos_tagging import shared_tagger
+from structured_logging import get_logger, log_event
+
+logger = get_logger('fr_rules')
+
+# Rule sets and requirement templates for FR generation; picked up again when the file changes
+FR_RULES_PATH = os.environ.get('FR_RULES_PATH',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fr_rules.json'))
+# Seconds between checks of the rules file for changes; 0 checks on every call
+FR_RULES_RELOAD_INTERVAL = float(os.environ.get('FR_RULES_RELOAD_INTERVAL', 2))
+# One rule evaluation in this many is timed for the per-rule timings
+FR_RULE_TIMING_SAMPLE = max(1, int(os.environ.get('FR_RULE_TIMING_SAMPLE', 16)))
+
+# Rule set used for model types the rules file does not define
+DEFAULT_RULE_SET = 'rule-based'
+
+STEP_NUMBER_PATTERN = re.compile(r'^\d+\.\s*')
+
+# Fields each template can use, in the order the compiled template takes them
+TEMPLATE_FIELDS = {
+    'actor_interface': ('actor',),
+    'actor_authentication': ('actor',),
+    'main_flow': ('number', 'action', 'category', 'step'),
+    'alternative_flows': ('number', 'action', 'category', 'step'),
+    'preconditions': ('condition',),
+    'postconditions': ('condition',)
+}
+REQUIREMENT_FIELDS = ('title', 'description', 'category', 'priority')
+RULE_SET_KEYS = {'description', 'extends', 'user_actor', 'authentication_goal', 'action_extractor',
+                 'action_rewrites', 'step_categories', 'default_category', 'templates'}
+# Values of action_extractor: 'pos' takes the action from the verb phrase of a POS-tagged step (pos_tagging.py)
+ACTION_EXTRACTORS = {'pos'}
+MATCHER_KEYS = {'keywords', 'words', 'pattern'}
+WORD = re.compile(r'\w+')
+# Kinds of action rewrite: a plain substring, a regex anchored at the start, any other regex
+LITERAL, ANCHORED, PATTERN = 0, 1, 2
+FORMAT_SPEC = re.compile(r'[\w.,<>^=+\- #%]*')
+
+class RuleConfigError(Exception):
+    """Raised when the rules file cannot be read or a rule set in it is invalid"""
+
+def inflections(lemma):
+    """The forms of a verb lemma a 'words' rule matches: lemma, -s, -es, -ed, -ing and their spelling changes"""
+    forms = {lemma, lemma + 's', lemma + 'es', lemma + 'ed', lemma + 'ing'}
+    if lemma.endswith('e'):
+        forms.update((lemma + 'd', lemma[:-1] + 'ing'))
+    if len(lemma) > 1 and lemma.endswith('y') and lemma[-2] not in 'aeiou':
+        forms.update((lemma[:-1] + 'ies', lemma[:-1] + 'ied'))
+    if (len(lemma) > 2 and lemma[-1] in 'bdglmnprt' and lemma[-2] in 'aeiou' and
+            lemma[-3] not in 'aeiou'):
+        forms.update((lemma + lemma[-1] + 'ed', lemma + lemma[-1] + 'ing'))
+    return forms
+
+def _matcher_condition(spec, where, constants):
+    """
+    Python expression over text (lowercased) that is true when a matcher spec matches
+
+    keywords match anywhere in the text and become plain substring tests;
+    words match whole words in any inflected form and are looked up in the
+    list of words of the text; pattern is a regular expression whose
+    search method is added to constants. A spec may combine all three.
+    """
+    if not isinstance(spec, dict) or not spec.keys() & MATCHER_KEYS:
+        raise RuleConfigError(f"{where}: needs keywords, words or pattern")
+    unknown = set(spec) - MATCHER_KEYS - {'name', 'category'}
+    if unknown:
+        raise RuleConfigError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+
+    keywords, words = spec.get('keywords', []), spec.get('words', [])
+    if not all(isinstance(value, list) and all(isinstance(item, str) for item in value)
+               for value in (keywords, words)):
+        raise RuleConfigError(f"{where}: keywords and words must be lists of strings")
+    tests = [f"{keyword.lower()!r} in text" for keyword in keywords]
+    alternatives = []
+    forms = {form for word in words for form in inflections(word.lower())}
+    if forms and all(WORD.fullmatch(form) for form in forms):
+        # Single words are looked up among the words of the text, split once per call
+        name = f"_forms{len(constants)}"
+        constants[name] = frozenset(forms)
+        constants['_words'] = WORD.findall
+        tests.append(f"not {name}.isdisjoint(words)")
+    elif forms:
+        alternatives.append(r'\b(?:' + '|'.join(re.escape(form) for form in
+                                                 sorted(forms, key=lambda form: (-len(form), form))) + r')\b')
+    if spec.get('pattern'):
+        alternatives.append(spec['pattern'])
+    if alternatives:
+        try:
+            pattern = re.compile('|'.join(f'(?:{alternative})' for alternative in alternatives))
+        except re.error as e:
+            raise RuleConfigError(f"{where}: invalid pattern: {e}")
+        name = f"_search{len(constants)}"
+        constants[name] = pattern.search
+        tests.append(f"{name}(text) is not None")
+    if not tests:
+        raise RuleConfigError(f"{where}: keywords, words and pattern are all empty")
+    return ' or '.join(tests)
+
+def _compile_predicate(name, conditions, constants, results=None):
+    """
+    Compile a function name(text) testing conditions in order
+
+    It returns results[i] for the first condition that holds and
+    results[-1] if none does; without results, whether any holds.
+    """
+    lines = [f"def {name}(text):"]
+    if '_words' in constants:
+        lines.append("    words = _words(text)")
+    if results is None:
+        lines.append(f"    return {' or '.join(f'({condition})' for condition in conditions)}")
+    else:
+        for condition, result in zip(conditions, results):
+            lines.append(f"    if {condition}:\n        return {result!r}")
+        lines.append(f"    return {results[-1]!r}")
+    namespace = dict(constants, __builtins__={})
+    exec(compile('\n'.join(lines) + '\n', f'<rules {name}>', 'exec'), namespace)
+    return namespace[name]
+
+def _fstring(where, text, fields):
+    """Source of an f-string over fields equivalent to the format string text"""
+    if not isinstance(text, str):
+        raise RuleConfigError(f"{where}: missing")
+    try:
+        parsed = list(string.Formatter().parse(text))
+    except ValueError as e:
+        raise RuleConfigError(f"{where}: {e}")
+    body = []
+    for literal, field, format_spec, conversion in parsed:
+        body.append(literal.replace('{', '{{').replace('}', '}}'))
+        if field is None:
+            continue
+        if field not in fields:
+            raise RuleConfigError(f"{where}: unknown field {{{field}}}; available: {', '.join(fields)}")
+        if conversion not in (None, 's', 'r', 'a') or not FORMAT_SPEC.fullmatch(format_spec or ''):
+            raise RuleConfigError(f"{where}: unsupported format in {{{field}}}")
+        body.append('{' + field + (f'!{conversion}' if conversion else '') +
+                    (f':{format_spec}' if format_spec else '') + '}')
+    return f"f{''.join(body)!r}"
+
+def _compile(source, name):
+    return eval(compile(source, f'<template {name}>', 'eval'), {'__builtins__': {}})
+
+def _compile_template(name, spec):
+    """
+    Requirement builder for one template: (id, *TEMPLATE_FIELDS[name]) -> requirement dict
+
+    Each of title, description, category and priority becomes an f-string
+    over the template's fields, and all four are compiled into a single
+    function, so rendering a requirement is one call with no format string
+    parsing. Only the template's own field names, with a plain format spec,
+    are accepted.
+    """
+    fields = TEMPLATE_FIELDS[name]
+    if not isinstance(spec, dict):
+        raise RuleConfigError(f"templates.{name}: must be an object")
+    unknown = set(spec) - set(REQUIREMENT_FIELDS)
+    if unknown:
+        raise RuleConfigError(f"templates.{name}: unknown keys {', '.join(sorted(unknown))}")
+
+    entries = ["'id': id"]
+    for key in REQUIREMENT_FIELDS:
+        text = spec.get(key, '{category}' if key == 'category' and 'category' in fields else None)
+        entries.append(f"{key!r}: {_fstring(f'templates.{name}.{key}', text, fields)}")
+    return _compile(f"lambda id, {', '.join(fields)}: {{{', '.join(entries)}}}", name)
+
+def _compile_step_title(name, spec):
+    """
+    Title builder (number) -> title for a flow template
+
+    Flow step titles may only use the step number: incremental updates
+    retitle steps that moved without regenerating them.
+    """
+    source = _fstring(f'templates.{name}.title', spec.get('title'), ('number',))
+    return _compile(f"lambda number: {source}", name)
+
+def resolve_rule_sets(config):
+    """Every rule set of a parsed rules file with its extends chain merged in (templates merge per template)"""
+    if not isinstance(config, dict) or not isinstance(config.get('rule_sets'), dict):
+        raise RuleConfigError("The rules file needs a rule_sets object")
+    raw = config['rule_sets']
+
+    resolved = {}
+    def resolve(name, chain):
+        if name in resolved:
+            return resolved[name]
+        if name in chain:
+            raise RuleConfigError(f"rule_sets: extends cycle {' -> '.join(chain + (name,))}")
+        spec = raw.get(name)
+        if not isinstance(spec, dict):
+            raise RuleConfigError(f"rule_sets: {name!r} is not defined" if spec is None else
+                                  f"rule_sets.{name}: must be an object")
+        unknown = set(spec) - RULE_SET_KEYS
+        if unknown:
+            raise RuleConfigError(f"rule_sets.{name}: unknown keys {', '.join(sorted(unknown))}")
+        merged = {}
+        if spec.get('extends'):
+            merged = dict(resolve(spec['extends'], chain + (name,)))
+            merged['templates'] = dict(merged.get('templates', {}))
+        for key, value in spec.items():
+            if key == 'templates':
+                if not isinstance(value, dict):
+                    raise RuleConfigError(f"rule_sets.{name}.templates: must be an object")
+                merged.setdefault('templates', {}).update(value)
+            elif key != 'extends':
+                merged[key] = value
+        resolved[name] = merged
+        return merged
+
+    for name in raw:
+        resolve(name, ())
+    if DEFAULT_RULE_SET not in resolved:
+        raise RuleConfigError(f"rule_sets: the default rule set {DEFAULT_RULE_SET!r} is missing")
+    return resolved
+
+def _apply_rewrite(kind, matcher, replacement, text):
+    """(text, fired) after one action rewrite"""
+    if kind == LITERAL:
+        if matcher in text:
+            return text.replace(matcher, replacement), True
+        return text, False
+    if kind == ANCHORED:
+        match = matcher(text)
+        if match is None:
+            return text, False
+        return match.expand(replacement) + text[match.end():], True
+    text, count = matcher(replacement, text)
+    return text, count > 0
+
+class CompiledRuleSet:
+    """
+    One rule set of the rules file, compiled for FR generation
+
+    The matchers are compiled into Python functions: keyword rules become
+    substring tests and the regular expressions of pattern and words rules
+    are compiled once. All step category rules are folded into a single
+    function, classify(text), testing the rules in priority order and
+    returning the position of the first that matches (-1 for none), as the
+    per-category keyword loops it replaces did. Literal rewrites become
+    str.replace, and rewrites anchored at the start a single match.
+    Templates are compiled into requirement builders (see
+    _compile_template), and the titles of the flow templates also on their
+    own, for retitling moved steps. With an action_extractor, the rewrites
+    only apply to steps it finds no verb phrase in.
+
+    rule_ids names every rule for the hit counters and timings:
+    actor.user, goal.authentication, action.<extractor>, rewrite.<name>,
+    category.<name>, category.default and template.<name>.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.description = spec.get('description', '')
+        self.version = hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        self.rule_ids = ['actor.user', 'goal.authentication']
+
+        for attribute, key in (('is_user_actor', 'user_actor'), ('authenticates', 'authentication_goal')):
+            constants = {}
+            condition = _matcher_condition(spec.get(key), f"{name}.{key}", constants)
+            setattr(self, attribute, _compile_predicate(attribute, [condition], constants))
+
+        self.extractor_rule = None
+        extractor = spec.get('action_extractor')
+        if extractor is not None:
+            if extractor not in ACTION_EXTRACTORS:
+                raise RuleConfigError(f"{name}.action_extractor: must be one of {', '.join(sorted(ACTION_EXTRACTORS))}")
+            self.extractor_rule = len(self.rule_ids)
+            self.rule_ids.append(f"action.{extractor}")
+
+        # (rule, kind, matcher, replacement); see _apply_rewrite
+        self.rewrites = []
+        for position, rewrite in enumerate(spec.get('action_rewrites', [])):
+            where = f"{name}.action_rewrites[{position}]"
+            if not isinstance(rewrite, dict) or not rewrite.get('name') or not rewrite.get('pattern'):
+                raise RuleConfigError(f"{where}: needs a name and a pattern")
+            source, replacement = rewrite['pattern'], rewrite.get('replacement', '')
+            flags = re.IGNORECASE if rewrite.get('ignore_case') else 0
+            try:
+                pattern = re.compile(source, flags)
+                pattern.sub(replacement, '')
+            except re.error as e:
+                raise RuleConfigError(f"{where}: {e}")
+            if not flags and re.escape(source) == source and '\\' not in replacement:
+                self.rewrites.append((len(self.rule_ids), LITERAL, source, replacement))
+            elif source.startswith('^') and not pattern.flags & re.MULTILINE:
+                self.rewrites.append((len(self.rule_ids), ANCHORED, pattern.match, replacement))
+            else:
+                self.rewrites.append((len(self.rule_ids), PATTERN, pattern.subn, replacement))
+            self.rule_ids.append(f"rewrite.{rewrite['name']}")
+
+        categories = spec.get('step_categories', [])
+        if not isinstance(categories, list):
+            raise RuleConfigError(f"{name}.step_categories: must be a list")
+        constants = {}
+        conditions = []
+        self.categories = []
+        self.category_rules = []
+        for position, rule in enumerate(categories):
+            where = f"{name}.step_categories[{position}]"
+            if not isinstance(rule, dict) or not rule.get('name') or not rule.get('category'):
+                raise RuleConfigError(f"{where}: needs a name and a category")
+            conditions.append(_matcher_condition(rule, where, constants))
+            self.categories.append(rule['category'])
+            self.category_rules.append(len(self.rule_ids))
+            self.rule_ids.append(f"category.{rule['name']}")
+        self.classify = _compile_predicate('classify', conditions, constants, list(range(len(conditions))) + [-1])
+        self.default_category = spec.get('default_category', 'General')
+        self.categories.append(self.default_category)
+        self.category_rules.append(len(self.rule_ids))
+        self.rule_ids.append('category.default')
+
+        templates = spec.get('templates', {})
+        missing = set(TEMPLATE_FIELDS) - set(templates)
+        if missing:
+            raise RuleConfigError(f"{name}.templates: missing {', '.join(sorted(missing))}")
+        unknown = set(templates) - set(TEMPLATE_FIELDS)
+        if unknown:
+            raise RuleConfigError(f"{name}.templates: unknown templates {', '.join(sorted(unknown))}")
+        self.templates = {}
+        self.step_titles = {}
+        self.template_rules = {}
+        for template_name in TEMPLATE_FIELDS:
+            self.templates[template_name] = _compile_template(template_name, templates[template_name])
+            if 'number' in TEMPLATE_FIELDS[template_name]:
+                self.step_titles[template_name] = _compile_step_title(template_name, templates[template_name])
+            self.template_rules[template_name] = len(self.rule_ids)
+            self.rule_ids.append(f"template.{template_name}")
+
+class RuleRun:
+    """
+    Rule evaluation for one generation call, with its own hit counts
+
+    Counts and sampled timings are kept here without locking and merged into
+    the engine's totals once, by close(). Every FR_RULE_TIMING_SAMPLE-th
+    evaluation of a rule kind is timed and attributed to the rule that
+    fired.
+    """
+
+    __slots__ = ('rules', 'hits', 'timed', 'seconds', '_engine', '_countdown', '_phrases')
+
+    def __init__(self, engine, rules):
+        self._engine = engine
+        self.rules = rules
+        self.hits = [0] * len(rules.rule_ids)
+        self.timed = [0] * len(rules.rule_ids)
+        self.seconds = [0.0] * len(rules.rule_ids)
+        self._countdown = 1
+        self._phrases = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._engine is not None:
+            self._engine._record(self)
+            self._engine = None
+
+    def _sample(self):
+        """True for the evaluations that are timed"""
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        self._countdown = FR_RULE_TIMING_SAMPLE if self._engine is None else self._engine.timing_sample
+        return True
+
+    def is_user_actor(self, actor):
+        return self._match(0, self.rules.is_user_actor, actor)
+
+    def authenticates(self, goal):
+        return self._match(1, self.rules.authenticates, goal)
+
+    def _match(self, rule, matcher, text):
+        start = time.perf_counter() if self._sample() else None
+        found = matcher(text.lower())
+        if found:
+            self.hits[rule] += 1
+            if start is not None:
+                self.timed[rule] += 1
+                self.seconds[rule] += time.perf_counter() - start
+        return found
+
+    def prepare(self, steps):
+        """
+        Tag the flow steps about to be generated in one batch
+
+        Only rule sets with an action_extractor need this; for them, steps
+        not prepared are tagged one at a time by step().
+        """
+        if self.rules.extractor_rule is None:
+            return
+        steps = [step for step in dict.fromkeys(steps) if step not in self._phrases]
+        if steps:
+            phrases = shared_tagger().analyze([STEP_NUMBER_PATTERN.sub('', step) for step in steps])
+            self._phrases.update(zip(steps, phrases))
+
+    def _phrase(self, step, text):
+        try:
+            return self._phrases[step]
+        except KeyError:
+            phrase = self._phrases[step] = shared_tagger().analyze([text])[0]
+            return phrase
+
+    def action(self, step):
+        """The step from the system's perspective: without its number, rewritten and lowercased"""
+        return self.step(step)[0]
+
+    def category(self, step):
+        """Category of the first step category rule matching the step, or the default"""
+        return self.step(step)[1]
+
+    def step(self, step):
+        """(action, category) of a flow step"""
+        self._countdown -= 1
+        if not self._countdown:
+            self._countdown = FR_RULE_TIMING_SAMPLE if self._engine is None else self._engine.timing_sample
+            return self._timed_step(step)
+        rules, hits = self.rules, self.hits
+        action = STEP_NUMBER_PATTERN.sub('', step)
+        phrase = None if rules.extractor_rule is None else self._phrase(step, action)
+        if phrase is not None:
+            action = phrase.action()
+            hits[rules.extractor_rule] += 1
+        else:
+            for rule, kind, matcher, replacement in rules.rewrites:
+                action, fired = _apply_rewrite(kind, matcher, replacement, action)
+                if fired:
+                    hits[rule] += 1
+        # -1 (no rule matched) picks the default, which comes last
+        position = rules.classify(step.lower())
+        hits[rules.category_rules[position]] += 1
+        return action.lower(), rules.categories[position]
+
+    def _timed_step(self, step):
+        """step() with every rule that fires timed"""
+        rules, hits, timed, seconds = self.rules, self.hits, self.timed, self.seconds
+        action = STEP_NUMBER_PATTERN.sub('', step)
+        phrase = None
+        if rules.extractor_rule is not None:
+            start = time.perf_counter()
+            phrase = self._phrase(step, action)
+            if phrase is not None:
+                action = phrase.action()
+                rule = rules.extractor_rule
+                hits[rule] += 1
+                timed[rule] += 1
+                seconds[rule] += time.perf_counter() - start
+        for rule, kind, matcher, replacement in rules.rewrites if phrase is None else ():
+            start = time.perf_counter()
+            action, fired = _apply_rewrite(kind, matcher, replacement, action)
+            if fired:
+                hits[rule] += 1
+                timed[rule] += 1
+                seconds[rule] += time.perf_counter() - start
+        start = time.perf_counter()
+        position = rules.classify(step.lower())
+        rule = rules.category_rules[position]
+        hits[rule] += 1
+        timed[rule] += 1
+        seconds[rule] += time.perf_counter() - start
+        return action.lower(), rules.categories[position]
+
+    def template(self, name):
+        """The compiled requirement builder of a template; report what it built with rendered()"""
+        return self.rules.templates[name]
+
+    def rendered(self, name, count=1):
+        """Count requirements built with a template"""
+        self.hits[self.rules.template_rules[name]] += count
+
+class RuleEngine:
+    """
+    The rule sets of a rules file, compiled once and reloaded when the file changes
+
+    model_type names a rule set; unknown names get DEFAULT_RULE_SET. The
+    file is checked for changes at most every reload_interval seconds. A
+    change that does not load (bad JSON, an invalid rule) is logged and the
+    rules already loaded stay in use, so a typo cannot take generation down.
+    Hit counts and timings are kept per rule set and rule across reloads.
+    """
+
+    def __init__(self, path=FR_RULES_PATH, reload_interval=FR_RULES_RELOAD_INTERVAL,
+                 timing_sample=FR_RULE_TIMING_SAMPLE):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.timing_sample = timing_sample
+        self._lock = threading.Lock()
+        self._rule_sets = {}
+        self._signature = None
+        self._next_check = 0.0
+        self._stats = {}
+        self._reloads = 0
+        self._loaded_at = None
+        self._last_error = None
+        self.reload()
+
+    def rule_set(self, model_type=DEFAULT_RULE_SET):
+        self._check_for_changes()
+        rule_sets = self._rule_sets
+        return rule_sets.get(model_type) or rule_sets[DEFAULT_RULE_SET]
+
+    def run(self, model_type=DEFAULT_RULE_SET):
+        """A RuleRun over the rule set for model_type; close it (or use it as a context manager) when done"""
+        return RuleRun(self, self.rule_set(model_type))
+
+    def version(self, model_type=DEFAULT_RULE_SET):
+        """Hash of the rule set used for model_type, for cache keys"""
+        return self.rule_set(model_type).version
+
+    def names(self):
+        return list(self._rule_sets)
+
+    def reload(self):
+        """Load and compile the rules file now; raises RuleConfigError and keeps the old rules if it is invalid"""
+        with self._lock:
+            signature = self._file_signature()
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                raise RuleConfigError(f"Cannot read {self.path}: {e}")
+            rule_sets = {name: CompiledRuleSet(name, spec) for name, spec in resolve_rule_sets(config).items()}
+            self._rule_sets = rule_sets
+            self._signature = signature
+            self._loaded_at = time.time()
+            self._last_error = None
+            self._reloads += 1
+        log_event(logger, logging.INFO, 'fr_rules_loaded', path=self.path, rule_sets=','.join(rule_sets))
+        return self.names()
+
+    def stats(self):
+        """Per rule set: its version and, per rule, hits and the mean of the sampled timings"""
+        with self._lock:
+            totals = {key: list(values) for key, values in self._stats.items()}
+            rule_sets = dict(self._rule_sets)
+            info = {'path': self.path, 'loaded_at': self._loaded_at, 'loads': self._reloads,
+                    'last_error': self._last_error, 'timing_sample': self.timing_sample}
+        info['rule_sets'] = {}
+        for name, rules in rule_sets.items():
+            rule_stats = {}
+            for rule in rules.rule_ids:
+                hits, timed, seconds = totals.get((name, rule), (0, 0, 0.0))
+                rule_stats[rule] = {'hits': hits, 'timed': timed, 'seconds': seconds,
+                                    'mean_seconds': seconds / timed if timed else None}
+            info['rule_sets'][name] = {'version': rules.version, 'description': rules.description,
+                                       'rules': rule_stats}
+        return info
+
+    def _record(self, run):
+        name = run.rules.name
+        with self._lock:
+            for rule, hits, timed, seconds in zip(run.rules.rule_ids, run.hits, run.timed, run.seconds):
+                if hits:
+                    totals = self._stats.get((name, rule))
+                    if totals is None:
+                        totals = self._stats[(name, rule)] = [0, 0, 0.0]
+                    totals[0] += hits
+                    totals[1] += timed
+                    totals[2] += seconds
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_for_changes(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return
+        try:
+            self.reload()
+        except RuleConfigError as e:
+            with self._lock:
+                # Not retried until the file changes again
+                self._signature = signature
+                self._last_error = str(e)
+            log_event(logger, logging.ERROR, 'fr_rules_reload_failed', path=self.path, error=str(e))
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+def default_engine():
+    """The process-wide RuleEngine over FR_RULES_PATH, shared by every FRGenerator that is not given one"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = RuleEngine()
+        return _default_engine
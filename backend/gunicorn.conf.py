@@ -0,0 +1,49 @@
+"""
+Gunicorn settings for serving the backend in production
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Settings come from the environment:
+
+    BIND            address to listen on (0.0.0.0:5000)
+    WEB_WORKERS     worker processes (one per CPU)
+    WEB_THREADS     threads per worker (4)
+    WEB_TIMEOUT     seconds before a stuck worker is restarted (300)
+    WORKER_CLASS    gunicorn worker class (gthread)
+
+The app is preloaded in the master and warmed up there (see wsgi.py), then
+the garbage collector's view of that state is frozen so reference counting
+in the workers does not copy the shared pages back out.
+
+Async jobs (/process?async=1) run in the worker that accepted them; their
+states and results are written to JOB_DB (jobs.db), so any worker can
+answer /jobs/<id> and /jobs/<id>/result. Every worker must see the same
+JOB_DB file.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = os.environ.get('WORKER_CLASS', 'gthread')
+timeout = int(os.environ.get('WEB_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+
+# Application logs are logfmt on stderr already; keep gunicorn's next to them
+accesslog = '-'
+errorlog = '-'
+
+# Each worker has its own job and batch pools, so split the CPUs between them
+# instead of starting one pool process per CPU in every worker
+os.environ.setdefault('JOB_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    gc.freeze()
+
+def post_fork(server, worker):
+    server.log.info("Worker %s forked with %s frozen objects", worker.pid, gc.get_freeze_count())
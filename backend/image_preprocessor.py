@@ -0,0 +1,219 @@
+import time
+
+from PIL import Image, ImageOps
+
+from image_source import load_image
+
+DEFAULT_OPTIONS = {
+    'grayscale': True,
+    'binarize': True,
+    'threshold': None,          # None picks a threshold with Otsu's method
+    'target_dpi': 300,          # scanned input above this DPI is scaled down to it
+    'max_dimension': 2400,      # longest side after downscaling, in pixels
+    'crop_margins': True,
+    'margin_padding': 8,
+    'detect_regions': True,
+    'region_gap': 12,           # blank rows needed between two text regions
+    'region_padding': 6,
+    'min_region_height': 6,
+    'max_regions': 12
+}
+
+def otsu_threshold(gray):
+    """Otsu's threshold computed from the histogram of an 'L' image"""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+
+    background_weight = 0
+    background_sum = 0
+    best_threshold = 127
+    best_variance = -1.0
+    for level, count in enumerate(histogram):
+        background_weight += count
+        if background_weight == 0:
+            continue
+        foreground_weight = total - background_weight
+        if foreground_weight == 0:
+            break
+        background_sum += level * count
+        background_mean = background_sum / background_weight
+        foreground_mean = (weighted_total - background_sum) / foreground_weight
+        variance = background_weight * foreground_weight * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = level
+    return best_threshold
+
+class ImagePreprocessor:
+    """
+    Prepares images for Tesseract
+
+    Converts to grayscale, normalizes resolution, binarizes, crops blank
+    margins and splits the page into horizontal text regions so that only
+    regions containing ink are OCR'd. Every stage can be switched off through
+    the options, and the time spent in each stage is reported.
+    """
+
+    def __init__(self, **options):
+        self.options = dict(DEFAULT_OPTIONS)
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown preprocessing options: {', '.join(sorted(unknown))}")
+        self.options.update(options)
+
+    def process(self, image):
+        """
+        Return (regions, timings)
+
+        regions is a list of images in reading order (top to bottom); it holds
+        the whole prepared page when region detection is off or finds nothing.
+        """
+        options = self.options
+        timings = {}
+
+        start = time.perf_counter()
+        if self.grayscale:
+            image = ImageOps.grayscale(image) if image.mode != 'L' else image
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        timings['grayscale'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        image = self._downscale(image)
+        timings['downscale'] = time.perf_counter() - start
+
+        ink = None
+        if options['binarize']:
+            start = time.perf_counter()
+            image, ink = self._binarize(image)
+            timings['binarize'] = time.perf_counter() - start
+
+        if options['crop_margins'] and ink is not None:
+            start = time.perf_counter()
+            image, ink = self._crop_margins(image, ink)
+            timings['crop'] = time.perf_counter() - start
+
+        regions = [image]
+        if options['detect_regions'] and ink is not None:
+            start = time.perf_counter()
+            regions = self._text_regions(image, ink) or [image]
+            timings['regions'] = time.perf_counter() - start
+
+        return regions, timings
+
+    def load(self, path):
+        """
+        Decode an image file for process()
+
+        The file is memory-mapped, and JPEGs are decoded straight to
+        grayscale and close to the downscaled size when the options call for
+        it (see image_source.py), so no full-size color copy is made.
+        """
+        return load_image(path, 'L' if self.grayscale else None, self._scale)
+
+    @property
+    def grayscale(self):
+        """True if process() converts images to grayscale, so they can be decoded that way"""
+        return self.options['grayscale'] or self.options['binarize']
+
+    def _scale(self, image):
+        """Factor the downscale stage shrinks an image by (1.0 if it is left as is)"""
+        width, height = image.size
+        scale = 1.0
+
+        dpi = image.info.get('dpi')
+        if dpi and self.options['target_dpi'] and dpi[0] and dpi[0] > self.options['target_dpi']:
+            scale = self.options['target_dpi'] / float(dpi[0])
+
+        max_dimension = self.options['max_dimension']
+        if max_dimension and max(width, height) * scale > max_dimension:
+            scale = max_dimension / float(max(width, height))
+        return min(scale, 1.0)
+
+    def _downscale(self, image):
+        width, height = image.size
+        scale = self._scale(image)
+        if scale >= 1.0:
+            return image
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return image.resize(size, Image.LANCZOS)
+
+    def _binarize(self, gray):
+        """
+        Return (binary, ink): black text on white, plus an ink mask where text pixels are 255
+        """
+        threshold = self.options['threshold']
+        if threshold is None:
+            threshold = otsu_threshold(gray)
+
+        # Light text on a dark background is inverted so text always ends up black
+        dark_background = sum(gray.resize((1, 1), Image.BOX).getdata()) < 128
+        if dark_background:
+            ink = gray.point(lambda level: 255 if level > threshold else 0)
+        else:
+            ink = gray.point(lambda level: 0 if level > threshold else 255)
+        return ImageOps.invert(ink), ink
+
+    def _crop_margins(self, image, ink):
+        bbox = ink.getbbox()
+        if bbox is None:
+            return image, ink
+        padding = self.options['margin_padding']
+        width, height = image.size
+        left, top, right, bottom = bbox
+        box = (max(0, left - padding), max(0, top - padding),
+               min(width, right + padding), min(height, bottom + padding))
+        return image.crop(box), ink.crop(box)
+
+    def _text_regions(self, image, ink):
+        """
+        Split the page into bands of rows containing ink, separated by blank gaps
+
+        Uses the horizontal projection profile (mean ink per row), then trims
+        each band to its own bounding box.
+        """
+        width, height = image.size
+        row_ink = list(ink.resize((1, height), Image.BOX).getdata())
+
+        bands = []
+        band_start = None
+        blank_rows = 0
+        for row, level in enumerate(row_ink):
+            if level > 0:
+                if band_start is None:
+                    band_start = row
+                blank_rows = 0
+            elif band_start is not None:
+                blank_rows += 1
+                if blank_rows >= self.options['region_gap']:
+                    bands.append((band_start, row - blank_rows + 1))
+                    band_start = None
+                    blank_rows = 0
+        if band_start is not None:
+            bands.append((band_start, height - blank_rows))
+
+        bands = [band for band in bands if band[1] - band[0] >= self.options['min_region_height']]
+        bands = self._merge_bands(bands)
+
+        padding = self.options['region_padding']
+        regions = []
+        for top, bottom in bands:
+            band_ink = ink.crop((0, top, width, bottom))
+            bbox = band_ink.getbbox()
+            if bbox is None:
+                continue
+            left, _, right, _ = bbox
+            box = (max(0, left - padding), max(0, top - padding),
+                   min(width, right + padding), min(height, bottom + padding))
+            regions.append(image.crop(box))
+        return regions
+
+    def _merge_bands(self, bands):
+        """Merge the closest neighbouring bands until at most max_regions remain"""
+        bands = list(bands)
+        while len(bands) > self.options['max_regions']:
+            gaps = [bands[i + 1][0] - bands[i][1] for i in range(len(bands) - 1)]
+            i = gaps.index(min(gaps))
+            bands[i:i + 2] = [(bands[i][0], bands[i + 1][1])]
+        return bands
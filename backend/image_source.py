@@ -0,0 +1,37 @@
+import math
+import mmap
+
+from PIL import Image
+
+def load_image(path, mode=None, scale=None):
+    """
+    Decode an image file read through a read-only memory map
+
+    The decoder reads the stored upload straight from the page cache
+    instead of through a buffered file object. JPEGs are decoded directly
+    into mode (e.g. 'L') and, when scale(image) returns a factor below 1,
+    at the smallest 1/2, 1/4 or 1/8 size still at least that large, so a
+    large scan never exists in memory at full size in color. The DPI is
+    adjusted to the reduced size. Other formats are decoded as stored.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files cannot be mapped; let Pillow report them
+            return _decode(Image.open(f), mode, scale)
+        with mapped:
+            return _decode(Image.open(mapped), mode, scale)
+
+def _decode(image, mode, scale):
+    if image.format == 'JPEG':
+        width, height = image.size
+        factor = min(1.0, scale(image)) if scale is not None else 1.0
+        requested = (max(1, math.ceil(width * factor)), max(1, math.ceil(height * factor)))
+        image.draft(mode or image.mode, requested)
+        dpi = image.info.get('dpi')
+        if dpi and image.width != width:
+            image.info['dpi'] = tuple(value * image.width / width for value in dpi)
+    # Decode now, while the map is still open; Pillow copies the pixels out of it
+    image.load()
+    return image
@@ -0,0 +1,351 @@
+import hashlib
+from collections import Counter
+
+from fr_rules import DEFAULT_RULE_SET, STEP_NUMBER_PATTERN
+from traceability import TraceabilityIndex
+
+# Sections that produce requirements, in the order FRGenerator emits them
+SECTIONS = ('actors', 'main_flow', 'alternative_flows', 'preconditions', 'postconditions')
+FLOW_TITLES = {'main_flow': 'Main Flow', 'alternative_flows': 'Alternative Flow'}
+# Requirements generated per element, one stable ID each
+VARIANTS = {
+    'actors': ('interface', 'authentication'),
+    'main_flow': ('step',),
+    'alternative_flows': ('step',),
+    'preconditions': ('condition',),
+    'postconditions': ('condition',)
+}
+# Fields every traceability row is matched against
+TRACE_CONTEXT_FIELDS = ('use_case_name', 'goal', 'actors')
+
+class BaseVersionNotFoundError(Exception):
+    """Raised when the previous version of a diagram is not in the cache"""
+
+def element_key(section, value):
+    """What identifies an element across versions: flow steps without their number"""
+    if section in FLOW_TITLES:
+        return STEP_NUMBER_PATTERN.sub('', value).strip()
+    return value.strip()
+
+def flow_steps(use_case_elements):
+    return use_case_elements.get('main_flow', []) + use_case_elements.get('alternative_flows', [])
+
+def stable_id(section, key, variant, occurrence):
+    """
+    Content-derived requirement ID; the same element text always gets the same ID
+
+    occurrence tells repeated identical elements in a section apart, so
+    they keep distinct IDs.
+    """
+    digest = hashlib.blake2b(f"{section}\x1f{variant}\x1f{occurrence}\x1f{key}".encode('utf-8'),
+                             digest_size=4).hexdigest()
+    return f"FR-{digest.upper()}"
+
+def common_ends(before, after):
+    """Lengths of the common prefix and suffix of two lists, not overlapping"""
+    shortest = min(len(before), len(after))
+    head = 0
+    while head < shortest and before[head] == after[head]:
+        head += 1
+    tail = 0
+    while tail < shortest - head and before[-1 - tail] == after[-1 - tail]:
+        tail += 1
+    return head, tail
+
+def element_changes(previous, current):
+    """Per-field changes between two element sets: new values of scalars, added/removed list items"""
+    changes = {}
+    for field in ('use_case_name', 'goal'):
+        if previous.get(field) != current.get(field):
+            changes[field] = current.get(field)
+    for section in SECTIONS:
+        before, after = previous.get(section, []), current.get(section, [])
+        if before == after:
+            continue
+        head, tail = common_ends(before, after)
+        remaining = Counter(element_key(section, value) for value in before[head:len(before) - tail])
+        added = []
+        for value in after[head:len(after) - tail]:
+            key = element_key(section, value)
+            if remaining[key] > 0:
+                remaining[key] -= 1
+            else:
+                added.append(key)
+        removed = list(remaining.elements())
+
+        change = {}
+        if added:
+            change['added'] = added
+        if removed:
+            change['removed'] = removed
+        if not change:
+            change['reordered'] = True
+        changes[section] = change
+    return changes
+
+class IncrementalGenerator:
+    """
+    Requirements with content-derived IDs, regenerated element by element
+
+    The positional IDs of FRGenerator.generate_requirements shift whenever
+    a step is inserted or removed. Here every requirement's ID is derived
+    from the section and text of the element it came from, so an edit only
+    adds, removes or retitles the requirements of the elements it touched.
+
+    A version is the usual result (use_case_description,
+    functional_requirements, traceability_matrix) plus the element_keys of
+    each section. update() diffs a new element set against a version:
+    leading and trailing elements both share are reused in bulk, the rest
+    are matched by key, and only unmatched elements go through the FR
+    templates and the traceability index.
+    """
+
+    def __init__(self, fr_generator):
+        self.fr_generator = fr_generator
+
+    def build(self, use_case_elements, model_type=DEFAULT_RULE_SET):
+        """Full version for one element set"""
+        requirements = []
+        element_keys = {}
+        with self.fr_generator.rule_run(model_type) as run:
+            run.prepare(flow_steps(use_case_elements))
+            for section in SECTIONS:
+                values = use_case_elements.get(section, [])
+                keys = element_keys[section] = [element_key(section, value) for value in values]
+                occurrences = Counter()
+                for position, (key, value) in enumerate(zip(keys, values), start=1):
+                    requirements.extend(self._element_requirements(section, position, key, occurrences[key], value,
+                                                                   use_case_elements, run))
+                    occurrences[key] += 1
+        return {
+            'use_case_description': use_case_elements,
+            'functional_requirements': requirements,
+            'traceability_matrix': self.fr_generator.generate_traceability_matrix(use_case_elements, requirements),
+            'element_keys': element_keys
+        }
+
+    def update(self, previous, use_case_elements, model_type=DEFAULT_RULE_SET):
+        """
+        Return (version, delta) for a new element set, given the previous version
+
+        The delta holds the requirements added, the changed fields of updated
+        ones, the IDs removed, the traceability rows that changed (without the
+        requirement titles the requirements already carry) and, if existing
+        requirements moved, the new ID order. The previous version must have
+        been generated with the same rule set.
+        """
+        with self.fr_generator.rule_run(model_type) as run:
+            return self._update(previous, use_case_elements, run)
+
+    def _update(self, previous, use_case_elements, run):
+        previous_elements = previous['use_case_description']
+        # Tag the steps that may need generating in one batch; unchanged ones are reused as they are
+        previous_steps = set(flow_steps(previous_elements))
+        run.prepare([step for step in flow_steps(use_case_elements) if step not in previous_steps])
+        # Actor requirements depend on whether the goal is about authentication
+        actors_stale = run.authenticates(previous_elements.get('goal', '')) != run.authenticates(
+            use_case_elements.get('goal', ''))
+
+        requirements = []
+        matrix = []
+        element_keys = {}
+        generated = []
+        retitled = []
+        offset = 0
+        for section in SECTIONS:
+            before = previous_elements.get(section, [])
+            after = use_case_elements.get(section, [])
+            bounds = self._previous_bounds(section, before, previous_elements, offset, run)
+            offset = bounds[-1]
+            before_keys = previous['element_keys'][section]
+
+            if section == 'actors' and actors_stale:
+                head = tail = 0
+                before = before_keys = []
+            elif before == after:
+                self._reuse(previous, section, bounds, 0, len(before), 0, requirements, matrix, retitled, run)
+                element_keys[section] = before_keys
+                continue
+            else:
+                head, tail = common_ends(before, after)
+
+            tail_start = len(before) - tail
+            shift = len(after) - len(before)
+            middle_before = before_keys[head:tail_start]
+            middle_after = [element_key(section, value) for value in after[head:len(after) - tail]]
+            element_keys[section] = before_keys[:head] + middle_after + before_keys[tail_start:]
+
+            self._reuse(previous, section, bounds, 0, head, 0, requirements, matrix, retitled, run)
+
+            # Trailing elements keep their occurrence numbers, and so their
+            # IDs, unless the edit changed how often their key appears before them
+            before_counts, after_counts = Counter(middle_before), Counter(middle_after)
+            shifted = {key for key in before_counts.keys() | after_counts.keys()
+                       if before_counts[key] != after_counts[key]}
+
+            # Everything else is matched by key and occurrence, so moved and
+            # renumbered elements keep their requirements
+            previous_positions = {}
+            occurrences = Counter(before_keys[:head])
+            for index in range(head, len(before)):
+                key = before_keys[index]
+                if index < tail_start or key in shifted:
+                    previous_positions[(key, occurrences[key])] = index
+                occurrences[key] += 1
+
+            occurrences = Counter(before_keys[:head])
+            run_start = None
+            for index in range(head, len(after)):
+                if index - shift >= tail_start:
+                    key = before_keys[index - shift]
+                    if key not in shifted:
+                        if run_start is None:
+                            run_start = index - shift
+                        continue
+                    if run_start is not None:
+                        self._reuse(previous, section, bounds, run_start, index - shift, shift,
+                                    requirements, matrix, retitled, run)
+                        run_start = None
+                else:
+                    key = middle_after[index - head]
+                occurrence = occurrences[key]
+                occurrences[key] += 1
+                previous_index = previous_positions.get((key, occurrence))
+                if previous_index is not None:
+                    self._reuse(previous, section, bounds, previous_index, previous_index + 1,
+                                index - previous_index, requirements, matrix, retitled, run)
+                    continue
+                element_requirements = self._element_requirements(section, index + 1, key, occurrence,
+                                                                  after[index], use_case_elements, run)
+                generated.extend(range(len(requirements), len(requirements) + len(element_requirements)))
+                requirements.extend(element_requirements)
+                matrix.extend([None] * len(element_requirements))
+            if run_start is not None:
+                self._reuse(previous, section, bounds, run_start, len(before), shift,
+                            requirements, matrix, retitled, run)
+
+        # Rows are matched against the name, goal and actors; if those are
+        # unchanged, only the rows of generated requirements are computed
+        untraced = generated
+        if any(previous_elements.get(field) != use_case_elements.get(field) for field in TRACE_CONTEXT_FIELDS):
+            untraced = range(len(requirements))
+        traced = []
+        if untraced:
+            index = TraceabilityIndex(use_case_elements)
+            for position in untraced:
+                requirement = requirements[position]
+                matrix[position] = {
+                    'requirement_id': requirement['id'],
+                    'requirement_title': requirement['title'],
+                    'mapped_elements': index.mapped_elements(requirement['description']) or ['General System']
+                }
+                traced.append(matrix[position])
+
+        version = {
+            'use_case_description': use_case_elements,
+            'functional_requirements': requirements,
+            'traceability_matrix': matrix,
+            'element_keys': element_keys
+        }
+        delta = self._delta(previous, version, generated, retitled, traced)
+        delta['changes'] = element_changes(previous_elements, use_case_elements)
+        delta['stats'] = {
+            'requirements': len(requirements),
+            'generated': len(generated),
+            'reused': len(requirements) - len(generated),
+            'traceability_rows_computed': len(traced)
+        }
+        return version, delta
+
+    def _reuse(self, previous, section, bounds, first, last, shift, requirements, matrix, retitled, run):
+        """
+        Carry over the requirements of previous elements first:last of a section
+
+        Flow steps that moved by shift positions are retitled, since their
+        titles carry the step number.
+        """
+        start, end = bounds[first], bounds[last]
+        if not shift or section not in FLOW_TITLES:
+            requirements.extend(previous['functional_requirements'][start:end])
+            matrix.extend(previous['traceability_matrix'][start:end])
+            return
+        # Flow steps have exactly one requirement each
+        step_title = run.rules.step_titles[section]
+        for position, index in enumerate(range(start, end), start=first + shift + 1):
+            title = step_title(position)
+            requirement = dict(previous['functional_requirements'][index], title=title)
+            requirements.append(requirement)
+            matrix.append(dict(previous['traceability_matrix'][index], requirement_title=title))
+            retitled.append(requirement)
+
+    def _delta(self, previous, version, generated, retitled, traced):
+        previous_requirements = previous['functional_requirements']
+        requirements = version['functional_requirements']
+        current_ids = [requirement['id'] for requirement in requirements]
+        current = set(current_ids)
+        previous_positions = {}
+        if generated or traced:
+            previous_positions = {requirement['id']: position
+                                  for position, requirement in enumerate(previous_requirements)}
+
+        added = []
+        updated = [{'id': requirement['id'], 'title': requirement['title']} for requirement in retitled]
+        for position in generated:
+            requirement = requirements[position]
+            previous_position = previous_positions.get(requirement['id'])
+            if previous_position is None:
+                added.append(requirement)
+                continue
+            # Regenerated from an unchanged element, e.g. actors after a goal change
+            before = previous_requirements[previous_position]
+            update = {field: value for field, value in requirement.items() if before.get(field) != value}
+            if update:
+                update['id'] = requirement['id']
+                updated.append(update)
+        removed = [requirement['id'] for requirement in previous_requirements if requirement['id'] not in current]
+
+        trace = []
+        for row in traced:
+            previous_position = previous_positions.get(row['requirement_id'])
+            if (previous_position is None or
+                    previous['traceability_matrix'][previous_position]['mapped_elements'] != row['mapped_elements']):
+                trace.append({'requirement_id': row['requirement_id'], 'mapped_elements': row['mapped_elements']})
+
+        delta = {
+            'requirements': {'added': added, 'updated': updated, 'removed': removed},
+            'traceability': trace
+        }
+        # Clients apply removals, then updates, then append additions; the
+        # order is only sent when that would not reproduce it
+        kept = [requirement['id'] for requirement in previous_requirements if requirement['id'] in current]
+        if kept + [requirement['id'] for requirement in added] != current_ids:
+            delta['order'] = current_ids
+        return delta
+
+    def _previous_bounds(self, section, before, previous_elements, offset, run):
+        """Index of the first requirement of each previous element of a section, plus the end"""
+        if section != 'actors':
+            return range(offset, offset + len(before) + 1)
+        per_user_actor = 2 if run.authenticates(previous_elements.get('goal', '')) else 1
+        bounds = [offset]
+        for actor in before:
+            offset += per_user_actor if run.is_user_actor(actor) else 0
+            bounds.append(offset)
+        return bounds
+
+    def _element_requirements(self, section, position, key, occurrence, value, use_case_elements, run):
+        """The requirements generated from one element, with their stable IDs"""
+        generator = self.fr_generator
+        if section == 'actors':
+            if not run.is_user_actor(value):
+                return []
+            requirements = generator.generate_user_requirements(value, use_case_elements, 0, run)
+        elif section in FLOW_TITLES:
+            requirements = generator.generate_flow_requirements([value], position, FLOW_TITLES[section], run,
+                                                                first_number=position)
+        else:
+            requirements = generator.generate_condition_requirements({section: [value]}, 0, run)
+
+        for variant, requirement in zip(VARIANTS[section], requirements):
+            requirement['id'] = stable_id(section, key, variant, occurrence)
+        return requirements
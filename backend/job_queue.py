@@ -0,0 +1,228 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import observe_pipeline
+from models import compact_result, expand_result
+from pipeline import init_worker, run_in_worker
+from structured_logging import get_logger, log_event
+
+logger = get_logger('jobs')
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+class JobQueue:
+    """
+    Bounded job queue that runs the processing pipeline on a process pool
+
+    Jobs wait in a fixed-size queue until one of the dispatcher threads hands
+    them to a worker process, so queue depth reflects real backlog and a full
+    queue rejects new work instead of growing without limit.
+
+    With a JobStore, every state change and the result are also written
+    there, and jobs this process does not hold are looked up in it, so any
+    web worker can answer the status and result polls of a job.
+    """
+
+    def __init__(self, max_workers=None, max_queue_size=None, result_ttl=3600, cache_options=None, store=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue_size = max_queue_size or self.max_workers * 4
+        self.result_ttl = result_ttl
+        self.cache_options = cache_options
+        self.store = store
+
+        self._pending = queue.Queue(maxsize=self.max_queue_size)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._running = 0
+        self._executor = None
+        self._dispatchers = []
+        self._stage_totals = {}
+        self._stage_counts = {}
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self):
+        """Create the worker pool and dispatcher threads on first use"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 initializer=init_worker,
+                                                 initargs=(self.cache_options,))
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._dispatch, name=f"job-dispatcher-{i}", daemon=True)
+                thread.start()
+                self._dispatchers.append(thread)
+
+    def submit(self, filepath, model_type='rule-based', content_hash=None, pages=None):
+        """Queue a job and return its ID, raising QueueFullError if there is no room"""
+        self.start()
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'filepath': filepath,
+            'model_type': model_type,
+            'content_hash': content_hash,
+            'pages': pages,
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'timings': {},
+            'error': None,
+            'result': None
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+        # Recorded before a dispatcher can pick it up, so the later states are not overwritten
+        self._record(job)
+        try:
+            self._pending.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                self._rejected += 1
+            if self.store is not None:
+                try:
+                    self.store.delete(job_id)
+                except sqlite3.Error as e:
+                    log_event(logger, logging.WARNING, 'job_store_write_failed', job_id=job_id, error=str(e))
+            raise QueueFullError(f"Job queue is full ({self.max_queue_size} jobs pending)")
+
+        return job_id
+
+    def get(self, job_id):
+        """Return the job record, or None if the ID is unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            return self.store.get(job_id)
+        return job
+
+    def result(self, job_id):
+        """Return the result of a completed job in the wire format, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            result = job['result'] if job is not None else None
+        if job is None and self.store is not None:
+            return self.store.result(job_id)
+        return expand_result(result) if result is not None else None
+
+    def status(self, job_id):
+        """Return the public view of a job without its result payload"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                status = {key: value for key, value in job.items() if key not in ('result', 'filepath')}
+                status['timings'] = dict(job['timings'])
+                return status
+        if self.store is not None:
+            return self.store.get(job_id)
+        return None
+
+    def stats(self):
+        """Queue depth, worker usage and average per-stage timings"""
+        with self._lock:
+            stage_averages = {
+                stage: round(total / self._stage_counts[stage], 4)
+                for stage, total in self._stage_totals.items()
+            }
+            return {
+                'workers': self.max_workers,
+                'max_queue_size': self.max_queue_size,
+                'queue_depth': self._pending.qsize(),
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_stage_timings': stage_averages
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _dispatch(self):
+        """Dispatcher thread: move queued jobs onto the worker pool one at a time"""
+        while True:
+            job_id = self._pending.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                executor = self._executor
+                if job is None or executor is None:
+                    continue
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+                job['timings']['queue_wait'] = job['started_at'] - job['submitted_at']
+                self._running += 1
+            self._record(job)
+
+            try:
+                result, timings, memory = executor.submit(run_in_worker, job['filepath'], job['model_type'],
+                                                         job['content_hash'], job['pages']).result()
+            except Exception as e:
+                log_event(logger, logging.ERROR, 'job_failed', job_id=job_id, error=str(e))
+                observe_pipeline('job', {}, error=True)
+                with self._lock:
+                    job['status'] = 'failed'
+                    job['error'] = str(e)
+                    job['finished_at'] = time.time()
+                    self._running -= 1
+                    self._failed += 1
+                self._record(job)
+                continue
+
+            # Results wait up to result_ttl to be fetched, so their requirements are kept compact
+            compacted = compact_result(result)
+            with self._lock:
+                job['status'] = 'completed'
+                job['result'] = compacted
+                job['timings'].update(timings)
+                job['finished_at'] = time.time()
+                self._running -= 1
+                self._completed += 1
+                for stage, duration in job['timings'].items():
+                    self._stage_totals[stage] = self._stage_totals.get(stage, 0.0) + duration
+                    self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+            self._record(job, result)
+            observe_pipeline('job', timings, filepath=job['filepath'], result=result, memory=memory)
+
+    def _purge_expired(self):
+        """Drop finished jobs older than result_ttl"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finished_at'] is not None and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.store is not None:
+            try:
+                self.store.purge(cutoff)
+            except sqlite3.Error as e:
+                log_event(logger, logging.WARNING, 'job_store_purge_failed', error=str(e))
+
+    def _record(self, job, result=None):
+        """Write the job's current state, and its result once completed, to the store"""
+        if self.store is None:
+            return
+        with self._lock:
+            job = dict(job, timings=dict(job['timings']))
+        try:
+            self.store.put(job, result)
+        except sqlite3.Error as e:
+            log_event(logger, logging.WARNING, 'job_store_write_failed', job_id=job['id'], status=job['status'],
+                      error=str(e))
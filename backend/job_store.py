@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    model_type TEXT,
+    content_hash TEXT,
+    pages TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    timings TEXT NOT NULL,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+"""
+
+# Job record fields kept in their own columns; timings, pages and result are stored as JSON
+COLUMNS = ('id', 'status', 'model_type', 'content_hash', 'pages', 'submitted_at', 'started_at', 'finished_at',
+           'timings', 'error')
+JSON_COLUMNS = ('pages', 'timings')
+
+class JobStore:
+    """
+    SQLite-backed record of async jobs, shared by every web worker process
+
+    A job runs in the worker process that accepted it, but the status and
+    result polls that follow can land on any worker. The accepting worker
+    writes each state change here, so the others can answer for jobs they
+    do not hold.
+    """
+
+    def __init__(self, db_path='jobs.db'):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    @property
+    def _db(self):
+        """The SQLite connection, opened on first use in each process (see ProjectStore._db)"""
+        if self._connection_pid != os.getpid():
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            if self.db_path != ':memory:':
+                db.execute('PRAGMA journal_mode = WAL')
+                db.execute('PRAGMA synchronous = NORMAL')
+            db.executescript(SCHEMA)
+            self._connection, self._connection_pid = db, os.getpid()
+        return self._connection
+
+    def put(self, job, result=None):
+        """Insert or replace a job record, with the wire-format result once it has one"""
+        values = [json.dumps(job[column]) if column in JSON_COLUMNS else job[column] for column in COLUMNS]
+        values.append(json.dumps(result) if result is not None else None)
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO jobs ({', '.join(COLUMNS)}, result) "
+                             f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})", values)
+
+    def get(self, job_id):
+        """The job record without its result, or None if the ID is unknown or purged"""
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {column: json.loads(row[column]) if column in JSON_COLUMNS else row[column] for column in COLUMNS}
+
+    def result(self, job_id):
+        """The wire-format result of a completed job, or None"""
+        with self._lock:
+            row = self._db.execute('SELECT result FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None or row['result'] is None:
+            return None
+        return json.loads(row['result'])
+
+    def delete(self, job_id):
+        with self._lock:
+            self._db.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def purge(self, cutoff):
+        """Drop jobs that finished before cutoff; returns how many"""
+        with self._lock:
+            return self._db.execute('DELETE FROM jobs WHERE finished_at < ?', (cutoff,)).rowcount
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection, self._connection_pid = None, None
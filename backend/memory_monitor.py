@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# How often the sampler thread reads the resident set size while a run is being measured
+MEMORY_SAMPLE_INTERVAL = float(os.environ.get('MEMORY_SAMPLE_INTERVAL', 0.01))
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def resident_bytes():
+    """Resident set size of this process in bytes, or None if it cannot be read here"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    return None
+
+class MemoryUsage:
+    """Resident set size when a run started and the highest value seen until it ended"""
+
+    __slots__ = ('baseline', 'peak')
+
+    def __init__(self, baseline):
+        self.baseline = baseline
+        self.peak = baseline
+
+    @property
+    def growth(self):
+        """Peak above the starting size: what the run itself cost, or None if not measured"""
+        if self.baseline is None:
+            return None
+        return max(0, self.peak - self.baseline)
+
+    def update(self, resident):
+        if resident is not None and self.peak is not None and resident > self.peak:
+            self.peak = resident
+
+class MemoryMonitor:
+    """
+    Peak resident memory of pipeline runs
+
+    Resident set size is sampled by one background thread, every
+    MEMORY_SAMPLE_INTERVAL seconds while at least one run is tracked, and
+    once more when each run starts and ends. The figures are per process:
+    runs that overlap on threads of the same process see each other's
+    memory, and the Tesseract pool workers are not included. A forked child,
+    such as a job or batch pool worker, starts with no runs and its own
+    sampler, as the parent's thread does not exist there.
+    """
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = set()
+        self._wake = threading.Event()
+        self._thread = None
+        if hasattr(os, 'register_at_fork'):
+            # A weak reference, as fork hooks cannot be unregistered
+            reset = weakref.WeakMethod(self._reset)
+
+            def after_fork_in_child():
+                method = reset()
+                if method is not None:
+                    method()
+            os.register_at_fork(after_in_child=after_fork_in_child)
+
+    def _reset(self):
+        """Forget the parent's runs and sampler thread; the lock may have been held when it forked"""
+        self._lock = threading.Lock()
+        self._active = set()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start tracking a run; returns its MemoryUsage, updated until stop() is called"""
+        usage = MemoryUsage(resident_bytes())
+        if usage.baseline is None:
+            return usage
+        with self._lock:
+            self._active.add(usage)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._sample, name='memory-monitor', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return usage
+
+    def stop(self, usage):
+        usage.update(resident_bytes())
+        with self._lock:
+            self._active.discard(usage)
+        return usage
+
+    @contextmanager
+    def track(self):
+        usage = self.start()
+        try:
+            yield usage
+        finally:
+            self.stop(usage)
+
+    def _sample(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._wake.clear()
+                    continue
+            resident = resident_bytes()
+            for usage in active:
+                usage.update(resident)
+            time.sleep(self.interval)
+
+MEMORY_MONITOR = MemoryMonitor()
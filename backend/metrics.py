@@ -0,0 +1,215 @@
+import math
+import os
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 5 * 1024 * 1024, 20 * 1024 * 1024,
+                100 * 1024 * 1024)
+MEMORY_BUCKETS = tuple(2 ** power * 1024 * 1024 for power in range(13))   # 1 MB to 4 GB
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names + ('le',), key + (_format_value(float(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text format
+
+    Collectors are callables run at scrape time that return
+    (name, kind, documentation, [(labels_dict, value), ...]) tuples, for values
+    that are cheaper to read on demand than to keep updated (queue depth,
+    cache counters).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} "
+                                 f"{_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'converter_stage_duration_seconds', 'Time spent in each pipeline stage', ('stage',))
+PIPELINE_DURATION = REGISTRY.histogram(
+    'converter_pipeline_duration_seconds', 'End-to-end pipeline time per diagram', ('source',))
+PIPELINE_RUNS = REGISTRY.counter(
+    'converter_pipeline_runs_total', 'Diagrams processed', ('source', 'status'))
+REQUIREMENTS_GENERATED = REGISTRY.counter(
+    'converter_requirements_generated_total', 'Functional requirements generated')
+OUTPUT_CACHE = REGISTRY.counter(
+    'converter_output_cache_total', 'Pipeline runs served from the output cache or computed', ('result',))
+INPUT_BYTES = REGISTRY.histogram(
+    'converter_input_bytes', 'Size of processed input files', buckets=SIZE_BUCKETS)
+EXTRACTED_CHARS = REGISTRY.histogram(
+    'converter_extracted_text_chars', 'Characters of OCR text per diagram',
+    buckets=(100, 500, 1000, 5000, 10000, 50000, 100000, 1000000))
+PEAK_MEMORY = REGISTRY.histogram(
+    'converter_pipeline_peak_memory_bytes', 'Peak resident memory of the process during a pipeline run',
+    ('source',), buckets=MEMORY_BUCKETS)
+MEMORY_GROWTH = REGISTRY.histogram(
+    'converter_pipeline_memory_growth_bytes', 'Peak resident memory of a pipeline run above the size at its start',
+    ('source',), buckets=MEMORY_BUCKETS)
+HTTP_REQUESTS = REGISTRY.counter(
+    'converter_http_requests_total', 'HTTP requests handled', ('endpoint', 'method', 'status'))
+HTTP_DURATION = REGISTRY.histogram(
+    'converter_http_request_duration_seconds', 'HTTP request latency', ('endpoint',))
+
+def observe_pipeline(source, timings, filepath=None, result=None, error=False, memory=None):
+    """
+    Record one pipeline run
+
+    source is where it ran ('sync', 'job', 'batch'). Called in the serving
+    process with the timings returned by Pipeline.process, so runs executed
+    in pool workers are counted too. memory is the MemoryUsage of the run
+    (see memory_monitor.py), measured in the process that ran it.
+    """
+    PIPELINE_RUNS.inc(source=source, status='error' if error else 'success')
+    if error:
+        return
+
+    if memory is not None and memory.baseline is not None:
+        PEAK_MEMORY.observe(memory.peak, source=source)
+        MEMORY_GROWTH.observe(memory.growth, source=source)
+
+    total = 0.0
+    for stage, duration in timings.items():
+        STAGE_DURATION.observe(duration, stage=stage)
+        if stage != 'queue_wait' and not stage.startswith('preprocess_') and stage != 'tesseract':
+            total += duration
+    PIPELINE_DURATION.observe(total, source=source)
+    OUTPUT_CACHE.inc(result='miss' if 'fr_generation' in timings else 'hit')
+
+    if filepath is not None:
+        try:
+            INPUT_BYTES.observe(os.path.getsize(filepath))
+        except OSError:
+            pass
+
+    if result is not None:
+        use_cases = result.get('use_cases') or [result]
+        EXTRACTED_CHARS.observe(sum(len(use_case.get('extracted_text') or '') for use_case in use_cases))
+        REQUIREMENTS_GENERATED.inc(sum(len(use_case.get('functional_requirements') or [])
+                                       for use_case in use_cases))
@@ -0,0 +1,229 @@
+import re
+import sys
+from array import array
+
+CANONICAL_FR_ID = re.compile(r'FR-(\d{3,})')
+
+class Vocabulary:
+    """
+    Enum-like set of interned string values with small integer codes
+
+    Members are plain str, so they compare equal to (and serialize exactly
+    like) the strings used on the wire, but every requirement holding one
+    shares a single object. Unknown values are added on first use.
+    """
+
+    def __init__(self, **members):
+        self._values = []
+        self._codes = {}
+        for name, value in members.items():
+            setattr(self, name, self.intern(value))
+
+    def intern(self, value):
+        return self._values[self.code(value)]
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            if len(self._values) >= 255:
+                raise ValueError(f"Too many distinct values to encode {value!r}")
+            code = len(self._values)
+            value = sys.intern(value)
+            self._values.append(value)
+            self._codes[value] = code
+        return code
+
+    def lookup(self, value):
+        """Code of a known value, or None without adding it"""
+        return self._codes.get(value)
+
+    def value(self, code):
+        return self._values[code]
+
+    @property
+    def values(self):
+        return tuple(self._values)
+
+Category = Vocabulary(
+    USER_INTERFACE='User Interface',
+    SECURITY='Security',
+    VALIDATION='Validation',
+    DATA_MANAGEMENT='Data Management',
+    BUSINESS_LOGIC='Business Logic',
+    SYSTEM='System',
+    GENERAL='General'
+)
+
+Priority = Vocabulary(
+    HIGH='High',
+    MEDIUM='Medium',
+    LOW='Low'
+)
+
+class Requirement:
+    """One functional requirement; to_dict() gives the JSON wire format"""
+
+    __slots__ = ('id', 'title', 'description', 'category', 'priority')
+
+    def __init__(self, id, title, description, category, priority):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.category = Category.intern(category)
+        self.priority = Priority.intern(priority)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], data['title'], data['description'], data['category'], data['priority'])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'category': self.category,
+            'priority': self.priority
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Requirement):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"Requirement({self.id!r}, {self.title!r}, category={self.category!r}, priority={self.priority!r})"
+
+class RequirementTable:
+    """
+    Columnar container for large sets of requirements
+
+    IDs of the canonical FR-NNN form are stored as numbers, category and
+    priority as one-byte vocabulary codes, and only titles and descriptions
+    as strings. Rows are materialized as Requirement objects (or wire
+    dicts) on access.
+    """
+
+    __slots__ = ('_numbers', '_custom_ids', '_titles', '_descriptions', '_categories', '_priorities')
+
+    def __init__(self, requirements=()):
+        self._numbers = array('q')
+        self._custom_ids = {}
+        self._titles = []
+        self._descriptions = []
+        self._categories = array('B')
+        self._priorities = array('B')
+        self.extend(requirements)
+
+    @classmethod
+    def from_dicts(cls, dicts):
+        table = cls()
+        for data in dicts:
+            table.append_values(data['id'], data['title'], data['description'], data['category'],
+                                data['priority'])
+        return table
+
+    def append(self, requirement):
+        """Add a Requirement or a requirement dict"""
+        if isinstance(requirement, dict):
+            requirement = Requirement.from_dict(requirement)
+        self.append_values(requirement.id, requirement.title, requirement.description, requirement.category,
+                           requirement.priority)
+
+    def append_values(self, id, title, description, category, priority):
+        match = CANONICAL_FR_ID.fullmatch(id)
+        if match is not None and f"FR-{int(match.group(1)):03d}" == id:
+            self._numbers.append(int(match.group(1)))
+        else:
+            self._custom_ids[len(self._numbers)] = id
+            self._numbers.append(-1)
+        self._titles.append(title)
+        self._descriptions.append(description)
+        self._categories.append(Category.code(category))
+        self._priorities.append(Priority.code(priority))
+
+    def extend(self, requirements):
+        for requirement in requirements:
+            self.append(requirement)
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            table = RequirementTable()
+            for position in range(*index.indices(len(self))):
+                table.append(self[position])
+            return table
+        if index < 0:
+            index += len(self)
+        return Requirement(self._id(index), self._titles[index], self._descriptions[index],
+                           Category.value(self._categories[index]), Priority.value(self._priorities[index]))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, RequirementTable):
+            return NotImplemented
+        return self.to_dicts() == other.to_dicts()
+
+    def to_dicts(self):
+        """Wire format: the list of requirement dicts the API has always returned"""
+        return [
+            {
+                'id': self._id(index),
+                'title': self._titles[index],
+                'description': self._descriptions[index],
+                'category': Category.value(self._categories[index]),
+                'priority': Priority.value(self._priorities[index])
+            }
+            for index in range(len(self))
+        ]
+
+    def where(self, category=None, priority=None):
+        """Row indices matching a category and/or priority, compared by code"""
+        category_code = Category.lookup(category) if category is not None else None
+        priority_code = Priority.lookup(priority) if priority is not None else None
+        if (category is not None and category_code is None) or (priority is not None and priority_code is None):
+            return []
+        return [
+            index for index in range(len(self))
+            if (category_code is None or self._categories[index] == category_code)
+            and (priority_code is None or self._priorities[index] == priority_code)
+        ]
+
+    def counts(self, column='category'):
+        """Number of rows per category or priority value"""
+        vocabulary, codes = (Category, self._categories) if column == 'category' else (Priority, self._priorities)
+        totals = {}
+        for code in codes:
+            totals[code] = totals.get(code, 0) + 1
+        return {vocabulary.value(code): count for code, count in totals.items()}
+
+    def _id(self, index):
+        number = self._numbers[index]
+        if number < 0:
+            return self._custom_ids[index]
+        return f"FR-{number:03d}"
+
+def compact_result(result):
+    """
+    A pipeline result with its requirement lists held as RequirementTables
+
+    Used for results that stay in memory until they are fetched; PDF
+    results carry one requirement list per page in use_cases.
+    """
+    if 'use_cases' in result:
+        return dict(result, use_cases=[compact_result(use_case) for use_case in result['use_cases']])
+    if 'functional_requirements' in result:
+        return dict(result, functional_requirements=RequirementTable.from_dicts(result['functional_requirements']))
+    return result
+
+def expand_result(result):
+    """The wire format of a result compacted with compact_result"""
+    if 'use_cases' in result:
+        return dict(result, use_cases=[expand_result(use_case) for use_case in result['use_cases']])
+    if isinstance(result.get('functional_requirements'), RequirementTable):
+        return dict(result, functional_requirements=result['functional_requirements'].to_dicts())
+    return result
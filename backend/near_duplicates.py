@@ -0,0 +1,239 @@
+import re
+import zlib
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+BOILERPLATE_PREFIX = 'the system shall '
+
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_BINS = 64
+DEFAULT_BANDS = 16
+SHINGLE_SIZE = 4
+
+# Added to a borrowed bin value per step it was rotated, keeping densified bins distinct
+ROTATION_OFFSET = 1 << 32
+
+def normalize(description):
+    """Lowercase words only, without the 'The system shall' every requirement starts with"""
+    text = ' '.join(WORD_PATTERN.findall(description.lower()))
+    if text.startswith(BOILERPLATE_PREFIX):
+        text = text[len(BOILERPLATE_PREFIX):]
+    return text
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashed character shingles of a normalized description"""
+    data = text.encode('utf-8')
+    if len(data) <= size:
+        return frozenset((zlib.crc32(data),))
+    return frozenset(zlib.crc32(data[i:i + size]) for i in range(len(data) - size + 1))
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+def minhash_signature(shingle_hashes, bins=DEFAULT_BINS):
+    """
+    One-permutation MinHash with rotation densification
+
+    Each shingle hash is placed in bin hash % bins and every bin keeps its
+    minimum, so building the signature costs one pass over the shingles
+    instead of one pass per hash function. Empty bins borrow the value of
+    the next non-empty bin to their right.
+    """
+    signature = [None] * bins
+    for value in shingle_hashes:
+        index = value % bins
+        rank = value // bins
+        current = signature[index]
+        if current is None or rank < current:
+            signature[index] = rank
+
+    if None in signature:
+        for index in range(bins):
+            if signature[index] is None:
+                for step in range(1, bins):
+                    borrowed = signature[(index + step) % bins]
+                    if borrowed is not None and borrowed < ROTATION_OFFSET:
+                        signature[index] = borrowed + step * ROTATION_OFFSET
+                        break
+    return signature
+
+class NearDuplicateIndex:
+    """
+    Incremental near-duplicate clustering of requirement descriptions
+
+    Descriptions are normalized and identical ones share a node. Each node
+    gets a MinHash signature whose bands are hashed into LSH buckets, so a
+    new description is only compared with the nodes it collides with, and a
+    candidate is accepted when the exact Jaccard similarity of the shingle
+    sets reaches the threshold. Clusters are the connected components of
+    accepted pairs. Buckets keep only representatives of the wordings that
+    landed in them, so large clusters of templated requirements do not turn
+    into all-pairs comparisons.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, bins=DEFAULT_BINS, bands=DEFAULT_BANDS):
+        if bins % bands:
+            raise ValueError("bins must be a multiple of bands")
+        self.threshold = threshold
+        self.bins = bins
+        self.bands = bands
+        self.rows = bins // bands
+
+        self._texts = {}       # key -> description
+        self._key_node = {}    # key -> normalized text
+        self._nodes = {}       # normalized text -> [keys in insertion order]
+        self._shingles = {}    # normalized text -> shingle hash set
+        self._band_keys = {}   # normalized text -> band bucket keys
+        self._buckets = {}     # band bucket key -> representative normalized texts
+        self._parent = {}      # union-find over normalized texts
+        self._members = {}     # union-find root -> normalized texts in its cluster
+        self._order = {}       # normalized text -> insertion sequence
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, key):
+        return key in self._texts
+
+    def add(self, key, description):
+        """Index a description under key, replacing any previous description for it"""
+        if key in self._texts:
+            self.remove(key)
+        self._texts[key] = description
+        node = normalize(description)
+        self._key_node[key] = node
+
+        keys = self._nodes.get(node)
+        if keys is not None:
+            keys.append(key)
+            return
+        self._nodes[node] = [key]
+        self._order[node] = self._sequence
+        self._sequence += 1
+        self._parent[node] = node
+        self._members[node] = [node]
+        self._index(node)
+
+    def add_many(self, items):
+        """Index (key, description) pairs"""
+        for key, description in items:
+            self.add(key, description)
+
+    def remove(self, key):
+        """Drop a key; its cluster is re-linked without it"""
+        if key not in self._texts:
+            return False
+        del self._texts[key]
+        node = self._key_node.pop(key)
+        keys = self._nodes[node]
+        keys.remove(key)
+        if keys:
+            return True
+
+        # Union-find cannot delete, so the node's component is rebuilt; any
+        # member the node stood in for becomes a bucket representative again
+        component = self._members.pop(self._find(node))
+        del self._nodes[node]
+        del self._shingles[node]
+        del self._order[node]
+        for band_key in self._band_keys.pop(node):
+            bucket = self._buckets[band_key]
+            if node in bucket:
+                bucket.remove(node)
+                if not bucket:
+                    del self._buckets[band_key]
+
+        del self._parent[node]
+        component.remove(node)
+        for other in component:
+            self._parent[other] = other
+            self._members[other] = [other]
+        for other in component:
+            self._link(other)
+        return True
+
+    def cluster_of(self, key):
+        """Keys in the same cluster as key (including key)"""
+        nodes = self._members[self._find(self._key_node[key])]
+        return [member for node in nodes for member in self._nodes[node]]
+
+    def clusters(self, min_size=2):
+        """
+        Clusters of at least min_size keys, largest first
+
+        Each cluster has a canonical representative: a key of its most
+        frequent normalized wording, earliest added on ties.
+        """
+        clusters = []
+        for nodes in self._members.values():
+            size = sum(len(self._nodes[node]) for node in nodes)
+            if size < min_size:
+                continue
+            nodes = sorted(nodes, key=lambda node: (-len(self._nodes[node]), self._order[node]))
+            representative = self._nodes[nodes[0]][0]
+            clusters.append({
+                'representative': representative,
+                'description': self._texts[representative],
+                'size': size,
+                'variants': len(nodes),
+                'members': [key for node in nodes for key in self._nodes[node]]
+            })
+        clusters.sort(key=lambda cluster: (-cluster['size'], self._order[self._key_node[cluster['representative']]]))
+        return clusters
+
+    def _index(self, node):
+        node_shingles = shingles(node)
+        self._shingles[node] = node_shingles
+        signature = minhash_signature(node_shingles, self.bins)
+        rows = self.rows
+        band_keys = [(band,) + tuple(signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+        self._band_keys[node] = band_keys
+        self._link(node)
+
+    def _link(self, node):
+        """
+        Union node with the bucket representatives it is similar to
+
+        A bucket only keeps nodes that were not similar to any representative
+        already in it, so its size tracks the number of distinct wordings
+        rather than the number of requirements.
+        """
+        node_shingles = self._shingles[node]
+        threshold = self.threshold
+        checked = {node}
+        similar = set()
+        for band_key in self._band_keys[node]:
+            bucket = self._buckets.setdefault(band_key, [])
+            covered = False
+            for candidate in bucket:
+                if candidate in similar:
+                    covered = True
+                elif candidate not in checked:
+                    checked.add(candidate)
+                    if jaccard(node_shingles, self._shingles[candidate]) >= threshold:
+                        similar.add(candidate)
+                        self._union(node, candidate)
+                        covered = True
+            if not covered and node not in bucket:
+                bucket.append(node)
+
+    def _find(self, node):
+        parent = self._parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def _union(self, first, second):
+        first_root, second_root = self._find(first), self._find(second)
+        if first_root == second_root:
+            return
+        # The older node stays root so roots are stable as clusters grow
+        if self._order[first_root] > self._order[second_root]:
+            first_root, second_root = second_root, first_root
+        self._parent[second_root] = first_root
+        self._members[first_root].extend(self._members.pop(second_root))
@@ -1,33 +1,104 @@
+import logging
+import os
 import re
-import nltk
-import ssl
+import threading
 
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_unverified_https_context = _create_unverified_https_context
+from structured_logging import get_logger, log_event
 
-# Download required NLTK data
-def download_nltk_data():
+# NLTK is imported lazily: importing it and probing its data directories is a
+# large share of backend start-up time, and only _extract_simple_steps and the
+# POS tagger of pos_tagging.py need it.
+# With NLTK_OFFLINE set, missing resources are never downloaded and a regex
+# sentence splitter is used instead.
+NLTK_OFFLINE = os.environ.get('NLTK_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+    # The same tagger as NLTK 3.9 and later load it
+    'averaged_perceptron_tagger_eng': 'taggers/averaged_perceptron_tagger_eng'
+}
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+logger = get_logger('nlp')
+
+_nltk_lock = threading.Lock()
+_sent_tokenize = None
+_nltk_loaded = False
+
+def set_offline_mode(offline):
+    """Enable or disable strict offline mode (no NLTK downloads)"""
+    global NLTK_OFFLINE
+    NLTK_OFFLINE = offline
+
+def download_nltk_data(offline=None):
+    """
+    Make sure the NLTK resources are available
+
+    Returns the names of resources that are still missing. Nothing is
+    downloaded in offline mode.
+    """
+    offline = NLTK_OFFLINE if offline is None else offline
     try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        print("Downloading NLTK punkt tokenizer...")
-        nltk.download('punkt', quiet=True)
+        import nltk
+    except ImportError:
+        return list(NLTK_RESOURCES)
     
-    try:
-        nltk.data.find('taggers/averaged_perceptron_tagger')
-    except LookupError:
-        print("Downloading NLTK POS tagger...")
-        nltk.download('averaged_perceptron_tagger', quiet=True)
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+            continue
+        except LookupError:
+            pass
+        
+        if offline:
+            missing.append(name)
+            continue
+        
+        log_event(logger, logging.INFO, "nltk_download", resource=name)
+        if not nltk.download(name, quiet=True):
+            missing.append(name)
+    return missing
 
-# Download data on import
-download_nltk_data()
+def load_nltk():
+    """Load NLTK and its sentence tokenizer once; returns sent_tokenize or None"""
+    global _sent_tokenize, _nltk_loaded
+    if _nltk_loaded:
+        return _sent_tokenize
+    
+    with _nltk_lock:
+        if not _nltk_loaded:
+            missing = download_nltk_data()
+            if 'punkt' in missing:
+                log_event(logger, logging.WARNING, "nltk_punkt_unavailable", fallback='regex')
+            else:
+                from nltk.tokenize import sent_tokenize
+                _sent_tokenize = sent_tokenize
+            _nltk_loaded = True
+    return _sent_tokenize
+
+def preload_nltk():
+    """Load NLTK resources up front so the first request does not pay for it"""
+    return load_nltk() is not None
+
+def split_sentences(text):
+    """Sentence-split text with NLTK when available, otherwise with a regex"""
+    sent_tokenize = load_nltk()
+    if sent_tokenize is not None:
+        return sent_tokenize(text)
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(text.strip()) if sentence]
 
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.tag import pos_tag
+from section_parser import SectionParser, BULLET_PATTERN, NUMBERED_PATTERN
+
+USE_CASE_NAME_PATTERNS = [
+    re.compile(r'use case[:]?\s*["\']?(.*?)["\']?(?:\n|$)', re.IGNORECASE),
+    re.compile(r'use case name[:]?\s*["\']?(.*?)["\']?(?:\n|$)', re.IGNORECASE),
+    re.compile(r'system[:]?\s*["\']?(.*?)\s*use case', re.IGNORECASE),
+    re.compile(r'^["\']?(.*?use case.*?)["\']?(?:\n|$)', re.IGNORECASE)
+]
+ACTOR_SEPARATORS = re.compile(r'[,•\-\n]')
 
 class NLPProcessor:
     def __init__(self):
@@ -65,11 +136,23 @@ class NLPProcessor:
                 r'outcome[s]?[:]?\s*(.*?)(?:\n\n|$)'
             ]
         }
+        self.section_parser = SectionParser(self.use_case_patterns)
+        self._last_sections = None
+    
+    def sections(self, text):
+        """Segment text into sections, reusing the last result for the same text"""
+        cached = self._last_sections
+        if cached is not None and cached.text is text:
+            return cached
+        sections = self.section_parser.parse(text)
+        self._last_sections = sections
+        return sections
     
     def extract_use_case_elements(self, text):
         """
         Extract use case elements from text using NLP and pattern matching
         """
+        self.sections(text)
         elements = {
             'use_case_name': self.extract_use_case_name(text),
             'actors': self.extract_actors(text),
@@ -84,15 +167,8 @@ class NLPProcessor:
     
     def extract_use_case_name(self, text):
         """Extract use case name"""
-        patterns = [
-            r'use case[:]?\s*["\']?(.*?)["\']?(?:\n|$)',
-            r'use case name[:]?\s*["\']?(.*?)["\']?(?:\n|$)',
-            r'system[:]?\s*["\']?(.*?)\s*use case',
-            r'^["\']?(.*?use case.*?)["\']?(?:\n|$)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in USE_CASE_NAME_PATTERNS:
+            match = pattern.search(text)
             if match:
                 name = match.group(1).strip()
                 if name and name.lower() != "use case":
@@ -107,29 +183,23 @@ class NLPProcessor:
         """Extract actors from text"""
         actors = []
         
-        for pattern in self.use_case_patterns['actors']:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                if isinstance(match, tuple):
-                    match = match[0]
-                if match:
-                    # Split by commas, bullets, or newlines
-                    actor_list = re.split(r'[,•\-\n]', match)
-                    for actor in actor_list:
-                        actor_clean = actor.strip()
-                        if actor_clean and len(actor_clean) < 50:  # Sanity check
-                            actors.append(actor_clean)
+        for match in self.sections(text).find_all_of('actors'):
+            if match:
+                # Split by commas, bullets, or newlines
+                actor_list = ACTOR_SEPARATORS.split(match)
+                for actor in actor_list:
+                    actor_clean = actor.strip()
+                    if actor_clean and len(actor_clean) < 50:  # Sanity check
+                        actors.append(actor_clean)
         
         return list(set(actors)) if actors else ['User', 'System']
     
     def extract_goal(self, text):
         """Extract goal from text"""
-        for pattern in self.use_case_patterns['goals']:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if match:
-                goal = match.group(1).strip()
-                if goal:
-                    return goal
+        for section in self.sections(text).find_each('goals'):
+            goal = section.strip()
+            if goal:
+                return goal
         
         return "Enable system functionality"
     
@@ -153,28 +223,16 @@ class NLPProcessor:
     def _extract_list_items(self, text, element_type):
         """Extract list items for various elements"""
         items = []
+        sections = self.sections(text)
         
-        # Look for bullet points or numbered lists
-        bullet_pattern = r'[•\-\*]\s*(.*?)(?=\n|$)'
-        numbered_pattern = r'\d+\.\s*(.*?)(?=\n|$)'
-        
-        # First try to find specific section
-        section_patterns = self.use_case_patterns.get(element_type, [])
-        for pattern in section_patterns:
-            section_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if section_match:
-                section_text = section_match.group(1)
-                # Extract items from the section
-                bullets = re.findall(bullet_pattern, section_text)
-                numbers = re.findall(numbered_pattern, section_text)
-                items.extend(bullets + numbers)
-                break
+        # First try to find specific section, then look for bullet points or numbered lists
+        section_text = sections.find(element_type)
+        if section_text is not None:
+            items.extend(BULLET_PATTERN.findall(section_text) + NUMBERED_PATTERN.findall(section_text))
         
         # If no specific section found, look throughout text
         if not items:
-            all_bullets = re.findall(bullet_pattern, text)
-            all_numbers = re.findall(numbered_pattern, text)
-            items = all_bullets + all_numbers
+            items = sections.all_bullets() + sections.all_numbers()
         
         # Clean and filter items
         cleaned_items = [item.strip() for item in items if item.strip() and len(item.strip()) < 200]
@@ -185,10 +243,7 @@ class NLPProcessor:
         steps = []
         
         # Look for numbered steps (1., 2., etc.)
-        numbered_pattern = r'(\d+)\.\s*(.*?)(?=\n\d+\.|\n\n|$)'
-        matches = re.findall(numbered_pattern, text)
-        
-        for number, step in matches:
+        for number, step in self.sections(text).flow_steps():
             if step.strip():
                 steps.append(f"{number}. {step.strip()}")
         
@@ -196,7 +251,7 @@ class NLPProcessor:
     
     def _extract_simple_steps(self, text):
         """Extract steps from simple text"""
-        sentences = sent_tokenize(text)
+        sentences = split_sentences(text)
         steps = []
         for i, sentence in enumerate(sentences[:5], 1):  # Limit to 5 steps
             steps.append(f"{i}. {sentence.strip()}")
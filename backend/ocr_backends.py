@@ -0,0 +1,362 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+from tesseract_pool import TesseractPoolTimeout
+from tiling import OCR_TILE_OVERLAP, OCR_TILE_SIZE, merge_tiles, split_region
+from structured_logging import get_logger, log_event
+
+logger = get_logger('ocr')
+
+# Backends tried in order for every image; unknown or unavailable ones are skipped
+OCR_BACKENDS = os.environ.get('OCR_BACKENDS', 'tesseract_pool,tesseract,standalone')
+OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', 60))
+OCR_BREAKER_FAILURES = int(os.environ.get('OCR_BREAKER_FAILURES', 3))
+OCR_BREAKER_RESET = float(os.environ.get('OCR_BREAKER_RESET', 30))
+
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
+
+class OCRBackendError(Exception):
+    """Raised when an OCR backend fails on an image"""
+
+class OCRTimeoutError(OCRBackendError):
+    """Raised when an OCR backend does not finish within its timeout"""
+
+class OCRUnavailableError(OCRBackendError):
+    """Raised when every backend in the chain failed or was skipped"""
+
+class CircuitBreaker:
+    """
+    Stops calling a backend after repeated failures, then probes it again
+
+    closed: calls go through. After failure_threshold consecutive failures
+    it opens and calls are skipped. Once reset_timeout has passed it goes
+    half-open and lets a single trial call through: success closes it
+    again, failure re-opens it for another reset_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=OCR_BREAKER_FAILURES, reset_timeout=OCR_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def allow(self):
+        """True if a call may go through now; in half-open state only one trial at a time"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._state = self.HALF_OPEN
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._trial_running or self._consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._current_state(), 'consecutive_failures': self._consecutive_failures}
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+class OCRBackend:
+    """
+    One OCR engine
+
+    Image backends (needs_image) are given the preprocessed regions of the
+    decoded image; the others only get the source path and, when already
+    known, its (format, width, height). Backends that can stop their own
+    work on a timeout set enforces_timeout; the registry runs the others on
+    a helper thread it can walk away from.
+    """
+
+    name = None
+    needs_image = True
+    enforces_timeout = False
+    # Key under which the OCR time of this backend is added to the stage timings
+    timing_key = None
+
+    def available(self):
+        return True
+
+    def recognize(self, source, regions, dimensions, timeout):
+        raise NotImplementedError
+
+class TesseractBackend(OCRBackend):
+    """
+    Tesseract, one tile at a time, with tiles overlapped on threads
+
+    Regions larger than tile_size are split into tiles (see tiling.py).
+    Every tile of every region is queued at once, so with a process pool
+    or the CLI the OCR of one large image spreads over all cores; the tile
+    texts are then merged back per region in reading order. The timeout is
+    one deadline for the whole image, shared by all of its tiles.
+    """
+
+    timing_key = 'tesseract'
+    enforces_timeout = True
+
+    def __init__(self, region_threads=4, tile_size=OCR_TILE_SIZE, tile_overlap=OCR_TILE_OVERLAP):
+        self.region_threads = region_threads
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+
+    def recognize(self, source, regions, dimensions, timeout):
+        # timeout covers the whole image: every tile only gets what is left of it
+        deadline = time.monotonic() + timeout if timeout else None
+        region_tiles = [split_region(region, self.tile_size, self.tile_overlap) for region in regions]
+        images = [tile.image for tiles in region_tiles for tile in tiles]
+        if len(images) == 1:
+            return self._tile_to_string(images[0], timeout, deadline)
+        # Each call runs in a subprocess or pool worker, so threads overlap the OCR
+        with ThreadPoolExecutor(max_workers=min(self.region_threads, len(images))) as executor:
+            texts = iter(list(executor.map(lambda image: self._tile_to_string(image, timeout, deadline), images)))
+        return '\n'.join(merge_tiles(tiles, [next(texts) for _ in tiles]) for tiles in region_tiles)
+
+    def _tile_to_string(self, image, timeout, deadline):
+        if deadline is None:
+            return self.image_to_string(image, timeout)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise OCRTimeoutError(f"Tesseract did not finish the image within {timeout}s")
+        return self.image_to_string(image, remaining)
+
+    def image_to_string(self, image, timeout):
+        raise NotImplementedError
+
+class TesseractPoolBackend(TesseractBackend):
+    """Persistent Tesseract workers (see tesseract_pool.py); overrunning workers are killed"""
+
+    name = 'tesseract_pool'
+
+    def __init__(self, pool, region_threads=4, **tiling):
+        super().__init__(region_threads, **tiling)
+        self.pool = pool
+
+    def available(self):
+        return self.pool is not None
+
+    def image_to_string(self, image, timeout):
+        try:
+            return self.pool.image_to_string(image, timeout=timeout)
+        except TesseractPoolTimeout as e:
+            raise OCRTimeoutError(str(e))
+
+class TesseractCLIBackend(TesseractBackend):
+    """pytesseract, one tesseract process per call; pytesseract kills it on timeout"""
+
+    name = 'tesseract'
+
+    def __init__(self, region_threads=4, tesseract_cmd=None, **tiling):
+        super().__init__(region_threads, **tiling)
+        self.tesseract_cmd = tesseract_cmd
+
+    def available(self):
+        return TESSERACT_AVAILABLE and self.tesseract_cmd is not None
+
+    def image_to_string(self, image, timeout):
+        try:
+            return pytesseract.image_to_string(image, config=TESSERACT_CONFIG, timeout=timeout or 0)
+        except RuntimeError as e:
+            if 'timeout' in str(e).lower():
+                raise OCRTimeoutError(f"Tesseract timed out after {timeout}s")
+            raise
+
+class StandaloneBackend(OCRBackend):
+    """The deterministic sample-data fallback; never decodes the image"""
+
+    name = 'standalone'
+    needs_image = False
+    enforces_timeout = True
+
+    def __init__(self, standalone_ocr):
+        self.standalone_ocr = standalone_ocr
+
+    def recognize(self, source, regions, dimensions, timeout):
+        return self.standalone_ocr.extract_text(source, dimensions=dimensions)
+
+# name -> factory(ocr_processor) for the backends OCR_BACKENDS can name
+BACKEND_FACTORIES = {
+    'tesseract_pool': lambda processor: TesseractPoolBackend(processor.tesseract_pool, processor.region_threads,
+                                                             **processor.tiling),
+    'tesseract': lambda processor: TesseractCLIBackend(processor.region_threads, processor.tesseract_cmd,
+                                                       **processor.tiling),
+    'standalone': lambda processor: StandaloneBackend(processor.standalone_ocr)
+}
+
+def register_backend(name, factory):
+    """Make another local engine available to OCR_BACKENDS; factory(ocr_processor) returns an OCRBackend"""
+    BACKEND_FACTORIES[name] = factory
+
+class OCRBackendRegistry:
+    """
+    Ordered fallback chain of OCR backends, each behind its own circuit breaker
+
+    call() tries the backends in order and returns the text of the first
+    that succeeds. Every call is bounded by the timeout, failures and
+    timeouts are counted per backend, and a backend whose breaker is open
+    is skipped until it recovers.
+    """
+
+    def __init__(self, backends, timeout=OCR_TIMEOUT, failure_threshold=OCR_BREAKER_FAILURES,
+                 reset_timeout=OCR_BREAKER_RESET):
+        self.backends = [backend for backend in backends if backend.available()]
+        self.timeout = timeout
+        self._breakers = {backend.name: CircuitBreaker(failure_threshold, reset_timeout) for backend in self.backends}
+        self._lock = threading.Lock()
+        self._stats = {backend.name: {'calls': 0, 'failures': 0, 'timeouts': 0, 'skipped': 0, 'last_error': None,
+                                      'last_failure_at': None} for backend in self.backends}
+
+    @classmethod
+    def from_names(cls, names, processor, **options):
+        backends = []
+        for name in names:
+            factory = BACKEND_FACTORIES.get(name)
+            if factory is None:
+                log_event(logger, logging.WARNING, "ocr_backend_unknown", backend=name)
+                continue
+            backends.append(factory(processor))
+        return cls(backends, **options)
+
+    def names(self):
+        return [backend.name for backend in self.backends]
+
+    def has_image_backend(self):
+        """True if a backend that reads the image is configured and not switched off by its breaker"""
+        return any(backend.needs_image and self._breakers[backend.name].state != CircuitBreaker.OPEN
+                   for backend in self.backends)
+
+    def call(self, source, load_regions, dimensions=None, timings=None):
+        """
+        Text from the first backend in the chain that succeeds
+
+        load_regions() decodes and preprocesses the image; it is only
+        called, once, if an image backend is actually tried.
+        """
+        timings = {} if timings is None else timings
+        regions = None
+        errors = []
+        for backend in self.backends:
+            breaker = self._breakers[backend.name]
+            if breaker.state == CircuitBreaker.OPEN:
+                self._count(backend.name, 'skipped')
+                continue
+            if backend.needs_image:
+                if regions is None:
+                    try:
+                        regions = load_regions()
+                    except Exception as e:
+                        # An unreadable image is not the backend's fault, so its breaker is left alone
+                        log_event(logger, logging.ERROR, "ocr_image_unreadable", image=source, error=str(e))
+                        errors.append(f"image: {e}")
+                        regions = []
+                if not regions:
+                    continue
+            if not breaker.allow():
+                self._count(backend.name, 'skipped')
+                continue
+
+            start = time.perf_counter()
+            try:
+                text = self._run(backend, source, regions, dimensions)
+            except Exception as e:
+                breaker.record_failure()
+                self._record_failure(backend.name, e)
+                log_event(logger, logging.ERROR, "ocr_backend_failed", backend=backend.name, image=source,
+                          timeout=isinstance(e, OCRTimeoutError), state=breaker.state, error=str(e))
+                errors.append(f"{backend.name}: {e}")
+                continue
+            finally:
+                if backend.timing_key:
+                    timings[backend.timing_key] = timings.get(backend.timing_key, 0.0) + time.perf_counter() - start
+            breaker.record_success()
+            self._count(backend.name, 'calls')
+            return backend, text
+
+        raise OCRUnavailableError("No OCR backend could process the image" +
+                                  (f" ({'; '.join(errors)})" if errors else ''))
+
+    def health(self):
+        """Per-backend breaker state and call counters"""
+        with self._lock:
+            stats = {name: dict(counters) for name, counters in self._stats.items()}
+        for name, breaker in self._breakers.items():
+            stats[name].update(breaker.stats())
+        return {
+            'chain': self.names(),
+            'timeout': self.timeout,
+            'backends': stats
+        }
+
+    def _run(self, backend, source, regions, dimensions):
+        if backend.enforces_timeout:
+            return backend.recognize(source, regions, dimensions, self.timeout)
+
+        # The backend cannot be interrupted, so the caller stops waiting for it instead;
+        # the abandoned call only ties up this daemon thread, and the breaker opens
+        outcome = {}
+        def target():
+            try:
+                outcome['text'] = backend.recognize(source, regions, dimensions, self.timeout)
+            except Exception as e:
+                outcome['error'] = e
+        thread = threading.Thread(target=target, name=f"ocr-{backend.name}", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            raise OCRTimeoutError(f"{backend.name} timed out after {self.timeout}s")
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['text']
+
+    def _count(self, name, counter):
+        with self._lock:
+            self._stats[name][counter] += 1
+
+    def _record_failure(self, name, error):
+        with self._lock:
+            stats = self._stats[name]
+            stats['calls'] += 1
+            stats['failures'] += 1
+            if isinstance(error, OCRTimeoutError):
+                stats['timeouts'] += 1
+            stats['last_error'] = str(error)
+            stats['last_failure_at'] = time.time()
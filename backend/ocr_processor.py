@@ -1,95 +1,171 @@
+import logging
 import os
-import sys
-from PIL import Image
+import shutil
 
-try:
+from ocr_backends import OCR_BACKENDS, OCRBackendRegistry, TESSERACT_AVAILABLE
+if TESSERACT_AVAILABLE:
     import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
 
 from standalone_ocr import StandaloneOCR
+from image_preprocessor import ImagePreprocessor
+from image_source import load_image
+from tiling import OCR_TILE_OVERLAP, OCR_TILE_SIZE
+from tesseract_pool import TesseractPool, TESSEROCR_AVAILABLE
+from structured_logging import get_logger, log_event
+
+logger = get_logger('ocr')
+
+# Set OCR_PREPROCESS=0 to send images to Tesseract unmodified
+OCR_PREPROCESS = os.environ.get('OCR_PREPROCESS', '1') != '0'
+# Concurrent Tesseract calls per image (regions and tiles); defaults to one per core
+OCR_REGION_THREADS = int(os.environ.get('OCR_REGION_THREADS', 0)) or os.cpu_count() or 4
+
+# Persistent Tesseract workers: 'auto' uses them when tesserocr is installed
+# (optional, see requirements.txt), '1' forces them (piping images through the
+# CLI otherwise), '0' disables them
+TESSERACT_POOL = os.environ.get('TESSERACT_POOL', 'auto')
+TESSERACT_POOL_SIZE = int(os.environ.get('TESSERACT_POOL_SIZE', 0)) or None
+TESSERACT_POOL_MAX_JOBS = int(os.environ.get('TESSERACT_POOL_MAX_JOBS', 500))
+
+# OCR_STUB=1 always uses the deterministic StandaloneOCR, e.g. for load tests and CI,
+# whatever OCR_BACKENDS says
+OCR_STUB = os.environ.get('OCR_STUB', '').lower() in ('1', 'true', 'yes')
 
 class OCRProcessor:
-    def __init__(self):
-        self.tesseract_available = TESSERACT_AVAILABLE
+    """
+    Text extraction for diagram images through a chain of OCR backends
+
+    The chain (OCR_BACKENDS) is tried in order for every image; each
+    backend has a per-call timeout and a circuit breaker (see
+    ocr_backends.py), so a failing Tesseract is skipped for a while and
+    then retried instead of being switched off for good.
+    """
+
+    def __init__(self, preprocess=None, preprocess_options=None, region_threads=None,
+                 tesseract_pool_size=None, backends=None, tile_size=None, tile_overlap=None):
         self.standalone_ocr = StandaloneOCR()
+        preprocess = OCR_PREPROCESS if preprocess is None else preprocess
+        self.preprocessor = ImagePreprocessor(**(preprocess_options or {})) if preprocess else None
+        self.region_threads = region_threads or OCR_REGION_THREADS
+        self.tiling = {
+            'tile_size': OCR_TILE_SIZE if tile_size is None else tile_size,
+            'tile_overlap': OCR_TILE_OVERLAP if tile_overlap is None else tile_overlap
+        }
+        self.tesseract_pool = None
+        if TESSERACT_POOL == '1' or (TESSERACT_POOL == 'auto' and TESSEROCR_AVAILABLE):
+            self.tesseract_pool = TesseractPool(size=tesseract_pool_size or TESSERACT_POOL_SIZE,
+                                                max_jobs=TESSERACT_POOL_MAX_JOBS)
+        elif TESSERACT_POOL == 'auto':
+            log_event(logger, logging.INFO, "tesseract_pool_disabled", reason='tesserocr_not_installed',
+                      hint='pip install tesserocr')
+        self.tesseract_cmd = None
         self.setup_tesseract_path()
+        
+        if backends is None:
+            backends = ['standalone'] if OCR_STUB else [name.strip() for name in OCR_BACKENDS.split(',') if name.strip()]
+        self.backends = OCRBackendRegistry.from_names(backends, self)
+        log_event(logger, logging.INFO, "ocr_backends", chain=','.join(self.backends.names()))
+    
+    @property
+    def tesseract_available(self):
+        """True while a real OCR engine is configured and its breaker is not open"""
+        return self.backends.has_image_backend()
+    
+    @property
+    def grayscale_input(self):
+        """True if images are OCR'd in grayscale, so sources can be decoded or rendered that way"""
+        return self.preprocessor is not None and self.preprocessor.grayscale
+    
+    def has_ocr_engine(self):
+        """True if a real OCR engine is configured, even if it is currently failing"""
+        return any(backend.needs_image for backend in self.backends.backends)
     
     def setup_tesseract_path(self):
-        """Configure Tesseract path for Windows if available"""
-        if not self.tesseract_available:
-            print("Tesseract not available. Using standalone OCR mode.")
-            return
+        """Find the tesseract binary, preferring the usual Windows install locations"""
+        if self.tesseract_pool is not None and TESSEROCR_AVAILABLE:
+            log_event(logger, logging.INFO, "tesseract_backend", backend='tesserocr_pool')
         
         possible_paths = [
             r'C:\Program Files\Tesseract-OCR\tesseract.exe',
             r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
         ]
         
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                print(f"Tesseract found at: {path}")
-                return
+        path = next((path for path in possible_paths if os.path.exists(path)), None) or shutil.which('tesseract')
+        if path is None:
+            if self.tesseract_pool is not None and not TESSEROCR_AVAILABLE:
+                # Without tesserocr the pool workers pipe images through the CLI
+                self.tesseract_pool = None
+                log_event(logger, logging.INFO, "tesseract_pool_disabled", reason='tesseract_not_found')
+            log_event(logger, logging.WARNING, "tesseract_not_found", fallback='standalone')
+            return
         
-        print("Tesseract not found in common locations. Using standalone OCR mode.")
-        self.tesseract_available = False
+        self.tesseract_cmd = path
+        if TESSERACT_AVAILABLE:
+            pytesseract.pytesseract.tesseract_cmd = path
+        if self.tesseract_pool is not None:
+            self.tesseract_pool.tesseract_cmd = path
+        log_event(logger, logging.INFO, "tesseract_backend", backend='cli', path=path)
     
-    def extract_text(self, image_path):
+    def extract_text(self, image_path, timings=None):
         """
         Extract text from image using available methods
+
+        If a timings dict is given, the duration of each preprocessing stage
+        and of the Tesseract call is added to it. The image is only decoded
+        if a backend that reads it is tried, and then only once, from a
+        memory map of the file.
+        """
+        log_event(logger, logging.DEBUG, "ocr_start", image=image_path)
+        load = self.preprocessor.load if self.preprocessor is not None else load_image
+        return self._recognize(image_path, lambda: load(image_path), None, timings)
+    
+    def extract_image_text(self, image, source='image', timings=None):
         """
-        try:
-            print(f"Processing image: {image_path}")
-            
-            if self.tesseract_available:
-                return self._extract_with_tesseract(image_path)
-            else:
-                return self._extract_standalone(image_path)
-                
-        except Exception as e:
-            print(f"OCR processing failed: {str(e)}")
-            return self.standalone_ocr.extract_text(image_path)
+        Extract text from an already loaded PIL image (e.g. a rasterized PDF page)
+        """
+        return self._recognize(source, lambda: image, ('PAGE', image.width, image.height), timings)
     
-    def _extract_with_tesseract(self, image_path):
-        """Extract text using Tesseract OCR"""
-        try:
-            image = Image.open(image_path)
-            
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            custom_config = r'--oem 3 --psm 6'
-            extracted_text = pytesseract.image_to_string(image, config=custom_config)
-            
-            cleaned_text = self.clean_text(extracted_text)
-            print(f"Tesseract OCR extracted {len(cleaned_text)} characters")
-            return cleaned_text
-            
-        except Exception as e:
-            print(f"Tesseract failed: {str(e)}")
-            self.tesseract_available = False
-            return self._extract_standalone(image_path)
+    def backend_health(self):
+        return self.backends.health()
     
-    def _extract_standalone(self, image_path):
-        """Extract text using standalone method"""
-        print("Using standalone OCR mode with sample data")
-        return self.standalone_ocr.extract_text(image_path)
+    def _recognize(self, source, load_image, dimensions, timings):
+        timings = {} if timings is None else timings
+        backend, text = self.backends.call(source, lambda: self._regions(load_image(), timings), dimensions,
+                                           timings)
+        if not backend.needs_image:
+            return text
+        
+        cleaned_text = self.clean_text(text)
+        log_event(logger, logging.DEBUG, "ocr_complete", backend=backend.name, chars=len(cleaned_text))
+        return cleaned_text
+    
+    def _regions(self, image, timings):
+        """The preprocessed text regions of an image, in reading order"""
+        if self.preprocessor is None:
+            return [image if image.mode in ('RGB', 'L') else image.convert('RGB')]
+        
+        regions, stage_timings = self.preprocessor.process(image)
+        for stage, duration in stage_timings.items():
+            timings[f'preprocess_{stage}'] = timings.get(f'preprocess_{stage}', 0.0) + duration
+        return regions
     
     def clean_text(self, text):
-        """Clean and format extracted text"""
+        """
+        Clean and format extracted text
+        
+        Real OCR output is never swapped for sample data: text that does not
+        look like a use case is kept as it is and only logged.
+        """
         if not text or text.isspace():
-            return "No text could be extracted from the image. Using sample use case data."
+            log_event(logger, logging.WARNING, "ocr_text_empty")
+            return ''
         
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         cleaned_text = '\n'.join(lines)
         
-        # If text seems too short or doesn't contain use case keywords, use sample
         use_case_keywords = ['use case', 'actor', 'goal', 'flow', 'system', 'user']
         if len(cleaned_text) < 50 or not any(keyword in cleaned_text.lower() for keyword in use_case_keywords):
-            print("Extracted text doesn't appear to be a use case. Using sample data.")
-            return self.standalone_ocr.extract_text("sample")
+            log_event(logger, logging.WARNING, "ocr_text_not_use_case", chars=len(cleaned_text))
         
         return cleaned_text
     
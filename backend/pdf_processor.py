@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+DEFAULT_DPI = 200
+
+class PageRangeError(ValueError):
+    """Raised for a malformed or out-of-range page selection"""
+
+def parse_page_range(spec, page_count):
+    """
+    Turn a 1-based page selection like "1-3,7" into sorted 0-based page indices
+
+    None or an empty string selects every page.
+    """
+    if spec is None or str(spec).strip() == '':
+        return list(range(page_count))
+
+    indices = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                first, last = part.split('-', 1)
+                first = int(first) if first.strip() else 1
+                last = int(last) if last.strip() else page_count
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise PageRangeError(f"Invalid page range: {part!r}")
+
+        if first < 1 or last > page_count or first > last:
+            raise PageRangeError(f"Page range {part!r} is outside 1-{page_count}")
+        indices.update(range(first - 1, last))
+
+    if not indices:
+        raise PageRangeError("Page range selects no pages")
+    return sorted(indices)
+
+def render_page(pdf_path, page_index, dpi=DEFAULT_DPI, grayscale=False):
+    """Rasterize a single PDF page to a PIL image, in 'L' mode with grayscale"""
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[page_index]
+        try:
+            return page.render(scale=dpi / 72, grayscale=grayscale).to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+def page_source(pdf_path, page_index):
+    """Name of one page in OCR logs; the offline OCR fallback hashes the PDF and page number it names"""
+    return f"{pdf_path}#page={page_index + 1}"
+
+# OCR processor owned by each page worker process
+_worker_ocr = None
+
+def _init_page_worker():
+    global _worker_ocr
+    from ocr_processor import OCRProcessor
+    _worker_ocr = OCRProcessor(tesseract_pool_size=1)
+
+def _ocr_page(pdf_path, page_index, dpi):
+    """Page worker task: render and OCR one page"""
+    image = render_page(pdf_path, page_index, dpi, _worker_ocr.grayscale_input)
+    return _worker_ocr.extract_image_text(image, source=page_source(pdf_path, page_index))
+
+class PDFProcessor:
+    """
+    OCR for multi-page PDFs
+
+    Pages are rendered inside the workers only when they are picked up, so
+    at most one rasterized page per worker is held in memory.
+    """
+
+    def __init__(self, ocr_processor, max_workers=None, dpi=DEFAULT_DPI):
+        self.ocr_processor = ocr_processor
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.dpi = dpi
+        self._executor = None
+
+    def is_available(self):
+        return PDFIUM_AVAILABLE
+
+    def page_count(self, pdf_path):
+        if not PDFIUM_AVAILABLE:
+            raise RuntimeError("PDF support requires pypdfium2 (pip install pypdfium2)")
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def extract_pages(self, pdf_path, page_indices):
+        """Yield (page_index, text) for each requested page as its OCR finishes"""
+        if self.max_workers <= 1 or len(page_indices) <= 1:
+            for page_index in page_indices:
+                image = render_page(pdf_path, page_index, self.dpi, self.ocr_processor.grayscale_input)
+                yield page_index, self.ocr_processor.extract_image_text(image, source=page_source(pdf_path, page_index))
+            return
+
+        executor = self._get_executor()
+        futures = {
+            executor.submit(_ocr_page, pdf_path, page_index, self.dpi): page_index
+            for page_index in page_indices
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def shutdown(self, wait=True):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 initializer=_init_page_worker)
+        return self._executor
@@ -0,0 +1,404 @@
+import logging
+import time
+
+import ocr_processor as ocr_module
+import ocr_backends as ocr_backends_module
+import standalone_ocr as standalone_module
+import nlp_processor as nlp_module
+import fr_generator as fr_module
+import fr_rules as fr_rules_module
+import pdf_processor as pdf_module
+import image_preprocessor as preprocessor_module
+import image_source as image_source_module
+import tiling as tiling_module
+import section_parser as section_module
+import traceability as traceability_module
+import incremental as incremental_module
+from ocr_processor import OCRProcessor
+from nlp_processor import NLPProcessor
+from fr_generator import FRGenerator
+from incremental import BaseVersionNotFoundError, IncrementalGenerator
+from memory_monitor import MEMORY_MONITOR
+from pdf_processor import PDFProcessor, parse_page_range
+from result_cache import ResultCache, hash_file, source_fingerprint
+from structured_logging import configure_logging, get_logger, log_event
+
+logger = get_logger('pipeline')
+
+def default_tier_versions():
+    """
+    Cache tier versions derived from the source of each stage
+
+    A tier's version covers its own stage and every stage upstream of it, so
+    editing the FR generator only invalidates the 'output' tier. Edits to
+    the rules file are covered by the rule set version in each output key.
+    """
+    ocr_version = source_fingerprint(ocr_module, ocr_backends_module, standalone_module, pdf_module,
+                                     preprocessor_module, image_source_module, tiling_module)
+    elements_version = f"{ocr_version}-{source_fingerprint(nlp_module, section_module)}"
+    output_version = (f"{elements_version}-"
+                      f"{source_fingerprint(fr_module, fr_rules_module, traceability_module, incremental_module)}")
+    return {'ocr': ocr_version, 'elements': elements_version, 'output': output_version}
+
+def build_cache(cache_dir='cache', memory_limit=64 * 1024 * 1024, disk_limit=1024 * 1024 * 1024):
+    """Create a ResultCache with the pipeline's tier versions"""
+    return ResultCache(cache_dir=cache_dir, memory_limit=memory_limit,
+                       disk_limit=disk_limit, tier_versions=default_tier_versions())
+
+# Exercises every NLP extractor and FR template once, see Pipeline.warm_up
+WARM_UP_TEXT = """Use Case: Place Order
+Actors: Customer, Payment Gateway
+Goal: Customer places an order for items in the cart
+Preconditions:
+- Customer is logged in
+Main Flow:
+1. Customer selects items
+2. System validates the payment details
+3. System stores the order in the database
+Alternative Flows:
+- Payment is declined and the customer is notified
+Postconditions:
+- Order is recorded
+"""
+
+# Pipeline instance owned by each pool worker process
+_worker_pipeline = None
+
+def init_worker(cache_options=None):
+    """Process pool initializer: build the processors once per worker"""
+    global _worker_pipeline
+    configure_logging()
+    cache = build_cache(**cache_options) if cache_options is not None else None
+    # Already inside a pool worker, so PDF pages are OCR'd in-process and
+    # the worker keeps a single warm Tesseract engine
+    _worker_pipeline = Pipeline(OCRProcessor(tesseract_pool_size=1), cache=cache, pdf_workers=1)
+
+def run_in_worker(filepath, model_type='rule-based', content_hash=None, pages=None):
+    """Process pool task: run the worker's pipeline on one file; returns (result, timings, memory)"""
+    with MEMORY_MONITOR.track() as memory:
+        result, timings = _worker_pipeline.process(filepath, model_type, content_hash, pages)
+    return result, timings, memory
+
+def is_pdf(filepath):
+    return filepath.lower().endswith('.pdf')
+
+class Pipeline:
+    """
+    Runs OCR, NLP analysis, FR generation and traceability for one diagram
+    """
+
+    STAGES = ('ocr', 'nlp', 'fr_generation', 'traceability')
+
+    def __init__(self, ocr_processor=None, nlp_processor=None, fr_generator=None, cache=None,
+                 pdf_workers=None):
+        self.ocr_processor = ocr_processor or OCRProcessor()
+        self.nlp_processor = nlp_processor or NLPProcessor()
+        self.fr_generator = fr_generator or FRGenerator()
+        self.pdf_processor = PDFProcessor(self.ocr_processor, max_workers=pdf_workers)
+        self.incremental = IncrementalGenerator(self.fr_generator)
+        self.cache = cache
+
+    def process(self, filepath, model_type='rule-based', content_hash=None, pages=None):
+        """
+        Process a diagram and return (result, timings)
+
+        timings maps each stage that actually ran to its wall-clock duration
+        in seconds. With a cache configured, stages whose output is already
+        cached for this image content are skipped. content_hash may be passed
+        when the SHA-256 of the file is already known, e.g. from the upload store.
+        PDFs are split into pages, each producing its own use case; pages
+        optionally limits them, e.g. "1-3,7".
+        """
+        timings = {}
+        start = time.perf_counter()
+        content_hash = self._content_hash(filepath, content_hash, timings)
+
+        if is_pdf(filepath):
+            result = self._process_pdf(filepath, model_type, content_hash, pages, timings)
+        else:
+            result = self._process_image(filepath, model_type, content_hash, timings)
+
+        self._log_complete(filepath, model_type, timings, start)
+        return result, timings
+
+    def stream(self, filepath, model_type='rule-based', content_hash=None, pages=None, timings=None):
+        """
+        Yield a result in parts as it is produced
+
+        The first part is ('document', metadata), followed by one
+        ('use_case', use_case) per use case. PDF pages are yielded as soon as
+        each one is analysed, in completion order, and carry their 'page'.
+        Stage timings are added to the given timings dict.
+        """
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        content_hash = self._content_hash(filepath, content_hash, timings)
+
+        if is_pdf(filepath):
+            yield from self._pdf_parts(filepath, model_type, content_hash, pages, timings)
+        else:
+            result = dict(self._process_image(filepath, model_type, content_hash, timings))
+            del result['success']
+            yield 'document', {'document_type': 'image'}
+            yield 'use_case', result
+
+        self._log_complete(filepath, model_type, timings, start)
+
+    def process_incremental(self, filepath, model_type='rule-based', content_hash=None, base_hash=None):
+        """
+        Process a revised diagram against an earlier version and return (result, timings)
+
+        Requirements get content-derived IDs (see incremental.py). Without
+        base_hash the full result is returned; with the content hash of an
+        earlier version processed before, only the delta against it. Each
+        version (see IncrementalGenerator) is kept in the output tier so the
+        next revision can be diffed against it. Single images only.
+        """
+        if is_pdf(filepath):
+            raise ValueError("Incremental processing supports single diagram images, not PDFs")
+        if self.cache is None:
+            raise ValueError("Incremental processing needs the result cache")
+
+        timings = {}
+        start = time.perf_counter()
+        content_hash = self._content_hash(filepath, content_hash, timings)
+        stable_key = f"{content_hash}-{self._rules_key(model_type)}-stable"
+
+        version = self.cache.get('output', stable_key)
+        extracted_text = None
+        cacheable = True
+        if version is None or base_hash is not None:
+            extracted_text, use_case_elements, cacheable = self._elements(filepath, content_hash, timings)
+
+        if base_hash is None:
+            if version is None:
+                version = self._timed(timings, 'fr_generation', self.incremental.build, use_case_elements,
+                                      model_type)
+                version = self._store_stable(stable_key, version, extracted_text, cacheable)
+            result = dict({'success': True, 'version': content_hash}, **version)
+            del result['element_keys']
+        else:
+            previous = self._stable_version(base_hash, model_type, timings)
+            version, delta = self._timed(timings, 'fr_generation', self.incremental.update, previous,
+                                         use_case_elements, model_type)
+            version = self._store_stable(stable_key, version, extracted_text, cacheable)
+            log_event(logger, logging.DEBUG, 'incremental_delta', base=base_hash, version=content_hash,
+                      **delta['stats'])
+            result = dict({'success': True, 'base': base_hash, 'version': content_hash}, **delta)
+            if version.get('ocr_stub'):
+                result['ocr_stub'] = True
+
+        self._log_complete(filepath, model_type, timings, start)
+        return result, timings
+
+    def warm_up(self, text=WARM_UP_TEXT):
+        """
+        Run the text stages once on a sample use case, bypassing the cache
+
+        Compiles the regular expressions and fills the lazily built state of
+        the NLP and FR stages, so a server that warms up before forking its
+        workers shares that state copy-on-write instead of building it in
+        every worker on its first request.
+        """
+        timings = {}
+        use_case_elements = self._timed(timings, 'nlp', self.nlp_processor.extract_use_case_elements, text)
+        self._generate(use_case_elements, text, 'rule-based', timings)
+        return timings
+
+    def _content_hash(self, filepath, content_hash, timings):
+        """The cache key for the file, or None when caching is off"""
+        if self.cache is None:
+            return None
+        return content_hash or self._timed(timings, 'hash', hash_file, filepath)
+
+    def _log_complete(self, filepath, model_type, timings, start):
+        log_event(logger, logging.INFO, 'pipeline_complete', file=filepath, model_type=model_type,
+                  cached='fr_generation' not in timings,
+                  duration_ms=round((time.perf_counter() - start) * 1000, 2))
+
+    def _process_image(self, filepath, model_type, content_hash, timings):
+        """One use case from a single diagram image"""
+        output_key = None
+        if content_hash is not None:
+            output_key = f"{content_hash}-{self._rules_key(model_type)}"
+            cached = self.cache.get('output', output_key)
+            if cached is not None:
+                log_event(logger, logging.DEBUG, 'cache_hit', tier='output', key=output_key)
+                return cached
+
+        extracted_text, use_case_elements, cacheable = self._elements(filepath, content_hash, timings)
+        result = self._generate(use_case_elements, extracted_text, model_type, timings)
+        if output_key is not None and cacheable:
+            self.cache.put('output', output_key, result)
+        return result
+
+    def _elements(self, filepath, content_hash, timings):
+        """
+        (extracted_text, use_case_elements, cacheable) for a single image, through the ocr and elements tiers
+
+        cacheable is False when the text is stub output that must not be cached.
+        """
+        if content_hash is not None:
+            cached_elements = self.cache.get('elements', content_hash)
+            if cached_elements is not None:
+                return cached_elements['extracted_text'], cached_elements['use_case_elements'], True
+
+        extracted_text = None
+        if content_hash is not None:
+            extracted_text = self.cache.get('ocr', content_hash)
+
+        cacheable = True
+        if extracted_text is None:
+            log_event(logger, logging.DEBUG, 'stage_start', stage='ocr')
+            extracted_text = self._timed(timings, 'ocr', self.ocr_processor.extract_text, filepath, timings)
+            cacheable = self._cacheable(extracted_text)
+            if content_hash is not None and cacheable:
+                self.cache.put('ocr', content_hash, extracted_text)
+
+        log_event(logger, logging.DEBUG, 'stage_start', stage='nlp')
+        use_case_elements = self._timed(timings, 'nlp', self.nlp_processor.extract_use_case_elements,
+                                        extracted_text)
+        if content_hash is not None and cacheable:
+            self.cache.put('elements', content_hash, {
+                'extracted_text': extracted_text,
+                'use_case_elements': use_case_elements
+            })
+        return extracted_text, use_case_elements, cacheable
+
+    def _generate(self, use_case_elements, extracted_text, model_type, timings):
+        """FR generation and traceability for one set of use case elements"""
+        log_event(logger, logging.DEBUG, 'stage_start', stage='fr_generation')
+        functional_requirements = self._timed(timings, 'fr_generation', self.fr_generator.generate_requirements,
+                                              use_case_elements, model_type)
+
+        log_event(logger, logging.DEBUG, 'stage_start', stage='traceability')
+        trace_matrix = self._timed(timings, 'traceability', self.fr_generator.generate_traceability_matrix,
+                                   use_case_elements, functional_requirements)
+
+        result = {
+            'success': True,
+            'use_case_description': use_case_elements,
+            'functional_requirements': functional_requirements,
+            'traceability_matrix': trace_matrix,
+            'extracted_text': extracted_text
+        }
+        if standalone_module.is_stub_text(extracted_text):
+            # The text is sample data from the offline fallback, not from the diagram
+            result['ocr_stub'] = True
+        return result
+
+    def _process_pdf(self, filepath, model_type, content_hash, pages, timings):
+        """One use case per page; pages are OCR'd in parallel and analysed as they finish"""
+        parts = self._pdf_parts(filepath, model_type, content_hash, pages, timings)
+        _, document = next(parts)
+        use_cases = sorted((use_case for _, use_case in parts), key=lambda use_case: use_case['page'])
+        return dict({'success': True}, **document, use_cases=use_cases)
+
+    def _pdf_parts(self, filepath, model_type, content_hash, pages, timings):
+        """
+        Yield ('document', metadata) and then ('use_case', page_result) per page as it finishes
+
+        The assembled result is written to the output cache once every page is done.
+        """
+        page_count = self.pdf_processor.page_count(filepath)
+        page_indices = parse_page_range(pages, page_count)
+        document = {'document_type': 'pdf', 'page_count': page_count, 'pages_processed': len(page_indices)}
+
+        output_key = None
+        if content_hash is not None:
+            selection = ','.join(str(index + 1) for index in page_indices)
+            output_key = f"{content_hash}-{self._rules_key(model_type)}-pages-{selection}"
+            cached = self.cache.get('output', output_key)
+            if cached is not None:
+                log_event(logger, logging.DEBUG, 'cache_hit', tier='output', key=output_key)
+                yield 'document', document
+                for use_case in cached['use_cases']:
+                    yield 'use_case', use_case
+                return
+
+        yield 'document', document
+
+        page_texts = {}
+        if content_hash is not None:
+            for page_index in page_indices:
+                text = self.cache.get('ocr', f"{content_hash}-p{page_index + 1}")
+                if text is not None:
+                    page_texts[page_index] = text
+
+        use_cases = []
+        degraded = []
+        pending = [page_index for page_index in page_indices if page_index not in page_texts]
+        log_event(logger, logging.DEBUG, 'stage_start', stage='ocr', pages=len(pending),
+                  cached_pages=len(page_indices) - len(pending))
+
+        def extracted_pages():
+            for page_index in page_indices:
+                if page_index in page_texts:
+                    yield page_index, page_texts[page_index]
+            ocr_pages = self.pdf_processor.extract_pages(filepath, pending)
+            while True:
+                # Only time spent waiting on OCR counts, not the NLP done between pages
+                try:
+                    page_index, text = self._timed(timings, 'ocr', next, ocr_pages)
+                except StopIteration:
+                    return
+                if not self._cacheable(text):
+                    degraded.append(page_index)
+                elif content_hash is not None:
+                    self.cache.put('ocr', f"{content_hash}-p{page_index + 1}", text)
+                yield page_index, text
+
+        for page_index, text in extracted_pages():
+            elements = self._timed(timings, 'nlp', self.nlp_processor.extract_use_case_elements, text)
+            page_result = self._generate(elements, text, model_type, timings)
+            del page_result['success']
+            page_result['page'] = page_index + 1
+            use_cases.append(page_result)
+            yield 'use_case', page_result
+
+        if output_key is not None and not degraded:
+            use_cases.sort(key=lambda use_case: use_case['page'])
+            self.cache.put('output', output_key, dict({'success': True}, **document, use_cases=use_cases))
+
+    def _store_stable(self, stable_key, version, extracted_text, cacheable):
+        """Flag stub output on a stable-ID version and cache it for later revisions"""
+        if standalone_module.is_stub_text(extracted_text):
+            version = dict(version, ocr_stub=True)
+        if cacheable:
+            self.cache.put('output', stable_key, version)
+        return version
+
+    def _rules_key(self, model_type):
+        """The rule set and its version, so output cached under older rules is not served after a reload"""
+        return f"{model_type}-{self.fr_generator.rules_version(model_type)}"
+
+    def _stable_version(self, content_hash, model_type, timings):
+        """The stable-ID version of an earlier upload, rebuilt from its cached elements if needed"""
+        stable_key = f"{content_hash}-{self._rules_key(model_type)}-stable"
+        version = self.cache.get('output', stable_key)
+        if version is not None:
+            return version
+        cached_elements = self.cache.get('elements', content_hash)
+        if cached_elements is None:
+            raise BaseVersionNotFoundError(f"No processed version {content_hash} to compare against")
+        version = self._timed(timings, 'fr_generation', self.incremental.build,
+                              cached_elements['use_case_elements'], model_type)
+        self.cache.put('output', stable_key, version)
+        return version
+
+    def _cacheable(self, extracted_text):
+        """
+        False for sample text from the offline fallback while a real OCR engine is configured
+
+        That text stands in for a failed or skipped OCR call, so it is not
+        cached and the next request for the same file tries the engine again.
+        """
+        return not (standalone_module.is_stub_text(extracted_text) and self.ocr_processor.has_ocr_engine())
+
+    def _timed(self, timings, stage, func, *args):
+        """Call func and add its duration to timings[stage]"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
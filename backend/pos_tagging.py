@@ -0,0 +1,194 @@
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from nlp_processor import load_nltk
+from structured_logging import get_logger, log_event
+
+logger = get_logger('pos_tagging')
+
+# Distinct normalized steps whose analysis is kept per process
+POS_CACHE_SIZE = int(os.environ.get('POS_CACHE_SIZE', 50000))
+
+# Words and single punctuation marks; steps are one short sentence, so this
+# stands in for word_tokenize, which would sentence-split every step first
+TOKEN = re.compile(r"\w+(?:[-'’]\w+)*|[^\w\s]")
+# Subjects that mean the requirement is written from the system's perspective
+SYSTEM_SUBJECTS = {'system', 'application'}
+# Verbs that only carry tense or voice here ("order is saved"); such steps are left to the rewrite rules
+AUXILIARIES = {'is', 'are', 'was', 'were', 'be', 'been', 'being', 'am', 'has', 'have', 'had', 'does', 'do', 'did'}
+# Tags of the words skipped between a modal and its verb ("shall then display")
+ADVERB_TAGS = {'RB', 'RBR', 'RBS'}
+# Punctuation tags that cannot occur in a subject
+CLAUSE_TAGS = {',', ':', '(', ')', '.'}
+# Marks ending the object of a step
+SENTENCE_END = ' .!?;:'
+
+class VerbPhrase:
+    """The subject, main verb (base form) and object of a flow step, all lowercased"""
+
+    __slots__ = ('subject', 'verb', 'object')
+
+    def __init__(self, subject, verb, object):
+        self.subject = subject
+        self.verb = verb
+        self.object = object
+
+    def action(self):
+        """What the system shall do: the verb phrase itself, or allowing the actor to do it"""
+        predicate = f"{self.verb} {self.object}" if self.object else self.verb
+        if not self.subject or self.subject.split()[-1] in SYSTEM_SUBJECTS:
+            return predicate
+        return f"allow the {self.subject} to {predicate}"
+
+def normalize(text):
+    """What steps are cached under: single spaces, without the closing punctuation"""
+    return ' '.join(text.split()).rstrip(SENTENCE_END)
+
+def base_form(verb, tag):
+    """The base form of a present-tense verb; None for other tenses, which are not lemmatized here"""
+    verb = verb.lower()
+    if tag in ('VB', 'VBP'):
+        return verb
+    if tag != 'VBZ' or len(verb) < 3 or not verb.endswith('s'):
+        return None
+    if verb.endswith('ies') and len(verb) > 4:
+        return verb[:-3] + 'y'
+    if verb.endswith(('sses', 'xes', 'zes', 'ches', 'shes', 'oes')):
+        return verb[:-2]
+    return verb[:-1]
+
+def verb_phrase(text, spans, tags):
+    """
+    The VerbPhrase of a tagged step, or None if it has no usable main verb
+
+    The main verb is the first verb, or the verb after a leading modal;
+    steps opening with an auxiliary or a past or -ing form are left alone.
+    Everything before it, without determiners, is the subject and
+    everything after it the object, as written.
+    """
+    position = next((index for index, tag in enumerate(tags) if tag.startswith('VB') or tag == 'MD'), None)
+    if position is None:
+        return None
+    subject_end = position
+    if tags[position] == 'MD':
+        position += 1
+        while position < len(tags) and tags[position] in ADVERB_TAGS:
+            position += 1
+        if position == len(tags) or not tags[position].startswith('VB'):
+            return None
+    start, end = spans[position]
+    word = text[start:end].lower()
+    verb = base_form(word, tags[position])
+    if verb is None or word in AUXILIARIES:
+        return None
+    if any(tag in CLAUSE_TAGS for tag in tags[:subject_end]):
+        # A comma or colon before the verb: a condition or a label, not a subject
+        return None
+    subject = ' '.join(text[first:last].lower() for (first, last), tag in zip(spans[:subject_end], tags)
+                       if tag not in ('DT', 'PDT'))
+    return VerbPhrase(subject, verb, text[end:].strip(SENTENCE_END).lower())
+
+class StepTagger:
+    """
+    Verb phrases of flow steps from part-of-speech tags
+
+    Wraps one NLTK averaged perceptron tagger, loaded once per process (see
+    shared_tagger) and shared by its threads, since tagging only reads its
+    weights. analyze() tags all the steps it is given in one call to
+    tag_sents, and remembers the result per normalized step, so a step
+    seen before in this process, in any document, costs a dictionary
+    lookup. Without NLTK or its tagger data every step analyzes to None and
+    callers fall back to their rules.
+    """
+
+    def __init__(self, cache_size=POS_CACHE_SIZE, tagger=None):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # An NLTK tagger already loaded elsewhere may be passed in and shared
+        self._tagger = tagger
+        self._loaded = tagger is not None
+        self._cache = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._batches = 0
+
+    @property
+    def tagger(self):
+        """The NLTK tagger, or None if it is not loaded or not available"""
+        return self._tagger
+
+    def load(self):
+        """Load the tagger now, e.g. before forking workers; returns whether it is available"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._tagger = self._load_tagger()
+                    self._loaded = True
+        return self._tagger is not None
+
+    def _load_tagger(self):
+        load_nltk()
+        try:
+            from nltk.tag.perceptron import PerceptronTagger
+            return PerceptronTagger()
+        except (ImportError, LookupError, OSError, ValueError) as e:
+            log_event(logger, logging.WARNING, 'pos_tagger_unavailable', error=str(e), fallback='rules')
+            return None
+
+    def analyze(self, texts):
+        """The VerbPhrase (or None) of each step text, tagging the ones not cached in one batch"""
+        keys = [normalize(text) for text in texts]
+        results = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                if key in results:
+                    continue
+                try:
+                    results[key] = self._cache[key]
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                except KeyError:
+                    results[key] = None
+                    pending.append(key)
+                    self._misses += 1
+        if pending and self.load():
+            token_spans = [[match.span() for match in TOKEN.finditer(key)] for key in pending]
+            tagged = self._tagger.tag_sents([[key[start:end] for start, end in spans]
+                                             for key, spans in zip(pending, token_spans)])
+            for key, spans, tags in zip(pending, token_spans, tagged):
+                results[key] = verb_phrase(key, spans, [tag for _, tag in tags])
+            with self._lock:
+                self._batches += 1
+                for key in pending:
+                    self._cache[key] = results[key]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [results[key] for key in keys]
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'available': self._tagger is not None if self._loaded else None,
+                'cached_steps': len(self._cache),
+                'cache_size': self.cache_size,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'batches': self._batches
+            }
+
+_shared_tagger = None
+_shared_tagger_lock = threading.Lock()
+
+def shared_tagger():
+    """The process-wide StepTagger; loaded on first use unless preloaded with load()"""
+    global _shared_tagger
+    with _shared_tagger_lock:
+        if _shared_tagger is None:
+            _shared_tagger = StepTagger()
+        return _shared_tagger
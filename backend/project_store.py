@@ -0,0 +1,500 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from near_duplicates import NearDuplicateIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    next_fr_number INTEGER NOT NULL DEFAULT 1,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS diagrams (
+    id INTEGER PRIMARY KEY,
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    diagram_key TEXT NOT NULL,
+    filename TEXT,
+    content_hash TEXT,
+    model_type TEXT,
+    use_case_name TEXT,
+    goal TEXT,
+    elements TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (project_id, diagram_key)
+);
+
+CREATE TABLE IF NOT EXISTS diagram_actors (
+    diagram_id INTEGER NOT NULL REFERENCES diagrams(id) ON DELETE CASCADE,
+    project_id TEXT NOT NULL,
+    actor TEXT NOT NULL,
+    actor_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_diagram_actors_actor ON diagram_actors (project_id, actor_key);
+CREATE INDEX IF NOT EXISTS idx_diagram_actors_diagram ON diagram_actors (diagram_id);
+
+CREATE TABLE IF NOT EXISTS requirements (
+    id INTEGER PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    diagram_id INTEGER NOT NULL REFERENCES diagrams(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    fr_id TEXT NOT NULL,
+    local_id TEXT NOT NULL,
+    occurrence INTEGER NOT NULL DEFAULT 0,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    UNIQUE (project_id, fr_id)
+);
+CREATE INDEX IF NOT EXISTS idx_requirements_diagram ON requirements (diagram_id, position);
+CREATE INDEX IF NOT EXISTS idx_requirements_category ON requirements (project_id, category);
+CREATE INDEX IF NOT EXISTS idx_requirements_priority ON requirements (project_id, priority);
+
+CREATE TABLE IF NOT EXISTS traceability (
+    requirement_id INTEGER NOT NULL REFERENCES requirements(id) ON DELETE CASCADE,
+    project_id TEXT NOT NULL,
+    diagram_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    element TEXT NOT NULL,
+    actor_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_traceability_requirement ON traceability (requirement_id, position);
+CREATE INDEX IF NOT EXISTS idx_traceability_actor ON traceability (project_id, actor_key);
+"""
+
+ACTOR_PREFIX = 'Actor: '
+# Columns added to existing tables since their first release, as (table, column, definition)
+MIGRATIONS = [
+    ('projects', 'revision', 'INTEGER NOT NULL DEFAULT 0')
+]
+
+class ProjectNotFoundError(Exception):
+    """Raised when a project ID is unknown"""
+
+class ProjectStore:
+    """
+    Persistent, SQLite-backed store of the use cases and FRs of a project
+
+    Every diagram added to a project keeps its element set, requirements and
+    traceability rows. Requirement IDs are unique across the project: each
+    diagram's local FR-001, FR-002, ... are mapped to project-wide numbers,
+    and re-processing a diagram keeps the project IDs of requirements whose
+    local ID is unchanged. Adding or replacing a diagram only touches that
+    diagram's rows, in one transaction.
+
+    Every write to a project bumps its revision. Each process keeps its own
+    near-duplicate indexes, tagged with the revision they reflect, and
+    rebuilds one when another process has written to the project since.
+    """
+
+    def __init__(self, db_path='projects.db'):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        # Per project, (revision, NearDuplicateIndex): built on first use, then kept current
+        self._duplicate_indexes = {}
+
+    @property
+    def _db(self):
+        """
+        The SQLite connection, opened on first use in each process
+
+        A connection must not be carried across fork(), so a server that
+        imports the app before forking its workers gets one per worker.
+        """
+        if self._connection_pid != os.getpid():
+            db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA foreign_keys = ON')
+            if self.db_path != ':memory:':
+                db.execute('PRAGMA journal_mode = WAL')
+                db.execute('PRAGMA synchronous = NORMAL')
+            db.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                if column not in {row['name'] for row in db.execute(f'PRAGMA table_info({table})')}:
+                    db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+            self._connection, self._connection_pid = db, os.getpid()
+        return self._connection
+
+    def ping(self):
+        """True if the database answers a trivial query"""
+        try:
+            with self._lock:
+                self._db.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def create_project(self, name):
+        project_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute('INSERT INTO projects (id, name, created_at) VALUES (?, ?, ?)',
+                             (project_id, name, time.time()))
+        return self.get_project(project_id)
+
+    def list_projects(self):
+        with self._lock:
+            rows = self._db.execute('SELECT id, name, created_at FROM projects ORDER BY created_at').fetchall()
+        return [dict(row) for row in rows]
+
+    def get_project(self, project_id):
+        """Project summary: counts per category and priority, and actors shared across use cases"""
+        with self._lock:
+            project = self._project_row(project_id)
+            diagram_count = self._db.execute('SELECT COUNT(*) FROM diagrams WHERE project_id = ?',
+                                             (project_id,)).fetchone()[0]
+            categories = self._db.execute(
+                'SELECT category, COUNT(*) FROM requirements WHERE project_id = ? GROUP BY category',
+                (project_id,)).fetchall()
+            priorities = self._db.execute(
+                'SELECT priority, COUNT(*) FROM requirements WHERE project_id = ? GROUP BY priority',
+                (project_id,)).fetchall()
+            actors = self._db.execute(
+                'SELECT MIN(actor), COUNT(DISTINCT diagram_id) FROM diagram_actors '
+                'WHERE project_id = ? GROUP BY actor_key ORDER BY 2 DESC, 1',
+                (project_id,)).fetchall()
+
+        return {
+            'project_id': project['id'],
+            'name': project['name'],
+            'created_at': project['created_at'],
+            'diagram_count': diagram_count,
+            'requirement_count': sum(count for _, count in categories),
+            'categories': {category: count for category, count in categories},
+            'priorities': {priority: count for priority, count in priorities},
+            'actors': [{'actor': actor, 'use_cases': count} for actor, count in actors]
+        }
+
+    def delete_project(self, project_id):
+        with self._lock:
+            self._project_row(project_id)
+            self._db.execute('BEGIN')
+            try:
+                self._db.execute('DELETE FROM traceability WHERE project_id = ?', (project_id,))
+                self._db.execute('DELETE FROM requirements WHERE project_id = ?', (project_id,))
+                self._db.execute('DELETE FROM diagram_actors WHERE project_id = ?', (project_id,))
+                self._db.execute('DELETE FROM diagrams WHERE project_id = ?', (project_id,))
+                self._db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._duplicate_indexes.pop(project_id, None)
+
+    def put_use_case(self, project_id, diagram_key, use_case, filename=None, content_hash=None,
+                     model_type=None):
+        """
+        Add or replace one diagram's use case in a project
+
+        use_case is a pipeline result (use_case_description,
+        functional_requirements, traceability_matrix). Returns the stored
+        requirements and traceability rows with their project-wide IDs.
+        """
+        elements = use_case['use_case_description']
+        requirements = use_case['functional_requirements']
+        matrix = use_case['traceability_matrix']
+
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                # Read under the write lock: other processes hand out FR numbers from the same counter
+                project = self._project_row(project_id)
+                existing = self._db.execute(
+                    'SELECT id FROM diagrams WHERE project_id = ? AND diagram_key = ?',
+                    (project_id, diagram_key)).fetchone()
+
+                # Keep the project IDs of requirements that are still there
+                previous_ids = {}
+                removed_ids = []
+                if existing is not None:
+                    diagram_id = existing['id']
+                    previous_ids = {
+                        (row['local_id'], row['occurrence']): row['fr_id']
+                        for row in self._db.execute(
+                            'SELECT local_id, occurrence, fr_id FROM requirements WHERE diagram_id = ?', (diagram_id,))
+                    }
+                    removed_ids = list(previous_ids.values())
+                    self._db.execute('DELETE FROM traceability WHERE diagram_id = ?', (diagram_id,))
+                    self._db.execute('DELETE FROM requirements WHERE diagram_id = ?', (diagram_id,))
+                    self._db.execute('DELETE FROM diagram_actors WHERE diagram_id = ?', (diagram_id,))
+                    self._db.execute(
+                        'UPDATE diagrams SET filename = ?, content_hash = ?, model_type = ?, use_case_name = ?, '
+                        'goal = ?, elements = ?, updated_at = ? WHERE id = ?',
+                        (filename, content_hash, model_type, elements.get('use_case_name'), elements.get('goal'),
+                         json.dumps(elements), time.time(), diagram_id))
+                else:
+                    diagram_id = self._db.execute(
+                        'INSERT INTO diagrams (project_id, diagram_key, filename, content_hash, model_type, '
+                        'use_case_name, goal, elements, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (project_id, diagram_key, filename, content_hash, model_type,
+                         elements.get('use_case_name'), elements.get('goal'), json.dumps(elements),
+                         time.time())).lastrowid
+
+                self._db.executemany(
+                    'INSERT INTO diagram_actors (diagram_id, project_id, actor, actor_key) VALUES (?, ?, ?, ?)',
+                    [(diagram_id, project_id, actor, actor.lower())
+                     for actor in dict.fromkeys(elements.get('actors', []))])
+
+                # Generated local IDs can repeat within one use case, so each
+                # requirement is keyed by its local ID and occurrence
+                next_number = project['next_fr_number']
+                requirement_rows = []
+                occurrences = {}
+                for position, requirement in enumerate(requirements):
+                    local_id = requirement['id']
+                    occurrence = occurrences.get(local_id, 0)
+                    occurrences[local_id] = occurrence + 1
+                    fr_id = previous_ids.get((local_id, occurrence))
+                    if fr_id is None:
+                        fr_id = f"FR-{next_number:03d}"
+                        next_number += 1
+                    requirement_rows.append((position, occurrence, fr_id, requirement))
+                self._db.execute('UPDATE projects SET next_fr_number = ?, revision = revision + 1 WHERE id = ?',
+                                 (next_number, project_id))
+
+                trace_rows = []
+                stored = []
+                for (position, occurrence, fr_id, requirement), trace in zip(requirement_rows, matrix):
+                    requirement_id = self._db.execute(
+                        'INSERT INTO requirements (project_id, diagram_id, position, fr_id, local_id, occurrence, '
+                        'title, description, category, priority) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (project_id, diagram_id, position, fr_id, requirement['id'], occurrence, requirement['title'],
+                         requirement['description'], requirement['category'], requirement['priority'])).lastrowid
+                    for element_position, element in enumerate(trace['mapped_elements']):
+                        actor_key = element[len(ACTOR_PREFIX):].lower() if element.startswith(ACTOR_PREFIX) else None
+                        trace_rows.append((requirement_id, project_id, diagram_id, element_position, element,
+                                           actor_key))
+                    stored.append(dict(requirement, id=fr_id, local_id=requirement['id']))
+                self._db.executemany(
+                    'INSERT INTO traceability (requirement_id, project_id, diagram_id, position, element, actor_key) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', trace_rows)
+                revision = self._revision(project_id)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+            self._update_duplicate_index(project_id, revision, removed_ids,
+                                         [(requirement['id'], requirement['description']) for requirement in stored])
+
+        return {
+            'project_id': project_id,
+            'diagram': diagram_key,
+            'replaced': existing is not None,
+            'use_case_name': elements.get('use_case_name'),
+            'functional_requirements': stored,
+            'traceability_matrix': [
+                {'requirement_id': requirement['id'], 'requirement_title': requirement['title'],
+                 'mapped_elements': trace['mapped_elements']}
+                for requirement, trace in zip(stored, matrix)
+            ]
+        }
+
+    def remove_diagram(self, project_id, diagram_key):
+        """Drop one diagram and its requirements; returns False if it was not in the project"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._project_row(project_id)
+                row = self._db.execute('SELECT id FROM diagrams WHERE project_id = ? AND diagram_key = ?',
+                                       (project_id, diagram_key)).fetchone()
+                if row is None:
+                    self._db.execute('ROLLBACK')
+                    return False
+                removed_ids = [fr_id for (fr_id,) in self._db.execute(
+                    'SELECT fr_id FROM requirements WHERE diagram_id = ?', (row['id'],))]
+                self._db.execute('DELETE FROM traceability WHERE diagram_id = ?', (row['id'],))
+                self._db.execute('DELETE FROM requirements WHERE diagram_id = ?', (row['id'],))
+                self._db.execute('DELETE FROM diagram_actors WHERE diagram_id = ?', (row['id'],))
+                self._db.execute('DELETE FROM diagrams WHERE id = ?', (row['id'],))
+                self._db.execute('UPDATE projects SET revision = revision + 1 WHERE id = ?', (project_id,))
+                revision = self._revision(project_id)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+            self._update_duplicate_index(project_id, revision, removed_ids, [])
+            return True
+
+    def use_cases(self, project_id, actor=None):
+        """Diagrams in the project, optionally only those involving an actor"""
+        query = ('SELECT d.diagram_key, d.filename, d.content_hash, d.model_type, d.use_case_name, d.goal, '
+                 'd.updated_at, (SELECT COUNT(*) FROM requirements r WHERE r.diagram_id = d.id) AS requirement_count '
+                 'FROM diagrams d WHERE d.project_id = ?')
+        params = [project_id]
+        if actor:
+            query += (' AND d.id IN (SELECT diagram_id FROM diagram_actors '
+                      'WHERE project_id = ? AND actor_key = ?)')
+            params.extend([project_id, actor.lower()])
+        query += ' ORDER BY d.id'
+
+        with self._lock:
+            self._project_row(project_id)
+            rows = self._db.execute(query, params).fetchall()
+        return [dict(row, diagram=row['diagram_key']) for row in rows]
+
+    def requirements(self, project_id, actor=None, category=None, priority=None, diagram_key=None,
+                     limit=None, offset=0):
+        """
+        Project requirements filtered by traced actor, category, priority or diagram
+
+        Each requirement carries its diagram and use case name.
+        """
+        query = ('SELECT r.fr_id, r.local_id, r.title, r.description, r.category, r.priority, '
+                 'd.diagram_key, d.use_case_name FROM requirements r JOIN diagrams d ON d.id = r.diagram_id '
+                 'WHERE r.project_id = ?')
+        params = [project_id]
+        if category:
+            query += ' AND r.category = ?'
+            params.append(category)
+        if priority:
+            query += ' AND r.priority = ?'
+            params.append(priority)
+        if diagram_key:
+            query += ' AND d.diagram_key = ?'
+            params.append(diagram_key)
+        if actor:
+            query += (' AND r.id IN (SELECT requirement_id FROM traceability '
+                      'WHERE project_id = ? AND actor_key = ?)')
+            params.extend([project_id, actor.lower()])
+        query += ' ORDER BY r.diagram_id, r.position'
+        if limit is not None:
+            query += ' LIMIT ? OFFSET ?'
+            params.extend([int(limit), int(offset)])
+
+        with self._lock:
+            self._project_row(project_id)
+            rows = self._db.execute(query, params).fetchall()
+        return [
+            {'id': row['fr_id'], 'local_id': row['local_id'], 'title': row['title'],
+             'description': row['description'], 'category': row['category'], 'priority': row['priority'],
+             'diagram': row['diagram_key'], 'use_case_name': row['use_case_name']}
+            for row in rows
+        ]
+
+    def traceability(self, project_id, diagram_key=None, actor=None):
+        """
+        Project-wide traceability matrix: one row per requirement, across use cases
+
+        actor limits it to requirements traced to that actor in any use case.
+        """
+        query = ('SELECT r.id, r.fr_id, r.title, d.diagram_key, d.use_case_name, t.element '
+                 'FROM requirements r JOIN diagrams d ON d.id = r.diagram_id '
+                 'LEFT JOIN traceability t ON t.requirement_id = r.id WHERE r.project_id = ?')
+        params = [project_id]
+        if diagram_key:
+            query += ' AND d.diagram_key = ?'
+            params.append(diagram_key)
+        if actor:
+            query += (' AND r.id IN (SELECT requirement_id FROM traceability '
+                      'WHERE project_id = ? AND actor_key = ?)')
+            params.extend([project_id, actor.lower()])
+        query += ' ORDER BY r.diagram_id, r.position, t.position'
+
+        with self._lock:
+            self._project_row(project_id)
+            rows = self._db.execute(query, params).fetchall()
+
+        matrix = []
+        current = None
+        for row in rows:
+            if current is None or current['_row'] != row['id']:
+                current = {'_row': row['id'], 'requirement_id': row['fr_id'], 'requirement_title': row['title'],
+                           'diagram': row['diagram_key'], 'use_case_name': row['use_case_name'],
+                           'mapped_elements': []}
+                matrix.append(current)
+            if row['element'] is not None:
+                current['mapped_elements'].append(row['element'])
+        for entry in matrix:
+            del entry['_row']
+        return matrix
+
+    def duplicates(self, project_id, min_size=2):
+        """
+        Clusters of near-duplicate requirements across the project's use cases
+
+        Each cluster names a canonical requirement and lists every member
+        with its diagram. The index is built on the first call and updated
+        incrementally as diagrams are added, replaced or removed through this
+        store; it is rebuilt if the project's revision shows other writers.
+        """
+        with self._lock:
+            # One read transaction, so the rows and the revision are from the same snapshot
+            self._db.execute('BEGIN')
+            try:
+                revision = self._project_row(project_id)['revision']
+                rows = self._db.execute(
+                    'SELECT r.fr_id, r.description, d.diagram_key FROM requirements r '
+                    'JOIN diagrams d ON d.id = r.diagram_id WHERE r.project_id = ? ORDER BY r.id',
+                    (project_id,)).fetchall()
+            finally:
+                self._db.execute('COMMIT')
+            cached = self._duplicate_indexes.get(project_id)
+            if cached is None or cached[0] != revision:
+                index = NearDuplicateIndex()
+                index.add_many((row['fr_id'], row['description']) for row in rows)
+                self._duplicate_indexes[project_id] = (revision, index)
+            else:
+                index = cached[1]
+            clusters = index.clusters(min_size)
+
+        requirements = {row['fr_id']: row for row in rows}
+        return [
+            {
+                'representative': cluster['representative'],
+                'description': cluster['description'],
+                'size': cluster['size'],
+                'variants': cluster['variants'],
+                'members': [
+                    {'id': fr_id, 'description': requirements[fr_id]['description'],
+                     'diagram': requirements[fr_id]['diagram_key']}
+                    for fr_id in cluster['members']
+                ]
+            }
+            for cluster in clusters
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection, self._connection_pid = None, None
+
+    def _revision(self, project_id):
+        return self._db.execute('SELECT revision FROM projects WHERE id = ?', (project_id,)).fetchone()[0]
+
+    def _update_duplicate_index(self, project_id, revision, removed_ids, added):
+        """
+        Apply this process's own write to its cached index of the project
+
+        The write took the project to revision; if the index is not at the
+        revision just before it, another process wrote in between and the
+        index is dropped, to be rebuilt by the next duplicates() call.
+        """
+        cached = self._duplicate_indexes.pop(project_id, None)
+        if cached is None or cached[0] != revision - 1:
+            return
+        index = cached[1]
+        for fr_id in removed_ids:
+            index.remove(fr_id)
+        index.add_many(added)
+        self._duplicate_indexes[project_id] = (revision, index)
+
+    def _project_row(self, project_id):
+        row = self._db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+        if row is None:
+            raise ProjectNotFoundError(f"Project {project_id} not found")
+        return row
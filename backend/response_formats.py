@@ -0,0 +1,193 @@
+import gzip
+import json
+import zlib
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# format name -> response mimetype
+FORMATS = {
+    'json': 'application/json',
+    'compact': 'application/vnd.usecase-fr.compact+json',
+    'ndjson': 'application/x-ndjson',
+    'msgpack': 'application/msgpack'
+}
+ACCEPT_ALIASES = {'application/x-msgpack': 'msgpack', 'application/x-ndjson': 'ndjson'}
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Fields that describe the document or request rather than a use case; projection never drops them
+DOCUMENT_FIELDS = ('success', 'document_type', 'page_count', 'pages_processed', 'page', 'timings', 'ocr_stub')
+
+class FormatError(ValueError):
+    """Raised for an unknown or unavailable response format"""
+
+def negotiate_format(requested, accept_mimetypes):
+    """
+    Pick the response format from an explicit format= value or the Accept header
+
+    Defaults to plain JSON, which is what the API has always returned.
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise FormatError(f"Unknown format {requested!r}; expected one of {', '.join(FORMATS)}")
+        fmt = requested
+    else:
+        offered = list(FORMATS.values()) + list(ACCEPT_ALIASES)
+        best = accept_mimetypes.best_match(offered, default='application/json') if accept_mimetypes else None
+        fmt = ACCEPT_ALIASES.get(best) or next(
+            (name for name, mimetype in FORMATS.items() if mimetype == best), 'json')
+
+    if fmt == 'msgpack' and not MSGPACK_AVAILABLE:
+        raise FormatError("MessagePack output requires the msgpack package (pip install msgpack)")
+    return fmt
+
+def negotiate_encoding(requested, accept_encodings):
+    """'zstd', 'gzip' or None, from an explicit compress= value or Accept-Encoding"""
+    if requested:
+        if requested in ('none', 'identity'):
+            return None
+        if requested == 'zstd' and not ZSTD_AVAILABLE:
+            raise FormatError("zstd compression requires the zstandard package (pip install zstandard)")
+        if requested not in ('gzip', 'zstd'):
+            raise FormatError(f"Unknown compression {requested!r}; expected gzip, zstd or none")
+        return requested
+    if accept_encodings is None:
+        return None
+    if ZSTD_AVAILABLE and accept_encodings['zstd']:
+        return 'zstd'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def parse_fields(spec):
+    """
+    Parse a fields= projection into (include, exclude) sets
+
+    'functional_requirements,traceability_matrix' keeps only those fields;
+    '-extracted_text' keeps everything else.
+    """
+    include, exclude = set(), set()
+    for name in (spec or '').split(','):
+        name = name.strip()
+        if name.startswith('-'):
+            exclude.add(name[1:])
+        elif name:
+            include.add(name)
+    return include, exclude
+
+def project(use_case, include, exclude):
+    """A copy of a result or use case dict with only the selected fields"""
+    return {
+        key: value for key, value in use_case.items()
+        if key in DOCUMENT_FIELDS or ((not include or key in include) and key not in exclude)
+    }
+
+def compact_use_case(use_case):
+    """Drop the requirement titles the traceability matrix repeats"""
+    if 'traceability_matrix' not in use_case:
+        return use_case
+    compact = dict(use_case)
+    compact['traceability_matrix'] = [
+        {'requirement_id': row['requirement_id'], 'mapped_elements': row['mapped_elements']}
+        for row in use_case['traceability_matrix']
+    ]
+    return compact
+
+def shape_result(result, fmt, fields=None):
+    """Apply the fields= projection and, for compact formats, the compact matrix"""
+    include, exclude = parse_fields(fields)
+    compact = fmt in ('compact', 'msgpack')
+
+    def shape(use_case):
+        use_case = project(use_case, include, exclude)
+        return compact_use_case(use_case) if compact else use_case
+
+    if 'use_cases' in result:
+        shaped = dict(result)
+        shaped['use_cases'] = [shape(use_case) for use_case in result['use_cases']]
+        return shaped
+    return shape(result)
+
+def encode(result, fmt):
+    """Serialize a whole (already shaped) result in a compact format"""
+    if fmt == 'msgpack':
+        return msgpack.packb(result, use_bin_type=True)
+    return json.dumps(result, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def ndjson_lines(parts, fields=None):
+    """
+    NDJSON records for pipeline parts, emitted as each part is produced
+
+    One 'use_case' record per use case (its elements and, unless projected
+    away, its text), followed by a 'requirement' record per requirement and
+    a 'trace' record per traceability row, and a final 'summary' record.
+    """
+    include, exclude = parse_fields(fields)
+
+    def wanted(field):
+        return (not include or field in include) and field not in exclude
+
+    def line(record):
+        return json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+    document = {}
+    use_case_count = 0
+    requirement_count = 0
+    for kind, payload in parts:
+        if kind == 'document':
+            document = payload
+            continue
+
+        use_case_count += 1
+        page = {'page': payload['page']} if 'page' in payload else {}
+        header = {key: value for key, value in payload.items()
+                  if key not in ('functional_requirements', 'traceability_matrix', 'page')
+                  and (key in DOCUMENT_FIELDS or wanted(key))}
+        yield line(dict({'type': 'use_case'}, **page, **header))
+
+        if wanted('functional_requirements'):
+            for requirement in payload['functional_requirements']:
+                yield line(dict({'type': 'requirement'}, **page, **requirement))
+        requirement_count += len(payload['functional_requirements'])
+
+        if wanted('traceability_matrix'):
+            for row in payload['traceability_matrix']:
+                yield line(dict({'type': 'trace'}, **page, requirement_id=row['requirement_id'],
+                                mapped_elements=row['mapped_elements']))
+
+    yield line(dict({'type': 'summary', 'success': True}, **document, use_cases=use_case_count,
+                    requirements=requirement_count))
+
+def compress(body, encoding):
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body), 'zstd'
+    return gzip.compress(body, compresslevel=5), 'gzip'
+
+def compress_stream(chunks, encoding):
+    """Compress a stream of chunks, flushing after each so records are not held back"""
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        yield compressor.flush()
+        return
+    compressor = zlib.compressobj(5, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
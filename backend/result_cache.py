@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from structured_logging import get_logger, log_event
+
+logger = get_logger('cache')
+
+CHUNK_SIZE = 1024 * 1024
+
+def hash_file(filepath):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprint(*modules):
+    """Short hash of the source files of the given modules, used as a tier version"""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+class ResultCache:
+    """
+    Content-addressed, tiered cache for pipeline results
+
+    Each tier ('ocr', 'elements', 'output') has its own version string, so
+    changing the code behind one stage only invalidates that tier and the
+    ones downstream of it. Entries live in an in-memory LRU that is bounded
+    by encoded size and are written through to an on-disk store, which is
+    also size-bounded and survives restarts.
+    """
+
+    TIERS = ('ocr', 'elements', 'output')
+
+    def __init__(self, cache_dir='cache', memory_limit=64 * 1024 * 1024,
+                 disk_limit=1024 * 1024 * 1024, tier_versions=None):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.tier_versions = dict.fromkeys(self.TIERS, '0')
+        self.tier_versions.update(tier_versions or {})
+
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+        self._counters = {
+            tier: {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+            for tier in self.TIERS
+        }
+        self._evictions = {'memory': 0, 'disk': 0}
+
+    def get(self, tier, key):
+        """Return the cached value for key in tier, or None on a miss"""
+        memory_key = self._memory_key(tier, key)
+        with self._lock:
+            payload = self._memory.get(memory_key)
+            if payload is not None:
+                self._memory.move_to_end(memory_key)
+                self._counters[tier]['memory_hits'] += 1
+                return json.loads(payload)
+
+        path = self._disk_path(tier, key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._counters[tier]['misses'] += 1
+            return None
+
+        with self._lock:
+            self._counters[tier]['disk_hits'] += 1
+            self._remember(memory_key, payload)
+        return json.loads(payload)
+
+    def put(self, tier, key, value):
+        """Store a JSON-serializable value in memory and on disk"""
+        payload = json.dumps(value).encode('utf-8')
+        with self._lock:
+            self._counters[tier]['writes'] += 1
+            self._remember(self._memory_key(tier, key), payload)
+
+        path = self._disk_path(tier, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # An entry written again replaces its file, so only the difference counts towards the size
+            previous_size = os.stat(path).st_size
+        except OSError:
+            previous_size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log_event(logger, logging.WARNING, "cache_write_failed", tier=tier, error=str(e))
+            return
+
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = self._scan_disk_size()
+            else:
+                self._disk_size += len(payload) - previous_size
+            over_limit = self._disk_size > self.disk_limit
+        if over_limit:
+            self._evict_disk()
+
+    def stats(self):
+        """Hit/miss counters per tier plus current sizes"""
+        with self._lock:
+            tiers = {}
+            for tier, counters in self._counters.items():
+                hits = counters['memory_hits'] + counters['disk_hits']
+                lookups = hits + counters['misses']
+                tiers[tier] = dict(counters, hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+                                   version=self.tier_versions[tier])
+            return {
+                'tiers': tiers,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'memory_limit': self.memory_limit,
+                'disk_bytes': self._disk_size,
+                'disk_limit': self.disk_limit,
+                'evictions': dict(self._evictions)
+            }
+
+    def _memory_key(self, tier, key):
+        return (tier, self.tier_versions[tier], key)
+
+    def _disk_path(self, tier, key):
+        return os.path.join(self.cache_dir, tier, self.tier_versions[tier], key[:2], f"{key}.json")
+
+    def _remember(self, memory_key, payload):
+        """Insert into the LRU and evict least recently used entries (lock held)"""
+        if len(payload) > self.memory_limit:
+            return
+        previous = self._memory.pop(memory_key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[memory_key] = payload
+        self._memory_size += len(payload)
+        while self._memory_size > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self._evictions['memory'] += 1
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _scan_disk_size(self):
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _evict_disk(self):
+        """Delete least recently used files until the store is under 90% of its limit"""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_limit * 0.9
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._disk_size = total
+            self._evictions['disk'] += evicted
@@ -0,0 +1,218 @@
+import re
+from bisect import bisect_left
+
+# Grammar of the header patterns in NLPProcessor.use_case_patterns:
+#   <keyword>[.*?<keyword>][[s]?][:]?\s*(.*?)<terminator>
+PATTERN_GRAMMAR = re.compile(
+    r'(?P<keyword>[a-z]+)'
+    r'(?:\.\*\?(?P<connector>[a-z]+))?'
+    r'(?P<suffix>(?:\[s\]\?)?\[:\]\?\\s\*)'
+    r'\(\.\*\?\)'
+    r'(?P<terminator>\(\?:\\n\\n\|\$\)|\\n)'
+)
+
+BLANK_LINE = 'blank'
+END_OF_LINE = 'line'
+
+BULLET_PATTERN = re.compile(r'[•\-\*]\s*(.*?)(?=\n|$)')
+NUMBERED_PATTERN = re.compile(r'\d+\.\s*(.*?)(?=\n|$)')
+FLOW_STEP_PATTERN = re.compile(r'(\d+)\.\s*(.*?)(?=\n\d+\.|\n\n|$)')
+
+class SectionSpec:
+    """One header pattern, decomposed into keyword, optional connector and suffix"""
+
+    __slots__ = ('pattern', 'keyword', 'connector', 'suffix', 'terminator')
+
+    def __init__(self, pattern):
+        match = PATTERN_GRAMMAR.fullmatch(pattern)
+        if match is None:
+            raise ValueError(f"Unsupported section pattern: {pattern!r}")
+        self.pattern = pattern
+        self.keyword = match.group('keyword')
+        self.connector = match.group('connector')
+        self.suffix = re.compile(match.group('suffix'), re.IGNORECASE)
+        self.terminator = END_OF_LINE if match.group('terminator') == r'\n' else BLANK_LINE
+
+class SectionParser:
+    """
+    Single-pass section segmentation for use case text
+
+    All header keywords are compiled into one alternation and located in a
+    single scan of the text. Section bodies are then resolved from those
+    keyword positions, giving the same captures as running each header
+    pattern with re.search/re.findall (IGNORECASE | DOTALL) over the text.
+    """
+
+    def __init__(self, use_case_patterns):
+        self.specs = {
+            element_type: [SectionSpec(pattern) for pattern in patterns]
+            for element_type, patterns in use_case_patterns.items()
+        }
+
+        keywords = []
+        for specs in self.specs.values():
+            for spec in specs:
+                for keyword in (spec.keyword, spec.connector):
+                    if keyword and keyword not in keywords:
+                        keywords.append(keyword)
+
+        # Longest first, and a hit on a keyword also counts for any keyword
+        # that is a prefix of it, since the scanner reports one per position
+        self.keywords = sorted(keywords, key=len, reverse=True)
+        self.implied = {
+            keyword: [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+        # Offsets inside each keyword where another keyword could also start;
+        # the scanner does not report overlapping matches, so these are probed
+        self.overlaps = {
+            keyword: [
+                offset for offset in range(1, len(keyword))
+                if any(keyword[offset:].startswith(other) or other.startswith(keyword[offset:])
+                       for other in self.keywords)
+            ]
+            for keyword in self.keywords
+        }
+
+        # Plain literal alternation (no groups) so the regex engine can use its
+        # fast prefix scan; ASCII text is lowercased once and scanned
+        # case-sensitively, anything else falls back to IGNORECASE
+        alternation = '|'.join(re.escape(keyword) for keyword in self.keywords)
+        self.keyword_scanner = re.compile(alternation)
+        self.keyword_scanner_ignorecase = re.compile(alternation, re.IGNORECASE)
+        self._keyword_matchers = [
+            (keyword, re.compile(re.escape(keyword), re.IGNORECASE)) for keyword in self.keywords
+        ]
+
+    def parse(self, text):
+        """Scan text once and return its Sections"""
+        if text.isascii():
+            haystack = text.lower()
+            scanner = self.keyword_scanner
+        else:
+            haystack = text
+            scanner = self.keyword_scanner_ignorecase
+
+        positions = {keyword: [] for keyword in self.keywords}
+        for match in scanner.finditer(haystack):
+            start = match.start()
+            keyword = self._record(positions, match.group(), start)
+            for offset in self.overlaps[keyword]:
+                overlap = scanner.match(haystack, start + offset)
+                if overlap is not None:
+                    self._record(positions, overlap.group(), start + offset)
+
+        for occurrences in positions.values():
+            occurrences.sort()
+        return Sections(self, text, positions)
+
+    def _record(self, positions, matched, start):
+        """Add start to the matched keyword and the keywords implied by it"""
+        keyword = matched if matched in positions else self._identify(matched)
+        positions[keyword].append(start)
+        for other in self.implied[keyword]:
+            positions[other].append(start)
+        return keyword
+
+    def _identify(self, matched):
+        """Map an IGNORECASE match that is not plain lowercase back to its keyword"""
+        for keyword, matcher in self._keyword_matchers:
+            if matcher.fullmatch(matched):
+                return keyword
+        raise ValueError(f"Unexpected keyword match: {matched!r}")
+
+class Sections:
+    """Keyword positions for one text, with lazily resolved section bodies"""
+
+    def __init__(self, parser, text, positions):
+        self.parser = parser
+        self.text = text
+        self.positions = positions
+        self._all_bullets = None
+        self._all_numbers = None
+        self._flow_steps = None
+
+    def find(self, element_type):
+        """Body of the first header of element_type that matches, or None"""
+        for body in self.find_each(element_type):
+            return body
+        return None
+
+    def find_each(self, element_type):
+        """For each header of element_type in order, the body of its first match (re.search)"""
+        for spec in self.parser.specs.get(element_type, []):
+            match = self._match(spec, 0)
+            if match is not None:
+                yield match[0]
+
+    def find_all(self, spec):
+        """All bodies for one header spec, like re.findall"""
+        bodies = []
+        pos = 0
+        while True:
+            match = self._match(spec, pos)
+            if match is None:
+                return bodies
+            body, pos = match
+            bodies.append(body)
+
+    def find_all_of(self, element_type):
+        """re.findall results of every header of element_type, in pattern order"""
+        bodies = []
+        for spec in self.parser.specs.get(element_type, []):
+            bodies.extend(self.find_all(spec))
+        return bodies
+
+    def all_bullets(self):
+        if self._all_bullets is None:
+            self._all_bullets = BULLET_PATTERN.findall(self.text)
+        return self._all_bullets
+
+    def all_numbers(self):
+        if self._all_numbers is None:
+            self._all_numbers = NUMBERED_PATTERN.findall(self.text)
+        return self._all_numbers
+
+    def flow_steps(self):
+        if self._flow_steps is None:
+            self._flow_steps = FLOW_STEP_PATTERN.findall(self.text)
+        return self._flow_steps
+
+    def _next_position(self, keyword, pos):
+        occurrences = self.positions[keyword]
+        index = bisect_left(occurrences, pos)
+        return occurrences[index] if index < len(occurrences) else None
+
+    def _match(self, spec, pos):
+        """Return (body, match_end) of the first match of spec at or after pos"""
+        text = self.text
+        start = self._next_position(spec.keyword, pos)
+        if start is None:
+            return None
+        header_end = start + len(spec.keyword)
+
+        if spec.connector is not None:
+            # keyword.*?connector: the nearest connector after the keyword
+            start = self._next_position(spec.connector, header_end)
+            if start is None:
+                return None
+            header_end = start + len(spec.connector)
+
+        body_start = spec.suffix.match(text, header_end).end()
+
+        if spec.terminator == BLANK_LINE:
+            length = len(text)
+            dollar = length - 1 if text.endswith('\n') and body_start < length else length
+            blank = text.find('\n\n', body_start)
+            if blank != -1 and blank < dollar:
+                return text[body_start:blank], blank + 2
+            return text[body_start:dollar], dollar
+
+        newline = text.find('\n', body_start)
+        if newline != -1:
+            return text[body_start:newline], newline + 1
+        # \s* gives back its last newline so the body is empty
+        newline = text.rfind('\n', header_end, body_start)
+        if newline != -1:
+            return '', newline + 1
+        return None
@@ -0,0 +1,59 @@
+import logging
+import os
+import sys
+
+ROOT_LOGGER = 'converter'
+
+def _quote(value):
+    if isinstance(value, float):
+        return f"{value:.4f}".rstrip('0').rstrip('.')
+    text = str(value)
+    if not text or any(char in text for char in ' ="\n'):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    return text
+
+class KeyValueFormatter(logging.Formatter):
+    """Formats records as a single logfmt line: ts=... level=... event=... key=value"""
+
+    def format(self, record):
+        parts = [
+            f"ts={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"level={record.levelname.lower()}",
+            f"logger={record.name}",
+            f"event={_quote(record.getMessage())}"
+        ]
+        fields = getattr(record, 'fields', None)
+        if fields:
+            parts.extend(f"{key}={_quote(value)}" for key, value in fields.items())
+        if record.exc_info:
+            parts.append(f"exc={_quote(self.formatException(record.exc_info))}")
+        return ' '.join(parts)
+
+def configure_logging(level=None):
+    """
+    Send the service's logs to stderr as logfmt lines
+
+    The level comes from LOG_LEVEL (default INFO). Safe to call more than
+    once, e.g. from pool worker initializers.
+    """
+    logger = logging.getLogger(ROOT_LOGGER)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(KeyValueFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel((level or os.environ.get('LOG_LEVEL', 'INFO')).upper())
+    return logger
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def log_event(logger, level, event, **fields):
+    """
+    Log an event with key=value fields
+
+    The level check comes first, so disabled events cost one comparison and
+    never build a LogRecord.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
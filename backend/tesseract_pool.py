@@ -0,0 +1,266 @@
+import atexit
+import io
+import multiprocessing
+import os
+import queue
+import subprocess
+import threading
+import time
+from multiprocessing import shared_memory
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+DEFAULT_LANG = 'eng'
+DEFAULT_PSM = 6   # single uniform block of text, as in '--psm 6'
+DEFAULT_OEM = 3   # default engine, as in '--oem 3'
+
+BYTES_PER_PIXEL = {'L': 1, 'RGB': 3}
+
+# Images of at least this many pixel bytes reach the workers through shared
+# memory instead of being pickled onto the pipe; 0 always uses the pipe
+TESSERACT_SHM_MIN_BYTES = int(os.environ.get('TESSERACT_SHM_MIN_BYTES', 256 * 1024))
+# Rows copied into shared memory at a time are sized to about this many bytes
+COPY_BAND_BYTES = 1024 * 1024
+
+class TesseractPoolError(Exception):
+    """Raised when a pooled Tesseract worker fails or times out"""
+
+class TesseractPoolTimeout(TesseractPoolError):
+    """Raised when no worker frees up, or a worker does not answer, within the timeout"""
+
+def _worker_main(conn, lang, psm, oem, tesseract_cmd):
+    """
+    Worker loop: keep one Tesseract engine loaded and OCR images sent over the pipe
+
+    Messages are (mode, width, height, pixels); None stops the worker.
+    pixels is either the pixel bytes or the name of a shared memory block
+    holding them, which the caller unlinks once the answer is back. With
+    tesserocr the engine and language model stay in memory between images.
+    Without it each image is piped through the tesseract CLI via
+    stdin/stdout, which still avoids temporary files.
+    """
+    api = None
+    if TESSEROCR_AVAILABLE:
+        api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm, oem=oem)
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+
+            mode, width, height, data = message
+            shared = None
+            try:
+                bytes_per_pixel = BYTES_PER_PIXEL[mode]
+                if isinstance(data, str):
+                    shared = shared_memory.SharedMemory(name=data)
+                    data = shared.buf[:bytes_per_pixel * width * height]
+                if api is not None:
+                    # tesserocr only accepts bytes, so a shared block is copied once here
+                    api.SetImageBytes(bytes(data), width, height, bytes_per_pixel, bytes_per_pixel * width)
+                    text = api.GetUTF8Text()
+                else:
+                    text = _ocr_with_cli(mode, width, height, data, lang, psm, oem, tesseract_cmd)
+                conn.send(('ok', text))
+            except Exception as e:
+                conn.send(('error', str(e)))
+            finally:
+                if shared is not None:
+                    data.release()
+                    shared.close()
+    finally:
+        if api is not None:
+            api.End()
+
+def _copy_to_shared(image):
+    """A new shared memory block holding the raw pixels of image, copied a band of rows at a time"""
+    width, height = image.size
+    row_bytes = BYTES_PER_PIXEL[image.mode] * width
+    shared = shared_memory.SharedMemory(create=True, size=max(1, row_bytes * height))
+    rows = max(1, COPY_BAND_BYTES // max(1, row_bytes))
+    for top in range(0, height, rows):
+        bottom = min(height, top + rows)
+        shared.buf[top * row_bytes:bottom * row_bytes] = image.crop((0, top, width, bottom)).tobytes()
+    return shared
+
+def _ocr_with_cli(mode, width, height, data, lang, psm, oem, tesseract_cmd):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.frombuffer(mode, (width, height), data, 'raw', mode, 0, 1).save(buffer, format='PNG')
+    completed = subprocess.run(
+        [tesseract_cmd, 'stdin', 'stdout', '-l', lang, '--oem', str(oem), '--psm', str(psm)],
+        input=buffer.getvalue(), capture_output=True, check=True
+    )
+    return completed.stdout.decode('utf-8', errors='replace')
+
+class _Worker:
+    def __init__(self, context, lang, psm, oem, tesseract_cmd):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main,
+                                       args=(child_conn, lang, psm, oem, tesseract_cmd),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, timeout=1.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+class TesseractPool:
+    """
+    Pool of long-lived Tesseract worker processes
+
+    Each worker keeps its engine warm and receives raw pixel buffers, so
+    there is no per-image process start-up, model loading or temp file.
+    Small images go over the pipe; images of shm_min_bytes and more are
+    copied once into a shared memory block and only its name is sent, so
+    the pixels are neither pickled nor read back from the pipe. Workers are
+    recycled after max_jobs images to bound memory growth, and a worker
+    that times out is killed and replaced.
+    """
+
+    def __init__(self, size=None, max_jobs=500, lang=DEFAULT_LANG, psm=DEFAULT_PSM, oem=DEFAULT_OEM,
+                 tesseract_cmd='tesseract', shm_min_bytes=TESSERACT_SHM_MIN_BYTES):
+        self.size = size or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.shm_min_bytes = shm_min_bytes
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+        self.tesseract_cmd = tesseract_cmd
+
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._started = False
+        self._closed = False
+        self._stats = {'jobs': 0, 'shared_memory_jobs': 0, 'errors': 0, 'timeouts': 0, 'recycled': 0}
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                worker = self._spawn()
+                self._idle.put(worker)
+            self._started = True
+        atexit.register(self.close)
+
+    def image_to_string(self, image, timeout=None):
+        """
+        OCR a PIL image on a pooled worker and return the text
+
+        timeout covers both waiting for a free worker and the OCR itself; a
+        worker that overruns it is killed and replaced.
+        """
+        if image.mode not in BYTES_PER_PIXEL:
+            image = image.convert('RGB')
+        width, height = image.size
+        if not self.shm_min_bytes or BYTES_PER_PIXEL[image.mode] * width * height < self.shm_min_bytes:
+            return self._run((image.mode, width, height, image.tobytes()), timeout)
+
+        shared = _copy_to_shared(image)
+        try:
+            text = self._run((image.mode, width, height, shared.name), timeout)
+        finally:
+            shared.close()
+            shared.unlink()
+        with self._lock:
+            self._stats['shared_memory_jobs'] += 1
+        return text
+
+    def _run(self, message, timeout):
+        """Send one message to an idle worker and return the text it answers with"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise TesseractPoolTimeout(f"No Tesseract worker became free within {timeout}s")
+        try:
+            worker.conn.send(message)
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not worker.conn.poll(remaining):
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                worker = self._replace(worker, kill=True)
+                raise TesseractPoolTimeout(f"Tesseract worker timed out after {timeout}s")
+            status, payload = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker = self._replace(worker, kill=True)
+            raise TesseractPoolError(f"Tesseract worker died: {str(e)}")
+        finally:
+            self._release(worker)
+
+        with self._lock:
+            self._stats['jobs'] += 1
+            if status != 'ok':
+                self._stats['errors'] += 1
+        if status != 'ok':
+            raise TesseractPoolError(payload)
+        return payload
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=self.size, idle=self._idle.qsize(),
+                        engine='tesserocr' if TESSEROCR_AVAILABLE else 'cli')
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+            self._workers = []
+        for worker in workers:
+            worker.stop()
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.lang, self.psm, self.oem, self.tesseract_cmd)
+        self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker, kill=False):
+        """Swap a worker for a fresh one"""
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self._lock:
+            return self._spawn()
+
+    def _release(self, worker):
+        """Return a worker to the idle queue, recycling it once it hits max_jobs"""
+        worker.jobs += 1
+        if self.max_jobs and worker.jobs >= self.max_jobs:
+            with self._lock:
+                self._stats['recycled'] += 1
+            worker = self._replace(worker)
+        self._idle.put(worker)
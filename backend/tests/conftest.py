@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules import each other flat, as when run from the backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,168 @@
+import json
+import os
+import random
+import re
+import shutil
+
+import pytest
+
+import pos_tagging
+from fr_generator import FRGenerator
+from fr_rules import FR_RULES_PATH, RuleConfigError, RuleEngine
+from pos_tagging import StepTagger
+
+# Words that trip the keyword rules: substrings of each other, in both cases
+WORDS = ['user', 'User', 'users', 'validate', 'display', 'store', 'process', 'check', 'login', 'access',
+         'Customer', 'admin', 'the', 'data', 'update', 'compute', 'manager', 'shows', 'xyz']
+MODEL_TYPES = ('rule-based', 'pattern-matching', 'nlp')
+
+def legacy_requirements(use_case_elements):
+    """FRGenerator.generate_requirements as it was before the rules file, for 'rule-based'"""
+    def category(step):
+        step = step.lower()
+        for keywords, name in ((['validate', 'verify', 'check'], 'Validation'),
+                               (['display', 'show', 'present'], 'User Interface'),
+                               (['store', 'save', 'retrieve', 'update'], 'Data Management'),
+                               (['calculate', 'process', 'compute'], 'Business Logic')):
+            if any(keyword in step for keyword in keywords):
+                return name
+        return 'General'
+
+    def action(step):
+        step = re.sub(r'^\d+\.\s*', '', step)
+        if 'user' in step.lower():
+            step = step.replace('user', 'allow user to')
+        return step.lower()
+
+    def flow(steps, start, flow_type):
+        return [{'id': f"FR-{number:03d}", 'title': f"{flow_type} Step {number - start + 1}",
+                 'description': f"The system shall {action(step)}", 'category': category(step),
+                 'priority': 'Medium' if flow_type == 'Main Flow' else 'Low'}
+                for number, step in enumerate(steps, start=start)]
+
+    requirements = []
+    fr_id = 1
+    authenticates = any(keyword in use_case_elements.get('goal', '').lower()
+                        for keyword in ['login', 'authenticate', 'access'])
+    for actor in use_case_elements.get('actors', []):
+        if any(keyword in actor.lower() for keyword in ['user', 'customer', 'admin', 'manager', 'operator']):
+            requirements.append({'id': f"FR-{fr_id:03d}", 'title': f"{actor} Interface Access",
+                                 'description': f"The system shall provide interface access for {actor}",
+                                 'category': 'User Interface', 'priority': 'High'})
+            if authenticates:
+                requirements.append({'id': f"FR-{fr_id + 1:03d}", 'title': f"{actor} Authentication",
+                                     'description': f"The system shall authenticate {actor} credentials",
+                                     'category': 'Security', 'priority': 'High'})
+            fr_id += 5
+    main_flow = use_case_elements.get('main_flow', [])
+    requirements.extend(flow(main_flow, fr_id, 'Main Flow'))
+    fr_id += len(main_flow)
+    requirements.extend(flow(use_case_elements.get('alternative_flows', []), fr_id, 'Alternative Flow'))
+    current_id = fr_id + 10
+    for title, prefix, section in (('System Precondition', 'ensure that', 'preconditions'),
+                                   ('System Postcondition', 'achieve', 'postconditions')):
+        for condition in use_case_elements.get(section, []):
+            requirements.append({'id': f"FR-{current_id:03d}", 'title': title,
+                                 'description': f"The system shall {prefix} {condition}",
+                                 'category': 'System', 'priority': 'High'})
+            current_id += 1
+    return requirements
+
+def random_elements(rng):
+    phrase = lambda count: ' '.join(rng.choices(WORDS, k=count))
+    return {
+        'use_case_name': phrase(2),
+        'goal': phrase(3),
+        'actors': [phrase(2) for _ in range(rng.randint(0, 3))],
+        'main_flow': [f"{number}. {phrase(5)}" for number in range(1, rng.randint(1, 9))],
+        'alternative_flows': [phrase(4) for _ in range(rng.randint(0, 3))],
+        'preconditions': [phrase(3) for _ in range(rng.randint(0, 2))],
+        'postconditions': [phrase(3) for _ in range(rng.randint(0, 2))]
+    }
+
+@pytest.fixture(autouse=True)
+def no_nltk_tagger(monkeypatch):
+    # The nlp rule set falls back to its rewrite rules, the same with or without NLTK data installed
+    monkeypatch.setattr(pos_tagging, '_shared_tagger', StepTagger(tagger=None))
+    monkeypatch.setattr(StepTagger, '_load_tagger', lambda self: None)
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / 'fr_rules.json'
+    shutil.copy(FR_RULES_PATH, path)
+    return path
+
+def rewrite(path, edit):
+    """Change the rules file and move its mtime on, so the engine sees a new file"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    edit(config)
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+def test_rule_based_matches_the_legacy_generator():
+    rng = random.Random(24)
+    generator = FRGenerator(RuleEngine())
+    elements_list = [random_elements(rng) for _ in range(500)]
+    for elements in elements_list:
+        assert generator.generate_requirements(elements) == legacy_requirements(elements), elements
+    assert generator.generate_requirements_batch(elements_list) == [legacy_requirements(elements)
+                                                                    for elements in elements_list]
+
+@pytest.mark.parametrize('model_type', MODEL_TYPES)
+def test_batch_matches_single_calls(model_type):
+    rng = random.Random(1)
+    generator = FRGenerator(RuleEngine())
+    elements_list = [random_elements(rng) for _ in range(200)]
+    assert generator.generate_requirements_batch(elements_list, model_type) == [
+        generator.generate_requirements(elements, model_type) for elements in elements_list]
+
+def test_unknown_model_types_use_the_default_rule_set():
+    generator = FRGenerator(RuleEngine())
+    elements = random_elements(random.Random(2))
+    assert generator.generate_requirements(elements, 'no-such-model') == generator.generate_requirements(elements)
+    assert generator.rules_version('no-such-model') == generator.rules_version('rule-based')
+
+def test_template_changes_are_picked_up_with_a_new_version(rules_path):
+    engine = RuleEngine(str(rules_path), reload_interval=0)
+    generator = FRGenerator(engine)
+    elements = {'actors': ['Customer'], 'main_flow': ['1. Customer pays']}
+    versions = {name: engine.version(name) for name in MODEL_TYPES}
+
+    def retitle(config):
+        config['rule_sets']['rule-based']['templates']['main_flow']['title'] = "Step {number} of the main flow"
+    rewrite(rules_path, retitle)
+
+    assert generator.generate_requirements(elements)[1]['title'] == "Step 1 of the main flow"
+    # Every rule set extends rule-based, so all of their versions change
+    assert all(engine.version(name) != version for name, version in versions.items())
+    assert engine.stats()['loads'] == 2
+
+def test_a_broken_rules_file_keeps_the_loaded_rules(rules_path):
+    engine = RuleEngine(str(rules_path), reload_interval=0)
+    generator = FRGenerator(engine)
+    elements = random_elements(random.Random(3))
+    before, version = generator.generate_requirements(elements), engine.version()
+
+    def break_rule(config):
+        config['rule_sets']['rule-based']['step_categories'][0]['pattern'] = '('
+    rewrite(rules_path, break_rule)
+    assert generator.generate_requirements(elements) == before
+    assert engine.version() == version
+    assert engine.stats()['last_error']
+    with pytest.raises(RuleConfigError):
+        engine.reload()
+
+    rules_path.write_text('{not json', encoding='utf-8')
+    with pytest.raises(RuleConfigError):
+        engine.reload()
+    assert generator.generate_requirements(elements) == before
+
+def test_invalid_rule_sets_are_rejected(rules_path):
+    def unknown_key(config):
+        config['rule_sets']['rule-based']['colour'] = 'blue'
+    rewrite(rules_path, unknown_key)
+    with pytest.raises(RuleConfigError):
+        RuleEngine(str(rules_path))
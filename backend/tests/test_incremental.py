@@ -0,0 +1,149 @@
+import copy
+import random
+
+import pytest
+
+import pos_tagging
+from fr_generator import FRGenerator
+from incremental import IncrementalGenerator, element_changes
+from pos_tagging import StepTagger
+
+STEPS = ['Customer selects items', 'System validates payment', 'User logs in', 'System saves order',
+         'Admin reviews', 'Customer pays', 'System sends email']
+ACTORS = ['Customer', 'Admin', 'Payment Gateway', 'User', 'Clerk']
+GOALS = ['Customer places an order', 'User logs in to access']
+MODEL_TYPES = ('rule-based', 'pattern-matching', 'nlp')
+
+class SuffixTagger:
+    """Tags a second word ending in s as a present-tense verb, so the nlp rule set runs without NLTK data"""
+
+    def tag_sents(self, sentences):
+        return [[(word, 'VBZ' if index == 1 and word.endswith('s') else 'NN') for index, word in enumerate(words)]
+                for words in sentences]
+
+@pytest.fixture(autouse=True)
+def step_tagger(monkeypatch):
+    monkeypatch.setattr(pos_tagging, '_shared_tagger', StepTagger(tagger=SuffixTagger()))
+
+@pytest.fixture
+def generator():
+    return IncrementalGenerator(FRGenerator())
+
+def numbered(steps):
+    return [f"{number}. {step}" for number, step in enumerate(steps, start=1)]
+
+def random_elements(rng):
+    return {
+        'use_case_name': rng.choice(['Place Order', 'Login']),
+        'actors': rng.sample(ACTORS[:4], rng.randint(0, 4)),
+        'goal': rng.choice(GOALS),
+        'preconditions': rng.choices(STEPS, k=rng.randint(0, 3)),
+        'main_flow': numbered(rng.choices(STEPS, k=rng.randint(0, 8))),
+        'alternative_flows': rng.choices(STEPS, k=rng.randint(0, 3)),
+        'postconditions': rng.choices(STEPS, k=rng.randint(0, 2))
+    }
+
+def edit(rng, elements):
+    """One to three insertions, deletions, shuffles or goal changes"""
+    elements = copy.deepcopy(elements)
+    for _ in range(rng.randint(1, 3)):
+        section = rng.choice(['main_flow', 'actors', 'goal', 'preconditions', 'alternative_flows'])
+        if section == 'goal':
+            elements['goal'] = rng.choice(GOALS)
+            continue
+        values = [value.split('. ', 1)[1] for value in elements['main_flow']] if section == 'main_flow' \
+            else elements[section]
+        operation = rng.random()
+        if operation < 0.4:
+            values.insert(rng.randint(0, len(values)), rng.choice(ACTORS if section == 'actors' else STEPS))
+        elif operation < 0.7 and values:
+            values.pop(rng.randrange(len(values)))
+        else:
+            rng.shuffle(values)
+        elements[section] = numbered(values) if section == 'main_flow' else values
+    return elements
+
+def apply_delta(previous, delta):
+    """Replay a delta the way clients do: removals, then updates, then additions, then the order if sent"""
+    requirements = {requirement['id']: requirement for requirement in previous['functional_requirements']}
+    removed = set(delta['requirements']['removed'])
+    order = [requirement['id'] for requirement in previous['functional_requirements']
+             if requirement['id'] not in removed]
+    for update in delta['requirements']['updated']:
+        requirements[update['id']] = dict(requirements[update['id']], **update)
+    for requirement in delta['requirements']['added']:
+        requirements[requirement['id']] = requirement
+        order.append(requirement['id'])
+    order = delta.get('order', order)
+    mapped = {row['requirement_id']: row['mapped_elements'] for row in previous['traceability_matrix']}
+    for row in delta['traceability']:
+        mapped[row['requirement_id']] = row['mapped_elements']
+    return [requirements[id] for id in order], [(id, mapped[id]) for id in order]
+
+@pytest.mark.parametrize('model_type', MODEL_TYPES)
+def test_update_matches_build_and_its_delta_replays(generator, model_type):
+    rng = random.Random(21)
+    for trial in range(300):
+        elements = random_elements(rng)
+        version = generator.build(elements, model_type)
+        for _ in range(3):
+            edited = edit(rng, elements)
+            updated, delta = generator.update(version, edited, model_type)
+            assert updated == generator.build(edited, model_type), trial
+
+            requirements, trace = apply_delta(version, delta)
+            assert requirements == updated['functional_requirements'], trial
+            assert trace == [(row['requirement_id'], row['mapped_elements'])
+                             for row in updated['traceability_matrix']], trial
+            assert len({requirement['id'] for requirement in requirements}) == len(requirements)
+            elements, version = edited, updated
+
+def test_build_keeps_the_positional_generators_requirements(generator):
+    rng = random.Random(7)
+    for _ in range(100):
+        elements = random_elements(rng)
+        positional = generator.fr_generator.generate_requirements(elements)
+        stable = generator.build(elements)['functional_requirements']
+        strip = lambda requirements: [dict(requirement, id=None) for requirement in requirements]
+        assert strip(stable) == strip(positional)
+
+def test_inserting_a_step_keeps_the_other_ids(generator):
+    elements = {'use_case_name': 'Place Order', 'actors': ['Customer'], 'goal': GOALS[0],
+                'main_flow': numbered(STEPS[:4])}
+    version = generator.build(elements)
+    edited = dict(elements, main_flow=numbered(STEPS[:1] + ['Customer enters a voucher'] + STEPS[1:4]))
+    updated, delta = generator.update(version, edited)
+
+    before = {requirement['description']: requirement['id'] for requirement in version['functional_requirements']}
+    after = {requirement['description']: requirement['id'] for requirement in updated['functional_requirements']}
+    assert all(after[description] == id for description, id in before.items())
+    assert len(delta['requirements']['added']) == 1
+    assert delta['requirements']['removed'] == []
+    # Later steps only moved from one number to the next, which shows in their titles
+    assert {update['id'] for update in delta['requirements']['updated']} == {before[description] for description
+                                                                            in list(before)[-3:]}
+
+def test_repeated_elements_get_distinct_ids(generator):
+    elements = {'main_flow': numbered(['Customer pays'] * 3), 'preconditions': ['User logs in'] * 2}
+    ids = [requirement['id'] for requirement in generator.build(elements)['functional_requirements']]
+    assert len(set(ids)) == len(ids) == 5
+
+def test_unchanged_elements_give_an_empty_delta(generator):
+    elements = random_elements(random.Random(3))
+    version = generator.build(elements)
+    updated, delta = generator.update(version, copy.deepcopy(elements))
+    assert updated == version
+    assert delta['requirements'] == {'added': [], 'updated': [], 'removed': []}
+    assert delta['traceability'] == []
+    assert delta['changes'] == {}
+    assert delta['stats']['generated'] == delta['stats']['traceability_rows_computed'] == 0
+    assert 'order' not in delta
+
+def test_element_changes():
+    previous = {'goal': GOALS[0], 'main_flow': numbered(STEPS[:3]), 'actors': ['Customer', 'Admin']}
+    current = {'goal': GOALS[1], 'main_flow': numbered(STEPS[1:4]), 'actors': ['Admin', 'Customer']}
+    assert element_changes(previous, current) == {
+        'goal': GOALS[1],
+        'main_flow': {'added': [STEPS[3]], 'removed': [STEPS[0]]},
+        'actors': {'reordered': True}
+    }
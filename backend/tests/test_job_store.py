@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from job_store import JobStore
+
+def job(job_id, status='queued', **fields):
+    record = {'id': job_id, 'status': status, 'model_type': 'rule-based', 'content_hash': 'ab' * 32,
+              'pages': None, 'submitted_at': time.time(), 'started_at': None, 'finished_at': None,
+              'timings': {}, 'error': None}
+    record.update(fields)
+    return record
+
+@pytest.fixture
+def stores(tmp_path):
+    # Two stores on one file stand in for the web worker that runs a job and the one polled for it
+    path = str(tmp_path / 'jobs.db')
+    owner, other = JobStore(path), JobStore(path)
+    yield owner, other
+    owner.close()
+    other.close()
+
+def test_other_stores_see_every_state(stores):
+    owner, other = stores
+    record = job('job-1', pages=[1, 3])
+    owner.put(record)
+    assert other.get('job-1') == record
+    assert other.result('job-1') is None
+
+    record.update(status='running', started_at=time.time(), timings={'queue_wait': 0.5})
+    owner.put(record)
+    assert other.get('job-1')['status'] == 'running'
+
+    result = {'success': True, 'functional_requirements': [{'id': 'FR-001', 'title': 'T', 'description': 'D',
+                                                            'category': 'General', 'priority': 'Low'}]}
+    record.update(status='completed', finished_at=time.time(), timings={'queue_wait': 0.5, 'ocr': 1.25})
+    owner.put(record, result)
+    assert other.get('job-1') == record
+    assert other.result('job-1') == result
+
+def test_failed_jobs_keep_their_error(stores):
+    owner, other = stores
+    owner.put(job('job-2', status='failed', finished_at=time.time(), error='Tesseract timed out'))
+    assert other.get('job-2')['error'] == 'Tesseract timed out'
+    assert other.result('job-2') is None
+
+def test_purge_drops_only_jobs_finished_before_the_cutoff(stores):
+    owner, other = stores
+    now = time.time()
+    owner.put(job('old', status='completed', finished_at=now - 7200), {'success': True})
+    owner.put(job('new', status='completed', finished_at=now - 60), {'success': True})
+    owner.put(job('queued'))
+    assert other.purge(now - 3600) == 1
+    assert owner.get('old') is None and owner.result('old') is None
+    assert owner.get('new') is not None and owner.get('queued') is not None
+
+def test_unknown_and_deleted_jobs(stores):
+    owner, other = stores
+    assert other.get('missing') is None
+    owner.put(job('rejected'))
+    owner.delete('rejected')
+    assert other.get('rejected') is None
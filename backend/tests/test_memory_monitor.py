@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+from memory_monitor import MemoryMonitor, resident_bytes
+
+pytestmark = pytest.mark.skipif(resident_bytes() is None, reason="resident set size cannot be read here")
+
+def test_track_records_the_peak():
+    monitor = MemoryMonitor(interval=0.001)
+    with monitor.track() as usage:
+        block = b'x' * (32 * 1024 * 1024)
+        time.sleep(0.05)
+    del block
+    assert usage.peak >= usage.baseline
+    assert usage.growth >= 16 * 1024 * 1024
+    assert not monitor._active
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_a_forked_child_samples_with_its_own_thread():
+    monitor = MemoryMonitor(interval=0.001)
+    parent = monitor.start()
+    pid = os.fork()
+    if pid == 0:
+        # The parent's sampler thread was not copied, so the child must start its own
+        status = 1
+        try:
+            assert not monitor._active and monitor._thread is None
+            usage = monitor.start()
+            block = b'x' * (32 * 1024 * 1024)
+            for _ in range(100):
+                if usage.peak - usage.baseline >= 16 * 1024 * 1024:
+                    break
+                time.sleep(0.01)
+            assert monitor._thread.is_alive()
+            assert usage.peak - usage.baseline >= 16 * 1024 * 1024
+            del block
+            status = 0
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    monitor.stop(parent)
+    assert os.waitstatus_to_exitcode(status) == 0
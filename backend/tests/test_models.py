@@ -0,0 +1,48 @@
+from models import Category, Priority, RequirementTable, compact_result, expand_result
+
+def requirement(id, category='General', priority='Medium'):
+    return {'id': id, 'title': f"Title of {id}", 'description': f"The system shall do {id}",
+            'category': category, 'priority': priority}
+
+REQUIREMENTS = [
+    requirement('FR-001', 'Security', 'High'),
+    requirement('FR-002'),
+    requirement('FR-1234', 'Validation', 'Low'),
+    # IDs that would not survive a round trip through a number are kept as given
+    requirement('FR-01'),
+    requirement('FR-0001'),
+    requirement('NFR-7', 'Custom Category')
+]
+
+def test_table_round_trips_the_wire_format():
+    table = RequirementTable.from_dicts(REQUIREMENTS)
+    assert len(table) == len(REQUIREMENTS)
+    assert table.to_dicts() == REQUIREMENTS
+    assert [row.to_dict() for row in table] == REQUIREMENTS
+    assert table[-1].id == 'NFR-7'
+    assert table[1:3].to_dicts() == REQUIREMENTS[1:3]
+    assert RequirementTable(table) == table
+
+def test_vocabulary_values_are_shared_wire_strings():
+    table = RequirementTable.from_dicts(REQUIREMENTS)
+    assert table[0].category is Category.SECURITY
+    assert table[1].priority is Priority.MEDIUM
+    assert Category.SECURITY == 'Security'
+
+def test_where_and_counts():
+    table = RequirementTable.from_dicts(REQUIREMENTS)
+    assert table.where(category='General') == [1, 3, 4]
+    assert table.where(category='General', priority='High') == []
+    assert table.where(priority='Low') == [2]
+    assert table.where(category='Unknown') == []
+    assert table.counts() == {'Security': 1, 'General': 3, 'Validation': 1, 'Custom Category': 1}
+    assert table.counts('priority') == {'High': 1, 'Medium': 4, 'Low': 1}
+
+def test_compacted_results_expand_to_the_original():
+    image_result = {'success': True, 'functional_requirements': REQUIREMENTS, 'traceability_matrix': []}
+    pdf_result = {'success': True, 'page_count': 2,
+                  'use_cases': [dict(image_result, page=1), dict(image_result, functional_requirements=[], page=2)]}
+    for result in (image_result, pdf_result, {'success': True}):
+        compacted = compact_result(result)
+        assert expand_result(compacted) == result
+    assert isinstance(compact_result(pdf_result)['use_cases'][0]['functional_requirements'], RequirementTable)
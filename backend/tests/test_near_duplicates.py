@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+from near_duplicates import NearDuplicateIndex, jaccard, normalize, shingles
+
+PAYMENT = 'The system shall validate the payment details entered by the customer at checkout'
+# Similar to PAYMENT and to PAYMENT_LATE, which are not similar to each other
+PAYMENT_BUYER = 'The system shall validate the payment details entered by the buyer at checkout'
+PAYMENT_LATE = 'The system shall validate the payment details entered by the buyer during checkout'
+INVOICE = 'The system shall email the invoice to the customer'
+
+BASES = [
+    'validate the payment details entered by the customer',
+    'display the order summary to the customer',
+    'email the invoice to the customer',
+    'allow the admin to export the monthly report',
+    'store the shipping address of the customer'
+]
+
+def random_description(rng):
+    words = rng.choice(BASES).split()
+    edit = rng.random()
+    if edit < 0.3:
+        words[rng.randrange(len(words))] = rng.choice(['user', 'buyer', 'order', 'cart', 'all'])
+    elif edit < 0.5:
+        words.insert(rng.randrange(len(words)), rng.choice(['quickly', 'the', 'new']))
+    return 'The system shall ' + ' '.join(words)
+
+def partition(index):
+    return sorted(sorted(cluster['members']) for cluster in index.clusters(min_size=1))
+
+def assert_consistent(index, items):
+    """The index holds exactly items, and its clusters are a partition of linked descriptions"""
+    descriptions = dict(items)
+    assert len(index) == len(descriptions)
+    assert all(key in index for key in descriptions)
+    clusters = index.clusters(min_size=1)
+    members = [key for cluster in clusters for key in cluster['members']]
+    assert sorted(members) == sorted(descriptions)
+    for cluster in clusters:
+        assert sorted(index.cluster_of(cluster['representative'])) == sorted(cluster['members'])
+        assert cluster['description'] == descriptions[cluster['representative']]
+        assert cluster['size'] == len(cluster['members'])
+        assert cluster['variants'] == len({normalize(descriptions[key]) for key in cluster['members']})
+        # Every wording is similar to some other wording of its cluster
+        wordings = {normalize(descriptions[key]) for key in cluster['members']}
+        for wording in wordings:
+            if len(wordings) > 1:
+                assert any(jaccard(shingles(wording), shingles(other)) >= index.threshold
+                           for other in wordings - {wording})
+
+def test_bins_must_split_into_bands():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(bins=64, bands=10)
+
+def test_identical_wordings_share_a_cluster():
+    index = NearDuplicateIndex()
+    index.add_many([('FR-001', PAYMENT), ('FR-002', INVOICE), ('FR-003', PAYMENT.upper() + '.')])
+    assert sorted(index.cluster_of('FR-001')) == ['FR-001', 'FR-003']
+    assert index.cluster_of('FR-002') == ['FR-002']
+    [cluster] = index.clusters()
+    assert cluster['representative'] == 'FR-001'
+    assert cluster['variants'] == 1
+
+def test_add_replaces_the_previous_description():
+    index = NearDuplicateIndex()
+    index.add_many([('FR-001', PAYMENT), ('FR-002', PAYMENT)])
+    index.add('FR-002', INVOICE)
+    assert len(index) == 2
+    assert index.clusters() == []
+    index.add('FR-002', PAYMENT_BUYER)
+    assert sorted(index.cluster_of('FR-001')) == ['FR-001', 'FR-002']
+
+def test_removing_a_bridge_splits_its_cluster():
+    index = NearDuplicateIndex()
+    index.add_many([('FR-001', PAYMENT), ('FR-002', PAYMENT_BUYER), ('FR-003', PAYMENT_LATE)])
+    assert sorted(index.cluster_of('FR-001')) == ['FR-001', 'FR-002', 'FR-003']
+    assert index.remove('FR-002')
+    assert not index.remove('FR-002')
+    assert 'FR-002' not in index
+    assert partition(index) == [['FR-001'], ['FR-003']]
+
+def test_removing_one_of_identical_wordings_keeps_the_cluster():
+    index = NearDuplicateIndex()
+    index.add_many([('FR-001', PAYMENT), ('FR-002', PAYMENT), ('FR-003', PAYMENT_BUYER)])
+    assert index.remove('FR-001')
+    assert sorted(index.cluster_of('FR-003')) == ['FR-002', 'FR-003']
+    assert index.clusters()[0]['representative'] == 'FR-002'
+
+def test_removing_everything_empties_the_index():
+    rng = random.Random(13)
+    items = [(f"FR-{n:03d}", random_description(rng)) for n in range(200)]
+    index = NearDuplicateIndex()
+    index.add_many(items)
+    rng.shuffle(items)
+    for key, _ in items:
+        assert index.remove(key)
+    assert len(index) == 0
+    assert index.clusters(min_size=1) == []
+    assert not index._buckets and not index._nodes and not index._parent and not index._members
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_adds_and_removes_stay_consistent(seed):
+    rng = random.Random(seed)
+    index = NearDuplicateIndex()
+    items = {}
+    for step in range(150):
+        if items and rng.random() < 0.35:
+            key = rng.choice(sorted(items))
+            del items[key]
+            assert index.remove(key)
+        else:
+            key = f"FR-{rng.randrange(80):03d}"
+            items[key] = random_description(rng)
+            index.add(key, items[key])
+        if step % 10 == 0:
+            assert_consistent(index, items.items())
+    assert_consistent(index, items.items())
+
+@pytest.mark.parametrize('seed', range(20))
+def test_removal_matches_a_rebuild_without_the_key_when_clusters_are_clear_cut(seed):
+    # Without wordings that bridge two groups, the clusters do not depend on
+    # insertion order, so re-linking after a removal must give the rebuild's
+    rng = random.Random(seed)
+    items = [(f"FR-{n:03d}", f"The system shall {rng.choice(BASES)}") for n in range(40)]
+    index = NearDuplicateIndex()
+    index.add_many(items)
+    for key, _ in rng.sample(items, 15):
+        index.remove(key)
+        items = [item for item in items if item[0] != key]
+        rebuilt = NearDuplicateIndex()
+        rebuilt.add_many(items)
+        assert partition(index) == partition(rebuilt)
+        # Equal-sized clusters may be listed in another order, as a wording keeps its first insertion
+        assert (sorted(index.clusters(), key=lambda cluster: cluster['representative'])
+                == sorted(rebuilt.clusters(), key=lambda cluster: cluster['representative']))
@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from ocr_backends import OCRTimeoutError, TesseractBackend
+
+class SlowBackend(TesseractBackend):
+    """Takes delay seconds per tile and records the timeout each tile was given"""
+
+    name = 'slow'
+
+    def __init__(self, delay, region_threads=2):
+        super().__init__(region_threads, tile_size=0)
+        self.delay = delay
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image, timeout):
+        with self._lock:
+            self.timeouts.append(timeout)
+        if timeout is not None and timeout < self.delay:
+            time.sleep(timeout)
+            raise OCRTimeoutError('tile timed out')
+        time.sleep(self.delay)
+        return f"{image.width}"
+
+def regions(count):
+    return [Image.new('L', (10 + index, 10), 255) for index in range(count)]
+
+def test_tiles_share_one_deadline():
+    backend = SlowBackend(delay=0.1)
+    start = time.monotonic()
+    with pytest.raises(OCRTimeoutError):
+        # Eight tiles on two threads need 0.4 s, twice the timeout
+        backend.recognize('diagram.png', regions(8), None, timeout=0.2)
+    assert time.monotonic() - start < 0.35
+    assert all(timeout <= 0.2 for timeout in backend.timeouts)
+    assert len(backend.timeouts) < 8
+
+def test_tiles_within_the_deadline_get_the_remaining_time():
+    backend = SlowBackend(delay=0.05)
+    assert backend.recognize('diagram.png', regions(4), None, timeout=5) == '10\n11\n12\n13'
+    assert all(timeout <= 5 for timeout in backend.timeouts)
+    # The second pair of tiles starts after the first and gets less time
+    assert min(backend.timeouts) < 4.96
+
+def test_no_timeout_is_passed_through():
+    backend = SlowBackend(delay=0)
+    assert backend.recognize('diagram.png', regions(3), None, timeout=None) == '10\n11\n12'
+    assert backend.timeouts == [None, None, None]
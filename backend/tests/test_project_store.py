@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from project_store import ProjectNotFoundError, ProjectStore
+
+def use_case(name, descriptions):
+    requirements = [{'id': f"FR-{i:03d}", 'title': f"Requirement {i}", 'description': description,
+                     'category': 'General', 'priority': 'Medium'}
+                    for i, description in enumerate(descriptions, start=1)]
+    return {
+        'use_case_description': {'use_case_name': name, 'goal': 'Buy', 'actors': ['Customer']},
+        'functional_requirements': requirements,
+        'traceability_matrix': [{'requirement_id': requirement['id'], 'requirement_title': requirement['title'],
+                                 'mapped_elements': ['Actor: Customer']} for requirement in requirements]
+    }
+
+PAYMENT = 'The system shall validate the payment details entered by the customer'
+OTHERS = ['The system shall display the order summary', 'The system shall email the invoice to the customer']
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'projects.db')
+
+@pytest.fixture
+def store(db_path):
+    store = ProjectStore(db_path)
+    yield store
+    store.close()
+
+def cluster_sizes(store, project_id):
+    return [cluster['size'] for cluster in store.duplicates(project_id)]
+
+def test_project_ids_are_kept_when_a_diagram_is_replaced(store):
+    project_id = store.create_project('Shop')['project_id']
+    first = store.put_use_case(project_id, 'checkout.png', use_case('Checkout', [PAYMENT] + OTHERS))
+    second = store.put_use_case(project_id, 'refund.png', use_case('Refund', OTHERS))
+    assert [r['id'] for r in first['functional_requirements']] == ['FR-001', 'FR-002', 'FR-003']
+    assert [r['id'] for r in second['functional_requirements']] == ['FR-004', 'FR-005']
+
+    replaced = store.put_use_case(project_id, 'checkout.png', use_case('Checkout', [PAYMENT, OTHERS[0]]))
+    assert replaced['replaced']
+    assert [r['id'] for r in replaced['functional_requirements']] == ['FR-001', 'FR-002']
+    assert store.get_project(project_id)['requirement_count'] == 4
+
+def test_duplicates_follow_this_stores_own_writes(store):
+    project_id = store.create_project('Shop')['project_id']
+    store.put_use_case(project_id, 'a.png', use_case('A', [PAYMENT] + OTHERS))
+    assert cluster_sizes(store, project_id) == []
+    store.put_use_case(project_id, 'b.png', use_case('B', [PAYMENT]))
+    assert cluster_sizes(store, project_id) == [2]
+    assert store.remove_diagram(project_id, 'b.png')
+    assert not store.remove_diagram(project_id, 'b.png')
+    assert cluster_sizes(store, project_id) == []
+
+def test_duplicates_see_writes_from_other_stores(db_path, store):
+    # Two stores on one database stand in for two server worker processes
+    other = ProjectStore(db_path)
+    try:
+        project_id = store.create_project('Shop')['project_id']
+        store.put_use_case(project_id, 'a.png', use_case('A', [PAYMENT] + OTHERS))
+        assert cluster_sizes(store, project_id) == []
+
+        other.put_use_case(project_id, 'b.png', use_case('B', [PAYMENT]))
+        assert cluster_sizes(store, project_id) == [2]
+        assert cluster_sizes(ProjectStore(db_path), project_id) == [2]
+
+        # A write of its own after someone else's must not be applied to the stale index
+        store.put_use_case(project_id, 'c.png', use_case('C', [OTHERS[0]]))
+        other.remove_diagram(project_id, 'b.png')
+        assert sorted(cluster_sizes(store, project_id)) == [2]
+        assert sorted(cluster_sizes(other, project_id)) == [2]
+    finally:
+        other.close()
+
+def test_unknown_project(store):
+    with pytest.raises(ProjectNotFoundError):
+        store.duplicates('missing')
+
+def test_concurrent_writes_from_two_stores_get_distinct_ids(db_path, store):
+    other = ProjectStore(db_path)
+    try:
+        project_id = store.create_project('Shop')['project_id']
+        errors = []
+
+        def write(writer, prefix):
+            try:
+                for n in range(100):
+                    writer.put_use_case(project_id, f"{prefix}-{n}.png", use_case(f"{prefix} {n}", OTHERS))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(writer, prefix))
+                   for writer, prefix in ((store, 'a'), (other, 'b'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        project = store.get_project(project_id)
+        assert project['diagram_count'] == 200
+        assert project['requirement_count'] == 400
+        # Both stores took numbers from one counter, without gaps or repeats
+        stored = other.put_use_case(project_id, 'last.png', use_case('Last', [PAYMENT]))
+        assert [r['id'] for r in stored['functional_requirements']] == ['FR-401']
+    finally:
+        other.close()
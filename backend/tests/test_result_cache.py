@@ -0,0 +1,25 @@
+from result_cache import ResultCache
+
+def test_rewriting_an_entry_counts_only_its_new_size(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), disk_limit=10 ** 6)
+    cache.put('ocr', 'ab' * 32, {'text': 'x' * 100})
+    first = cache.stats()['disk_bytes']
+    for _ in range(5):
+        cache.put('ocr', 'ab' * 32, {'text': 'x' * 100})
+    assert cache.stats()['disk_bytes'] == first
+    cache.put('ocr', 'ab' * 32, {'text': 'x' * 40})
+    assert cache.stats()['disk_bytes'] == first - 60
+    assert cache.stats()['disk_bytes'] == cache._scan_disk_size()
+
+def test_rewrites_do_not_walk_the_store(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / 'cache'), disk_limit=1000)
+    walks = []
+    evict_disk = cache._evict_disk
+    monkeypatch.setattr(cache, '_evict_disk', lambda: walks.append(1) or evict_disk())
+    cache.put('ocr', 'cd' * 32, {'text': 'y' * 300})
+    cache.put('elements', 'ef' * 32, {'text': 'z' * 300})
+    for _ in range(10):
+        cache.put('ocr', 'cd' * 32, {'text': 'y' * 300})
+    assert walks == []
+    assert cache.stats()['evictions']['disk'] == 0
+    assert cache.get('elements', 'ef' * 32) == {'text': 'z' * 300}
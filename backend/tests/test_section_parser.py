@@ -0,0 +1,45 @@
+import random
+import re
+
+import pytest
+
+from nlp_processor import NLPProcessor
+from section_parser import SectionParser, SectionSpec
+from standalone_ocr import StandaloneOCR
+
+# Header words, separators and case variants the old patterns are sensitive to
+TOKENS = ['actor', 'Actors', 'ACTOR', 'primary', 'secondary', 'user', 'Users', 'goal', 'goals:', 'purpose',
+          'objective', 'precondition', 'assumption', 'prerequisite', 'main', 'basic', 'normal', 'steps', 'flow',
+          'Flows', 'alternative', 'exception', 'error', 'postcondition', 'result', 'outcome', 'use case',
+          ':', ' ', '  ', '\n', '\n\n', '\n\n\n', '\t', '1.', '2. ', '- ', '• ', '* ', ',', 'foo', 'Bar baz',
+          's', 'S', 'ſ', '\x0b', '12.', 'a.b']
+FLAGS = re.IGNORECASE | re.DOTALL
+
+def random_texts(count, seed):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(TOKENS) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+TEXTS = random_texts(3000, seed=4) + StandaloneOCR().sample_use_cases
+
+@pytest.fixture(scope='module')
+def parser():
+    return SectionParser(NLPProcessor().use_case_patterns)
+
+def test_find_all_matches_re_findall(parser):
+    for text in TEXTS:
+        sections = parser.parse(text)
+        for specs in parser.specs.values():
+            for spec in specs:
+                assert sections.find_all(spec) == re.findall(spec.pattern, text, FLAGS), (spec.pattern, text)
+
+def test_find_each_matches_re_search(parser):
+    for text in TEXTS:
+        sections = parser.parse(text)
+        for element_type, specs in parser.specs.items():
+            expected = [match.group(1) for match in (re.search(spec.pattern, text, FLAGS) for spec in specs)
+                        if match is not None]
+            assert list(sections.find_each(element_type)) == expected, (element_type, text)
+
+def test_unsupported_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        SectionSpec(r'actor|user\s*(.*?)$')
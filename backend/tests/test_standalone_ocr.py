@@ -0,0 +1,53 @@
+import struct
+import zlib
+
+from standalone_ocr import StandaloneOCR, content_digest, is_stub_text
+
+def png_bytes(width, height, payload=b''):
+    """A PNG signature and IHDR chunk, enough for the header parser, followed by payload"""
+    ihdr = struct.pack('>II5B', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr
+            + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr)) + payload)
+
+def test_path_and_upload_pick_the_same_sample(tmp_path):
+    ocr = StandaloneOCR()
+    for seed in range(20):
+        data = png_bytes(640 + seed, 480, bytes([seed]) * 100)
+        path = tmp_path / f"diagram_{seed}.png"
+        path.write_bytes(data)
+        assert content_digest(str(path)) == zlib.crc32(data)
+        text = ocr.extract_text(str(path))
+        assert text == ocr.extract_text_from_upload(data)
+        assert text.startswith(f"Image processed: {640 + seed}x480 PNG\n")
+        assert is_stub_text(text)
+
+def test_samples_depend_on_the_content_only(tmp_path):
+    ocr = StandaloneOCR()
+    data = png_bytes(800, 600, b'diagram')
+    first, second = tmp_path / 'first.png', tmp_path / 'second.png'
+    first.write_bytes(data)
+    second.write_bytes(data)
+    assert ocr.extract_text(str(first)) == ocr.extract_text(str(second))
+    texts = {ocr.extract_text_from_upload(png_bytes(800, 600, bytes([seed]))) for seed in range(50)}
+    assert len(texts) == len(ocr.sample_use_cases)
+
+def test_given_dimensions_skip_the_header(tmp_path):
+    path = tmp_path / 'page.bin'
+    path.write_bytes(b'rendered page')
+    text = StandaloneOCR().extract_text(str(path), dimensions=('PDF', 1700, 2200))
+    assert text.startswith("Image processed: 1700x2200 PDF\n")
+
+def test_pdf_pages_are_hashed_by_the_pdf_bytes_and_page_number(tmp_path):
+    ocr = StandaloneOCR()
+    first, second = tmp_path / 'first.pdf', tmp_path / 'second.pdf'
+    first.write_bytes(b'%PDF-1.7 document')
+    second.write_bytes(b'%PDF-1.7 document')
+    source = f"{first}#page=2"
+    assert content_digest(source) == zlib.crc32(b'#page=2', zlib.crc32(b'%PDF-1.7 document'))
+    assert content_digest(source) == content_digest(f"{second}#page=2")
+    assert content_digest(source) != content_digest(f"{first}#page=1")
+    assert content_digest(source) != zlib.crc32(source.encode('utf-8'))
+    dimensions = ('PDF', 1700, 2200)
+    assert ocr.extract_text(source, dimensions) == ocr.extract_text(f"{second}#page=2", dimensions)
+    missing = str(tmp_path / 'missing.pdf#page=2')
+    assert content_digest(missing) == zlib.crc32(missing.encode('utf-8'))
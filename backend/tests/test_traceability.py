@@ -0,0 +1,70 @@
+import random
+
+from fr_generator import FRGenerator
+from traceability import DIRECT_SCAN_LIMIT, PatternMatcher, TraceabilityIndex
+
+# Short words with shared prefixes and suffixes, so patterns overlap and nest
+WORDS = ['a', 'ab', 'abc', 'b', 'bc', 'ca', 'pay', 'payment', 'ment', 'order', 'or', 'de', 'Der', 'ORDER',
+         'é', 'É', 'ß', 'ss', 'İ', 'i̇', 'customer', 'stom']
+
+def legacy_matrix(use_case_elements, functional_requirements):
+    """The per-requirement nested scans the index replaced"""
+    matrix = []
+    for requirement in functional_requirements:
+        description = requirement['description'].lower()
+        mapped_elements = []
+        if any(word in description for word in use_case_elements.get('use_case_name', '').lower().split()):
+            mapped_elements.append('Use Case Name')
+        if any(word in description for word in use_case_elements.get('goal', '').lower().split()):
+            mapped_elements.append('Goal')
+        for actor in use_case_elements.get('actors', []):
+            if actor.lower() in description:
+                mapped_elements.append(f'Actor: {actor}')
+        matrix.append({
+            'requirement_id': requirement['id'],
+            'requirement_title': requirement['title'],
+            'mapped_elements': mapped_elements if mapped_elements else ['General System']
+        })
+    return matrix
+
+def phrase(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+def random_use_case(rng, actor_count, requirement_count):
+    elements = {
+        'use_case_name': phrase(rng, 0, 3),
+        'goal': phrase(rng, 0, 4),
+        'actors': [phrase(rng, 0, 2) for _ in range(actor_count)]
+    }
+    requirements = [{'id': f"FR-{i:03d}", 'title': f"Requirement {i}", 'description': phrase(rng, 0, 8)}
+                    for i in range(requirement_count)]
+    return elements, requirements
+
+def test_matrix_matches_legacy_scans():
+    rng = random.Random(11)
+    generator = FRGenerator()
+    for _ in range(500):
+        # Both sides of DIRECT_SCAN_LIMIT, so the direct scan and the automaton are covered
+        actor_count = rng.choice([0, 1, 3, DIRECT_SCAN_LIMIT + 5])
+        elements, requirements = random_use_case(rng, actor_count, rng.randint(0, 6))
+        assert generator.generate_traceability_matrix(elements, requirements) == legacy_matrix(elements, requirements)
+
+def test_index_maps_single_descriptions():
+    elements = {'use_case_name': 'Place Order', 'goal': 'Pay online', 'actors': ['Customer', 'Bank System']}
+    index = TraceabilityIndex(elements)
+    assert index.mapped_elements('the system shall notify the customer') == ['Actor: Customer']
+    assert index.mapped_elements('the bank system shall confirm the order') == ['Use Case Name',
+                                                                                'Actor: Bank System']
+    assert index.mapped_elements('nothing relevant') == []
+
+def test_pattern_matcher_reports_every_pattern_found():
+    rng = random.Random(3)
+    for _ in range(300):
+        patterns = {phrase(rng, 1, 2): 1 << bit for bit in range(rng.randint(1, 10))}
+        matcher = PatternMatcher(patterns)
+        text = phrase(rng, 0, 12)
+        expected = 0
+        for pattern, mask in patterns.items():
+            if pattern in text:
+                expected |= mask
+        assert matcher.scan(text) == expected, (patterns, text)
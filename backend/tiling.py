@@ -0,0 +1,132 @@
+import os
+
+from PIL import Image, ImageOps
+
+# Regions taller or wider than this are split into tiles that are OCR'd in parallel; 0 disables tiling
+OCR_TILE_SIZE = int(os.environ.get('OCR_TILE_SIZE', 1024))
+# Rows shared by vertically adjacent tiles when no blank row is close to a cut,
+# so a text line crossing the cut is read whole from one of the two tiles
+OCR_TILE_OVERLAP = int(os.environ.get('OCR_TILE_OVERLAP', 48))
+
+# Mean ink (0-255) of a row or column that counts as a gutter: at most a few
+# connector lines cross it, but no text
+GUTTER_LEVEL = 3
+# Pixels darker than this are ink when a region was not binarized
+INK_THRESHOLD = 160
+
+class Tile:
+    """One piece of a region: its (left, top, right, bottom) box in the region and the cropped image"""
+
+    __slots__ = ('box', 'image')
+
+    def __init__(self, box, image):
+        self.box = box
+        self.image = image
+
+def ink_mask(image):
+    """Binary mask of the dark pixels of a region (255 where there is ink)"""
+    gray = image if image.mode == 'L' else ImageOps.grayscale(image)
+    return gray.point(lambda level: 255 if level < INK_THRESHOLD else 0)
+
+def _profile(ink, horizontal):
+    """Mean ink of every column (horizontal) or row of a mask"""
+    width, height = ink.size
+    return list(ink.resize((width, 1) if horizontal else (1, height), Image.BOX).getdata())
+
+def _cuts(profile, tile_size, gutters_only):
+    """
+    Cut positions roughly tile_size apart, each moved to the emptiest line nearby
+
+    Within a quarter tile of the nominal position the emptiest row or column
+    wins, the nearest one on ties. With gutters_only, positions without a
+    gutter nearby are skipped instead, so the piece grows past tile_size.
+    """
+    length = len(profile)
+    window = max(1, tile_size // 4)
+    cuts = []
+    position = tile_size
+    # Stop early rather than leave a sliver narrower than the window
+    while length - position > window:
+        low, high = max(1, position - window), min(length - 1, position + window)
+        cut = min(range(low, high + 1), key=lambda index: (profile[index], abs(index - position)))
+        if gutters_only and profile[cut] > GUTTER_LEVEL:
+            position += tile_size
+            continue
+        cuts.append(cut)
+        position = cut + tile_size
+    return cuts
+
+def tile_boxes(ink, tile_size=OCR_TILE_SIZE, overlap=OCR_TILE_OVERLAP):
+    """
+    Tile boxes for a region, given its ink mask, in reading order
+
+    The region is first cut into horizontal strips between text lines;
+    strips overlap by overlap rows when a cut has to cross ink. Each strip
+    is then cut into columns, but only along blank gutters, since a column
+    cut through a text line would split it into two lines.
+    """
+    width, height = ink.size
+    if not tile_size or (width <= tile_size and height <= tile_size):
+        return [(0, 0, width, height)]
+
+    row_profile = _profile(ink, horizontal=False)
+    strips = []
+    top = 0
+    for cut in _cuts(row_profile, tile_size, gutters_only=False):
+        margin = overlap if row_profile[cut] > GUTTER_LEVEL else 0
+        strips.append((top, min(height, cut + margin)))
+        top = max(0, cut - margin)
+    strips.append((top, height))
+
+    boxes = []
+    for top, bottom in strips:
+        left = 0
+        if width > tile_size:
+            for cut in _cuts(_profile(ink.crop((0, top, width, bottom)), horizontal=True), tile_size,
+                             gutters_only=True):
+                boxes.append((left, top, cut, bottom))
+                left = cut
+        boxes.append((left, top, width, bottom))
+    return boxes
+
+def split_region(image, tile_size=OCR_TILE_SIZE, overlap=OCR_TILE_OVERLAP):
+    """The tiles of one region in reading order; a single tile if it is small enough"""
+    width, height = image.size
+    if not tile_size or (width <= tile_size and height <= tile_size):
+        return [Tile((0, 0, width, height), image)]
+    return [Tile(box, image.crop(box)) for box in tile_boxes(ink_mask(image), tile_size, overlap)]
+
+def _overlapping(box, other):
+    return box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+
+def _normalize(line):
+    return ' '.join(line.split()).lower()
+
+def _shared_lines(earlier, later):
+    """How many of the last lines of earlier are also the first lines of later"""
+    for count in range(min(len(earlier), len(later)), 0, -1):
+        if earlier[-count:] == later[:count]:
+            return count
+    return 0
+
+def merge_tiles(tiles, texts):
+    """
+    The text of a region from the texts of its tiles, in reading order
+
+    Lines in the rows two tiles share come back twice: at the end of the
+    tile above and at the start of the one below. Those leading lines are
+    dropped from the lower tile for every earlier tile it overlaps.
+    """
+    if len(tiles) == 1:
+        return texts[0]
+    lines = [[line.strip() for line in text.split('\n') if line.strip()] for text in texts]
+    keys = [[_normalize(line) for line in tile_lines] for tile_lines in lines]
+
+    merged = []
+    for index, tile in enumerate(tiles):
+        skip = 0
+        for earlier in range(index):
+            if _overlapping(tile.box, tiles[earlier].box):
+                skip += _shared_lines(keys[earlier], keys[index][skip:])
+        merged.extend(lines[index][skip:])
+    return '\n'.join(merged)
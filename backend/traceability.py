@@ -0,0 +1,148 @@
+from collections import deque
+
+NAME_BIT = 1
+GOAL_BIT = 2
+ACTOR_SHIFT = 2
+
+# Above this many distinct patterns the automaton beats one substring test each
+DIRECT_SCAN_LIMIT = 24
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton reporting which of a set of substrings occur in a text
+
+    Each pattern carries an integer bit mask; scan() returns the OR of the
+    masks of every pattern found, in one pass over the text regardless of
+    how many patterns there are. Transitions are precomputed for the
+    characters that appear in the patterns, so the scan is one dict lookup
+    per character.
+    """
+
+    def __init__(self, patterns):
+        """patterns maps each non-empty pattern string to its bit mask"""
+        goto = [{}]
+        outputs = [0]
+        for pattern, mask in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(0)
+                state = next_state
+            outputs[state] |= mask
+
+        # Breadth-first pass turning the trie into a DFA: missing transitions
+        # follow the failure link, and outputs include those of the failure state
+        transitions = [dict(edges) for edges in goto]
+        failure = [0] * len(goto)
+        pending = deque(goto[0].values())
+        while pending:
+            state = pending.popleft()
+            outputs[state] |= outputs[failure[state]]
+            fallback = transitions[failure[state]]
+            for char, next_state in goto[state].items():
+                failure[next_state] = fallback.get(char, 0) if state else 0
+                pending.append(next_state)
+            for char, next_state in fallback.items():
+                transitions[state].setdefault(char, next_state)
+
+        self.transitions = transitions
+        self.outputs = outputs
+        self.all_bits = 0
+        for mask in patterns.values():
+            self.all_bits |= mask
+
+    def scan(self, text):
+        transitions = self.transitions
+        outputs = self.outputs
+        all_bits = self.all_bits
+        state = 0
+        found = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+                if found == all_bits:
+                    break
+        return found
+
+class TraceabilityIndex:
+    """
+    Matches requirement descriptions against one use case's elements
+
+    Built once per use case from the lowercased words of the name and goal
+    and the lowercased actor names. A requirement maps to the name (goal)
+    when any of its words is a substring of the description, and to an actor
+    when the actor name is, exactly as the per-requirement nested scans did.
+    """
+
+    def __init__(self, use_case_elements):
+        self.actors = list(use_case_elements.get('actors', []))
+
+        patterns = {}
+        for word in use_case_elements.get('use_case_name', '').lower().split():
+            patterns[word] = patterns.get(word, 0) | NAME_BIT
+        for word in use_case_elements.get('goal', '').lower().split():
+            patterns[word] = patterns.get(word, 0) | GOAL_BIT
+
+        # Actors listed twice share a bit; an empty actor name is in every description
+        self.always = 0
+        self.actor_positions = []
+        bits_by_name = {}
+        for position, actor in enumerate(self.actors):
+            name = actor.lower()
+            bit = bits_by_name.get(name)
+            if bit is None:
+                bit = bits_by_name[name] = len(self.actor_positions)
+                self.actor_positions.append([])
+                if name:
+                    patterns[name] = patterns.get(name, 0) | (1 << (ACTOR_SHIFT + bit))
+                else:
+                    self.always |= 1 << (ACTOR_SHIFT + bit)
+            self.actor_positions[bit].append(position)
+
+        # A handful of patterns is cheaper to test with str.__contains__ than
+        # to walk an automaton character by character
+        if len(patterns) <= DIRECT_SCAN_LIMIT:
+            self.matcher = None
+            self.patterns = list(patterns.items())
+        else:
+            self.matcher = PatternMatcher(patterns)
+            self.patterns = None
+
+    def scan(self, text):
+        """OR of the element bits whose patterns occur in the lowercased text"""
+        if self.matcher is not None:
+            return self.always | self.matcher.scan(text)
+        found = self.always
+        for pattern, mask in self.patterns:
+            if mask & ~found and pattern in text:
+                found |= mask
+        return found
+
+    def mapped_elements(self, description):
+        """Elements traced to a requirement description, in matrix order"""
+        found = self.scan(description.lower())
+        if not found:
+            return []
+
+        elements = []
+        if found & NAME_BIT:
+            elements.append('Use Case Name')
+        if found & GOAL_BIT:
+            elements.append('Goal')
+
+        actor_bits = found >> ACTOR_SHIFT
+        if actor_bits:
+            positions = []
+            while actor_bits:
+                lowest = actor_bits & -actor_bits
+                positions.extend(self.actor_positions[lowest.bit_length() - 1])
+                actor_bits ^= lowest
+            positions.sort()
+            actors = self.actors
+            elements.extend(f'Actor: {actors[position]}' for position in positions)
+        return elements
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+FILE_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class HashingFileWriter:
+    """
+    Temporary upload file that computes its SHA-256 while it is written
+
+    Used as the multipart stream for uploaded files, so request bodies go
+    straight to disk in chunks and are never buffered in memory. Unless it
+    is committed to an UploadStore, the temporary file is removed on close.
+    """
+
+    def __init__(self, directory):
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def finish(self):
+        """Close the file handle, keeping the temporary file"""
+        if not self._file.closed:
+            self._file.close()
+
+    def close(self):
+        self.finish()
+        if not self.committed:
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush and friends come from the underlying file
+        return getattr(self._file, name)
+
+class UploadStore:
+    """
+    Content-addressed storage for uploaded diagrams
+
+    Files are stored as <sha256>.<extension>, so identical uploads share one
+    file and the hash doubles as the file ID and cache key.
+    """
+
+    def __init__(self, root, allowed_extensions):
+        self.root = root
+        self.allowed_extensions = set(allowed_extensions)
+        self.incoming = os.path.join(root, '.incoming')
+
+    def open_writer(self):
+        """Start a new hashed upload"""
+        os.makedirs(self.incoming, exist_ok=True)
+        return HashingFileWriter(self.incoming)
+
+    def commit(self, writer, extension):
+        """
+        Move a finished upload to its content address
+
+        Returns a dict with file_id, filepath, size and whether the content
+        was already stored.
+        """
+        file_id = writer.hexdigest()
+        filepath = self._path(file_id, extension)
+        writer.finish()
+
+        duplicate = os.path.exists(filepath)
+        if not duplicate:
+            os.replace(writer.temp_path, filepath)
+            writer.committed = True
+        writer.close()
+
+        return {'file_id': file_id, 'filepath': filepath, 'size': writer.size, 'duplicate': duplicate}
+
+    def save_stream(self, stream, extension):
+        """Copy a readable stream into the store in chunks"""
+        writer = self.open_writer()
+        try:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                writer.write(chunk)
+            return self.commit(writer, extension)
+        finally:
+            writer.close()
+
+    def path_for(self, file_id):
+        """Path of a stored file by ID, or None if it is unknown"""
+        if not file_id or not FILE_ID_PATTERN.match(file_id):
+            return None
+        for extension in self.allowed_extensions:
+            filepath = self._path(file_id, extension)
+            if os.path.exists(filepath):
+                return filepath
+        return None
+
+    def _path(self, file_id, extension):
+        return os.path.join(self.root, f"{file_id}.{extension.lower()}")
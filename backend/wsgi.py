@@ -0,0 +1,14 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+With preload_app (the default in gunicorn.conf.py) this module is imported
+once in the master, so the processors are built and warmed up before the
+workers are forked and share that memory copy-on-write.
+"""
+from app import app, warm_up
+
+warm_up()
+
+application = app
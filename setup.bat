@@ -27,6 +27,9 @@ pip install pytesseract==0.3.10
 echo Installing NLP libraries...
 pip install nltk==3.8.1
 
+echo Installing PDF rasterizer...
+pip install pypdfium2==4.20.0
+
 echo Setup completed!
 echo.
 echo IMPORTANT: You need to install Tesseract OCR separately: